@@ -0,0 +1,131 @@
+"""
+Load test for admission control (core/admission.py).
+
+Starts gunicorn in threaded mode twice, with ADMISSION_CONTROL off and then
+on. Each run floods check-eligibility from many client threads while a few
+clients keep reading view-loans. Reports latency percentiles per endpoint
+and how many requests were shed with 429/503.
+
+Usage (from the directory containing manage.py):
+
+    python benchmarks/admission.py [--flood-clients 48] [--read-clients 4]
+        [--duration 10] [--customers 1000]
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from serve_throughput import wait_until_ready
+from workload import BASE_DIR, benchmark_env, seed, setup_django
+
+PORT = 8766
+
+
+def client(make_request, stop, results, rng):
+    while not stop.is_set():
+        request = make_request(rng)
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+                code = response.status
+        except urllib.error.HTTPError as exc:
+            exc.read()
+            code = exc.code
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            code = 'error'
+        results.append((code, time.perf_counter() - start))
+
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))] * 1000
+
+
+def run(enabled, args, env):
+    env = dict(env, SERVE_MODE='threaded', GUNICORN_BIND=f"127.0.0.1:{PORT}",
+               ADMISSION_CONTROL=str(enabled), GUNICORN_THREADS=str(args.threads),
+               ADMISSION_ELIGIBILITY_CONCURRENCY=str(args.eligibility_concurrency))
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+        cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{PORT}"
+
+    def eligibility(rng):
+        body = json.dumps({
+            "customer_id": rng.randint(1, args.customers),
+            "loan_amount": rng.randrange(50_000, 1_000_000, 10_000),
+            "interest_rate": round(rng.uniform(8, 18), 2),
+            "tenure": rng.choice((12, 24, 36)),
+        }).encode()
+        return urllib.request.Request(f"{base_url}/api/check-eligibility", data=body,
+                                      headers={"Content-Type": "application/json"})
+
+    def view_loans(rng):
+        return urllib.request.Request(f"{base_url}/api/view-loans/{rng.randint(1, args.customers)}")
+
+    try:
+        wait_until_ready(f"{base_url}/api/health/ready")
+        stop = threading.Event()
+        flood, reads = [], []
+        threads = [
+            threading.Thread(target=client, args=(eligibility, stop, flood, random.Random(i)))
+            for i in range(args.flood_clients)
+        ] + [
+            threading.Thread(target=client, args=(view_loans, stop, reads, random.Random(-i)))
+            for i in range(1, args.read_clients + 1)
+        ]
+        for t in threads:
+            t.start()
+        time.sleep(args.duration)
+        stop.set()
+        for t in threads:
+            t.join()
+    finally:
+        server.terminate()
+        server.wait()
+    return flood, reads
+
+
+def report(label, results, duration):
+    served = [latency for code, latency in results if code not in (429, 503, 'error')]
+    shed = sum(1 for code, _ in results if code in (429, 503))
+    errors = sum(1 for code, _ in results if code == 'error')
+    print(f"  {label:<18} {len(served) / duration:>8.1f} {percentile(served, 0.5):>8.1f} "
+          f"{percentile(served, 0.99):>8.1f} {shed:>6} {errors:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--flood-clients', type=int, default=48)
+    parser.add_argument('--read-clients', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--eligibility-concurrency', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--customers', type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+    customers, loans = seed(args.customers)
+    print(f"Seeded {customers} customers, {loans} loans; {args.flood_clients} check-eligibility "
+          f"and {args.read_clients} view-loans clients for {args.duration:.0f}s\n")
+
+    env = benchmark_env()
+    for enabled in (False, True):
+        flood, reads = run(enabled, args, env)
+        print(f"admission control {'on' if enabled else 'off'}")
+        print(f"  {'endpoint':<18} {'ok/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'shed':>6} {'errors':>7}")
+        report('check-eligibility', flood, args.duration)
+        report('view-loans', reads, args.duration)
+
+
+if __name__ == '__main__':
+    main()
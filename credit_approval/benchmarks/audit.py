@@ -0,0 +1,66 @@
+"""
+Decision audit cost on the request path: a synchronous DecisionAudit insert
+per decision versus AuditBuffer.record() with the background writer running,
+plus how long the writer takes to drain what was queued.
+
+Usage (from the directory containing manage.py):
+
+    python benchmarks/audit.py [--decisions 5000]
+"""
+import argparse
+import time
+from decimal import Decimal
+
+from workload import setup_django
+
+
+def entry(i):
+    from django.utils import timezone
+    return {
+        "endpoint": "check_eligibility",
+        "customer_id": str(i % 1000),
+        "decided_at": timezone.now(),
+        "inputs": {"loan_amount": "100000", "interest_rate": 12.0, "tenure": 12},
+        "score_components": {"over_limit": False, "paid_on_time": 25.0, "loan_count": 16,
+                             "current_year_activity": 8, "approved_volume": 21.5},
+        "credit_score": 70,
+        "slab": ">50",
+        "approved": True,
+        "corrected_interest_rate": 12.0,
+        "monthly_installment": Decimal("8884.88"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--decisions', type=int, default=5000)
+    args = parser.parse_args()
+
+    setup_django()
+    from core.audit import AuditBuffer
+    from core.models import DecisionAudit
+
+    DecisionAudit.objects.all().delete()
+    start = time.perf_counter()
+    for i in range(args.decisions):
+        DecisionAudit.objects.create(**entry(i))
+    sync = time.perf_counter() - start
+
+    buffer = AuditBuffer(max_size=args.decisions, batch_size=500, flush_interval=0.5)
+    buffer.start()
+    start = time.perf_counter()
+    for i in range(args.decisions):
+        buffer.record(entry(i))
+    queued = time.perf_counter() - start
+    buffer.close()
+    drained = time.perf_counter() - start
+    metrics = buffer.metrics()
+
+    print(f"synchronous insert   {sync * 1e6 / args.decisions:10.1f} us/decision")
+    print(f"buffered record()    {queued * 1e6 / args.decisions:10.1f} us/decision")
+    print(f"drained {metrics['written']} rows in {drained:.2f}s "
+          f"({metrics['flushes']} batches, {metrics['dropped']} dropped)")
+
+
+if __name__ == '__main__':
+    main()
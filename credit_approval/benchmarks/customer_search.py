@@ -0,0 +1,123 @@
+"""
+Customer search latency (core/search.py) at the 1M-customer scale.
+
+Bulk-loads synthetic customers into a separate SQLite file (reused between
+runs when it already holds enough rows), prints the query plan of each
+search so the index use is visible, then times random lookups per criterion
+through search_customers(), including a follow-up keyset page.
+
+Usage (from the directory containing manage.py):
+
+    python benchmarks/customer_search.py [--customers 1000000] [--lookups 500]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from workload import BASE_DIR, setup_django
+
+DB_PATH = BASE_DIR / 'benchmark_search.sqlite3'
+FIRST_NAMES = ['Aarav', 'Aditi', 'Amit', 'Ananya', 'Arjun', 'Deepa', 'Divya', 'Farhan', 'Gaurav', 'Ishaan',
+               'Kavya', 'Kiran', 'Lakshmi', 'Manish', 'Meera', 'Neha', 'Nikhil', 'Pooja', 'Priya', 'Rahul',
+               'Rajesh', 'Ravi', 'Rohan', 'Sanjay', 'Sneha', 'Sunita', 'Tanvi', 'Varun', 'Vikram', 'Zoya']
+LAST_NAMES = ['Agarwal', 'Banerjee', 'Bose', 'Chopra', 'Das', 'Desai', 'Gupta', 'Iyer', 'Jain', 'Joshi',
+              'Kapoor', 'Khan', 'Kumar', 'Mehta', 'Menon', 'Mishra', 'Nair', 'Patel', 'Pillai', 'Rao',
+              'Reddy', 'Sharma', 'Shah', 'Singh', 'Sinha', 'Thomas', 'Verma', 'Yadav']
+
+
+def phone_for(i):
+    # Distinct 10-digit numbers with well-spread trailing digits
+    return str(6_000_000_000 + (i * 7_919) % 4_000_000_000)
+
+
+def load(num_customers, rng):
+    from django.db import connection, transaction
+    from core.models import Customer
+
+    if Customer.objects.count() >= num_customers:
+        return
+    Customer.objects.all().delete()
+    start = time.perf_counter()
+    rows = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for i in range(1, num_customers + 1):
+            # Suffixes make names distinct enough that prefixes of 3+ letters are selective
+            rows.append((str(i), f"{rng.choice(FIRST_NAMES)}{rng.randint(1, 999)}",
+                         f"{rng.choice(LAST_NAMES)}{rng.randint(1, 999)}", rng.randint(21, 65),
+                         phone_for(i), 50000, 1800000, 0))
+            if len(rows) == 50_000 or i == num_customers:
+                cursor.executemany(
+                    "INSERT INTO core_customer (customer_id, first_name, last_name, age, phone_number,"
+                    " monthly_salary, approved_limit, version) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+                    rows,
+                )
+                rows = []
+        cursor.execute("ANALYZE")
+    print(f"Loaded {num_customers} customers in {time.perf_counter() - start:.1f}s")
+
+
+def show_plans(queries):
+    from django.db import connection
+    from core.search import CRITERIA, _next_prefix
+    from core.models import Customer
+
+    for criterion, value in queries:
+        expression, to_key, exact = CRITERIA[criterion]
+        key = to_key(value)
+        qs = Customer.objects.annotate(search_key=expression)
+        qs = qs.filter(search_key=key) if exact else qs.filter(
+            search_key__gte=key, search_key__lt=_next_prefix(key), search_key__startswith=key)
+        plan = qs.order_by('search_key', 'customer_id')[:21].explain()
+        if connection.vendor == 'sqlite':
+            plan = plan.splitlines()[-1]
+        print(f"  {criterion:<13} {plan.strip()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--customers', type=int, default=1_000_000)
+    parser.add_argument('--lookups', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django(DB_PATH)
+    from core.search import search_customers
+
+    rng = random.Random(7)
+    load(args.customers, rng)
+
+    def sample(criterion):
+        i = rng.randint(1, args.customers)
+        if criterion == 'phone':
+            return phone_for(i)
+        if criterion == 'phone_suffix':
+            return phone_for(i)[-4:]
+        names = FIRST_NAMES if criterion == 'first_name' else LAST_NAMES
+        return rng.choice(names)[:3].lower()
+
+    criteria = ('phone', 'phone_suffix', 'first_name', 'last_name')
+    print("Query plans:")
+    show_plans([(criterion, sample(criterion)) for criterion in criteria])
+
+    print(f"\n{'criterion':<13} {'p50 ms':>8} {'p99 ms':>8} {'page 2 p50':>11} {'avg rows':>9}")
+    for criterion in criteria:
+        first, second, rows = [], [], []
+        for _ in range(args.lookups):
+            value = sample(criterion)
+            start = time.perf_counter()
+            page, cursor = search_customers(criterion, value, limit=20)
+            first.append(time.perf_counter() - start)
+            rows.append(len(page))
+            if cursor:
+                start = time.perf_counter()
+                search_customers(criterion, value, limit=20, cursor=cursor)
+                second.append(time.perf_counter() - start)
+        first.sort()
+        print(f"{criterion:<13} {statistics.median(first) * 1000:>8.2f} "
+              f"{first[int(len(first) * 0.99)] * 1000:>8.2f} "
+              f"{statistics.median(second) * 1000 if second else float('nan'):>11.2f} "
+              f"{statistics.mean(rows):>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
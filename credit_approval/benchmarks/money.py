@@ -0,0 +1,90 @@
+"""
+EMI and limit-check arithmetic: float (the old implementation), Decimal,
+exact integer paise (core.money.emi_paise) and NumPy int64 paise
+(core.money.emi_paise_array). Also reports how often each result disagrees
+with the exact integer answer.
+
+Usage (from the directory containing manage.py):
+
+    python benchmarks/money.py [--loans 20000]
+"""
+import argparse
+import random
+import sys
+import time
+from decimal import ROUND_HALF_UP, Decimal, localcontext
+
+from workload import BASE_DIR
+
+sys.path.insert(0, str(BASE_DIR))
+from core.money import emi_paise, emi_paise_array, exceeds_share  # noqa: E402
+
+
+def float_emi(principal, tenure, rate):
+    if rate == 0:
+        return round(principal / tenure, 2)
+    r = rate / 12 / 100
+    return round(principal * r * (1 + r) ** tenure / ((1 + r) ** tenure - 1), 2)
+
+
+def decimal_emi(principal, tenure, rate):
+    with localcontext() as ctx:
+        ctx.prec = 34
+        if rate == 0:
+            emi = principal / tenure
+        else:
+            r = rate / 1200
+            growth = (1 + r) ** tenure
+            emi = principal * r * growth / (growth - 1)
+        return emi.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def timed(label, func, count):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1e9 / count:10.0f} ns/op")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--loans', type=int, default=20000)
+    args = parser.parse_args()
+
+    import numpy as np
+
+    rng = random.Random(11)
+    # Half the rates on the quarter-percent grid lenders usually quote, half arbitrary
+    loans = [
+        (rng.randrange(5_000_000, 500_000_000), rng.choice((6, 12, 24, 36, 60, 120, 240)),
+         rng.randrange(600, 2400, 25) if rng.random() < 0.5 else rng.randint(600, 2400))
+        for _ in range(args.loans)
+    ]
+    floats = [(p / 100, n, bp / 100) for p, n, bp in loans]
+    decimals = [(Decimal(p) / 100, n, Decimal(bp) / 100) for p, n, bp in loans]
+    principal, tenure, rate_bp = (np.array(column) for column in zip(*loans))
+
+    print(f"EMI over {args.loans} loans")
+    as_float = timed("float (old)", lambda: [float_emi(*loan) for loan in floats], args.loans)
+    as_decimal = timed("Decimal", lambda: [decimal_emi(*loan) for loan in decimals], args.loans)
+    exact = timed("integer paise (exact)", lambda: [emi_paise(*loan) for loan in loans], args.loans)
+    vectorized = timed("NumPy int64 paise", lambda: emi_paise_array(principal, tenure, rate_bp), args.loans)
+
+    exact = np.array(exact)
+    print("\nResults differing from exact integer paise:")
+    print(f"  float    {int(np.sum(np.rint(np.array(as_float) * 100) != exact))}")
+    print(f"  Decimal  {int(np.sum(np.array([int(d * 100) for d in as_decimal]) != exact))}")
+    print(f"  NumPy    {int(np.sum(vectorized != exact))}")
+
+    salaries = [(rng.randrange(2_000_000, 30_000_000), rng.randrange(0, 20_000_000)) for _ in range(args.loans)]
+    salaries_float = [(s / 100, e / 100) for s, e in salaries]
+    salaries_decimal = [(Decimal(s) / 100, Decimal(e) / 100) for s, e in salaries]
+    print(f"\n50%-of-salary checks over {args.loans} customers")
+    timed("float (old)", lambda: [e > s * 0.5 for s, e in salaries_float], args.loans)
+    timed("Decimal", lambda: [e > s * Decimal('0.5') for s, e in salaries_decimal], args.loans)
+    timed("integer paise", lambda: [exceeds_share(e, s, 1, 2) for s, e in salaries], args.loans)
+
+
+if __name__ == '__main__':
+    main()
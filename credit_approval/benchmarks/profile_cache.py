@@ -0,0 +1,88 @@
+"""
+Check-eligibility latency with and without the per-worker customer profile
+cache (core/profiles.py) on skewed traffic: customer IDs follow a Zipf-like
+distribution, so a small set of hot customers gets most requests.
+
+`--db-latency-ms` adds a delay to every query to stand in for a database
+on another host; the local SQLite file otherwise answers in microseconds.
+
+Usage (from the directory containing manage.py):
+
+    python benchmarks/profile_cache.py [--customers 20000] [--requests 5000] [--db-latency-ms 0.5]
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+from workload import seed, setup_django
+
+
+def zipf_ids(customer_ids, count, exponent, rng):
+    weights = [1 / (rank ** exponent) for rank in range(1, len(customer_ids) + 1)]
+    return rng.choices(customer_ids, weights=weights, k=count)
+
+
+def run(client, ids):
+    samples = []
+    for customer_id in ids:
+        start = time.perf_counter()
+        response = client.post('/api/check-eligibility', {
+            "customer_id": customer_id, "loan_amount": "100000", "interest_rate": 14.0, "tenure": 12,
+        }, content_type='application/json')
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.content
+    samples.sort()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--customers', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--exponent', type=float, default=1.1, help="Zipf skew")
+    parser.add_argument('--db-latency-ms', type=float, default=0.0)
+    args = parser.parse_args()
+
+    # Measure the view, not the rate limits in front of it
+    os.environ['ADMISSION_CONTROL'] = 'False'
+    setup_django()
+    seed(num_customers=args.customers)
+    from django.db import connection
+    from django.test import Client
+    from core import profiles
+    from core.models import Customer
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(args.db_latency_ms / 1000)
+        return execute(sql, params, many, context)
+
+    customer_ids = list(Customer.objects.values_list('pk', flat=True))
+    rng = random.Random(1)
+    rng.shuffle(customer_ids)
+    ids = zipf_ids(customer_ids, args.requests, args.exponent, rng)
+    client = Client()
+
+    print(f"{len(set(ids))} distinct customers in {len(ids)} requests, "
+          f"added query latency {args.db_latency_ms} ms")
+    print(f"{'profile cache':28} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+    results = {}
+    for label, max_entries in (("off", 0), ("on, 1000 entries", 1000), ("on, unbounded", args.customers)):
+        profiles.profile_cache = profiles.ProfileCache(max_entries=max_entries, max_bytes=1 << 40)
+        run(client, ids[:200])  # warm up the connection and code paths
+        with connection.execute_wrapper(delay):
+            samples = run(client, ids)
+        results[label] = profiles.profile_cache.metrics()
+        print(f"{label:28} {statistics.median(samples):8.2f} "
+              f"{samples[int(len(samples) * 0.99)]:8.2f} {statistics.mean(samples):8.2f}")
+
+    for label, metrics in results.items():
+        if metrics['entries']:
+            print(f"{label:28} hit rate {metrics['hit_rate']:.1%}, {metrics['entries']} entries, "
+                  f"{metrics['bytes'] / metrics['entries']:.0f} bytes/entry, "
+                  f"{metrics['bytes'] / 1024:.0f} KiB")
+
+
+if __name__ == '__main__':
+    main()
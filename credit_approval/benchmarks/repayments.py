@@ -0,0 +1,71 @@
+"""
+Repayment ingestion throughput: batched ingest_repayments against recording
+the same payments one at a time (the per-payment endpoint path).
+
+Usage (from the directory containing manage.py):
+
+    python benchmarks/repayments.py [--payments 20000] [--batch-size 2000]
+"""
+import argparse
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from workload import seed, setup_django
+
+
+def make_payments(loans, count, rng, used):
+    # One payment per (loan, due date); repeats would be skipped as duplicates
+    made = 0
+    while made < count:
+        loan_id, emi, approved_on = rng.choice(loans)
+        due = approved_on + timedelta(days=30 * rng.randint(1, 60))
+        if (loan_id, due) in used:
+            continue
+        used.add((loan_id, due))
+        made += 1
+        yield {
+            'loan_id': loan_id,
+            'amount': Decimal(emi),
+            'due_date': due,
+            'paid_on': due + timedelta(days=rng.choice((-3, -1, 0, 0, 0, 2, 10))),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--payments', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument('--single', type=int, default=1000,
+                        help='Payments recorded one at a time for the baseline')
+    parser.add_argument('--customers', type=int, default=5000)
+    args = parser.parse_args()
+
+    setup_django()
+    from core.analytics import refresh_rollups
+    from core.models import Loan
+    from core.repayments import ingest_repayments, record_repayment
+
+    seed(args.customers)
+    refresh_rollups(full=True)
+    loans = list(Loan.objects.values_list('loan_id', 'monthly_payment', 'date_of_approval'))
+    rng = random.Random(7)
+    used = set()
+
+    start = time.perf_counter()
+    for p in make_payments(loans, args.single, rng, used):
+        record_repayment(p['loan_id'], p['amount'], p['due_date'], p['paid_on'])
+    single_rate = args.single / (time.perf_counter() - start)
+
+    stats = ingest_repayments(make_payments(loans, args.payments, rng, used), batch_size=args.batch_size)
+
+    print(f"{len(loans)} loans")
+    print(f"one at a time : {single_rate:10.1f} payments/s ({args.single} payments)")
+    print(f"batched       : {stats['payments_per_second']:10.1f} payments/s "
+          f"({stats['recorded']} payments, batch size {args.batch_size})")
+    print(f"speed-up      : {stats['payments_per_second'] / single_rate:10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Credit scoring cost: the heuristic per customer versus the trained model
+(CREDIT_SCORER=model) for one eligibility request and for a batch re-score,
+plus how far the model's scores are from the heuristic it was trained on.
+
+Usage (from the directory containing manage.py):
+
+    python benchmarks/scoring.py [--customers 5000] [--requests 500]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from workload import seed, setup_django
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def time_single(scorer, customers):
+    from core.models import Loan
+    samples = []
+    for customer in customers:
+        start = time.perf_counter()
+        scorer.score(customer, Loan.objects.filter(customer=customer))
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--customers', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    seed(num_customers=args.customers)
+    from django.core.management import call_command
+    from core.models import Customer
+    from core.scoring import HeuristicScorer, ModelScorer
+
+    model_path = os.path.join(tempfile.mkdtemp(), 'credit_scorer.joblib')
+    call_command('train_scorer', output=model_path, verbosity=0)
+
+    customers = list(Customer.objects.order_by('pk'))
+    sample = customers[:args.requests]
+    heuristic = HeuristicScorer()
+    model = ModelScorer(model_path, budget_ms=10)
+
+    start = time.perf_counter()
+    model.load()
+    load_ms = (time.perf_counter() - start) * 1000
+    model.score(sample[0], sample[0].loans.all())  # first predict allocates scratch buffers
+
+    print(f"model load (mmap)    {load_ms:8.1f} ms")
+    print(f"{'single request':20} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, scorer in (("heuristic", heuristic), ("model", model)):
+        samples = time_single(scorer, sample)
+        print(f"{name:20} {statistics.median(samples):8.2f} {percentile(samples, 0.99):8.2f}")
+    print(f"model over budget    {model.stats['over_budget']} of {model.stats['requests']}")
+
+    print(f"{'batch re-score':20} {'us/customer':>12}")
+    results = {}
+    for name, scorer in (("heuristic", heuristic), ("model", model)):
+        start = time.perf_counter()
+        results[name] = scorer.score_many(customers)
+        elapsed = time.perf_counter() - start
+        print(f"{name:20} {elapsed * 1e6 / len(customers):12.1f}")
+
+    errors = [abs(results['model'][pk] - results['heuristic'][pk]) for pk in results['heuristic']]
+    print(f"model vs heuristic   mean |diff| {statistics.mean(errors):.2f} points, "
+          f"max {max(errors)}")
+
+
+if __name__ == '__main__':
+    main()
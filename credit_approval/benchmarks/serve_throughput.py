@@ -0,0 +1,132 @@
+"""
+Throughput comparison of the gunicorn serving modes (see gunicorn.conf.py).
+
+Seeds the benchmark workload, then for each SERVE_MODE starts gunicorn, waits
+for the readiness probe and drives a mixed workload from client threads:
+check-eligibility POSTs and view-loans GETs in a 1:1 ratio.
+
+Usage (from the directory containing manage.py):
+
+    python benchmarks/serve_throughput.py [--modes sync threaded asgi]
+        [--clients 16] [--duration 10] [--customers 1000]
+"""
+import argparse
+import json
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from workload import BASE_DIR, benchmark_env, seed, setup_django
+
+PORT = 8765
+
+
+def wait_until_ready(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server did not become ready at {url}")
+
+
+def client(base_url, num_customers, stop, latencies, errors, rng):
+    while not stop.is_set():
+        customer_id = rng.randint(1, num_customers)
+        if rng.random() < 0.5:
+            body = json.dumps({
+                "customer_id": customer_id,
+                "loan_amount": rng.randrange(50_000, 1_000_000, 10_000),
+                "interest_rate": round(rng.uniform(8, 18), 2),
+                "tenure": rng.choice((12, 24, 36)),
+            }).encode()
+            request = urllib.request.Request(
+                f"{base_url}/api/check-eligibility", data=body,
+                headers={"Content-Type": "application/json"},
+            )
+        else:
+            request = urllib.request.Request(f"{base_url}/api/view-loans/{customer_id}")
+
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                response.read()
+            latencies.append(time.perf_counter() - start)
+        except urllib.error.HTTPError as exc:
+            # 4xx responses are valid business outcomes, not failures
+            exc.read()
+            if exc.code >= 500:
+                errors.append(exc.code)
+            else:
+                latencies.append(time.perf_counter() - start)
+        except (urllib.error.URLError, ConnectionError, TimeoutError) as exc:
+            errors.append(exc)
+
+
+def run_mode(mode, args, env):
+    env = dict(env, SERVE_MODE=mode, GUNICORN_BIND=f"127.0.0.1:{PORT}")
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'],
+        cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{PORT}"
+    try:
+        wait_until_ready(f"{base_url}/api/health/ready")
+        stop = threading.Event()
+        latencies, errors = [], []
+        threads = [
+            threading.Thread(target=client, args=(
+                base_url, args.customers, stop, latencies, errors, random.Random(i)))
+            for i in range(args.clients)
+        ]
+        for t in threads:
+            t.start()
+        time.sleep(args.duration)
+        stop.set()
+        for t in threads:
+            t.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "rps": len(latencies) / args.duration,
+        "p50": statistics.median(latencies) * 1000 if latencies else float('nan'),
+        "p99": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else float('nan'),
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--modes', nargs='+', default=['sync', 'threaded', 'asgi'])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--customers', type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+    customers, loans = seed(args.customers)
+    print(f"Seeded {customers} customers, {loans} loans; "
+          f"{args.clients} clients for {args.duration:.0f}s per mode\n")
+
+    env = benchmark_env()
+    print(f"{'mode':<10} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for mode in args.modes:
+        r = run_mode(mode, args, env)
+        print(f"{r['mode']:<10} {r['rps']:>8.1f} {r['p50']:>8.1f} {r['p99']:>8.1f} {r['errors']:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""
+Cross-shard work with customers spread over 1..N SQLite shard files
+(core/sharding.py): a full analytics refresh and a name-prefix search, which
+fan out to every shard, and view-loan, which finds one shard through the
+loan directory.
+
+Each shard count runs in a fresh child process with its own temporary
+databases. `--db-latency-ms` adds a delay to every query to stand in for
+databases on other hosts; that wait is what the parallel fan-out overlaps.
+
+Usage (from the directory containing manage.py):
+
+    python benchmarks/sharding.py [--shards 1 2 4] [--customers 20000] [--db-latency-ms 1]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+from workload import BASE_DIR, setup_django
+
+
+def seed_shards(num_customers, loans_per_customer=4, seed_value=42):
+    from django.core.management import call_command
+    from django.conf import settings
+    from core.ids import allocator, register_loans
+    from core.models import Customer, Loan
+    from core.sharding import shard_for, use_shard
+
+    for alias in settings.SHARDS:
+        if alias != 'default':
+            call_command('migrate', database=alias, verbosity=0)
+
+    rng = random.Random(seed_value)
+    today = date.today()
+    customers = {alias: [] for alias in settings.SHARDS}
+    loans = {alias: [] for alias in settings.SHARDS}
+    loan_customers = {}
+    for i in range(1, num_customers + 1):
+        salary = rng.randrange(20_000, 200_000, 1000)
+        customer = Customer(
+            customer_id=str(i), first_name=f"First{i}", last_name=f"Last{i}", age=rng.randint(21, 65),
+            phone_number=str(9_000_000_000 + i), monthly_salary=Decimal(salary),
+            approved_limit=Decimal(round(36 * salary, -5)),
+        )
+        alias = shard_for(customer.customer_id)
+        customers[alias].append(customer)
+        for _ in range(rng.randint(0, 2 * loans_per_customer)):
+            loan_id = str(len(loan_customers) + 1)
+            tenure = rng.choice((6, 12, 24, 36, 60))
+            approved = today - timedelta(days=rng.randint(0, 6 * 365))
+            amount = Decimal(rng.randrange(50_000, 1_000_000, 10_000))
+            loans[alias].append(Loan(
+                loan_id=loan_id, customer=customer, loan_amount=amount, tenure=tenure,
+                interest_rate=round(rng.uniform(8, 18), 2),
+                monthly_payment=(amount / tenure).quantize(Decimal('1')),
+                emis_paid_on_time=rng.randint(0, tenure),
+                date_of_approval=approved, end_date=approved + timedelta(days=30 * tenure),
+            ))
+            loan_customers[loan_id] = customer.customer_id
+
+    for alias in settings.SHARDS:
+        with use_shard(alias):
+            Customer.objects.bulk_create(customers[alias], batch_size=5000)
+            Loan.objects.bulk_create(loans[alias], batch_size=5000)
+    register_loans(loan_customers)
+    allocator.advance_past('loan', len(loan_customers))
+    return list(loan_customers)
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def child(args):
+    # Measure the fan-out, not the rate limits in front of the views
+    os.environ['ADMISSION_CONTROL'] = 'False'
+    setup_django(Path(args.workdir) / 'default.sqlite3')
+    loan_ids = seed_shards(args.customers)
+
+    from django.db.backends.signals import connection_created
+    from django.test import Client
+    from core.analytics import refresh_rollups
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(args.db_latency_ms / 1000)
+        return execute(sql, params, many, context)
+
+    def add_delay(sender, connection, **kwargs):
+        connection.execute_wrappers.append(delay)
+
+    # Every thread's connection, including the fan-out pool's
+    connection_created.connect(add_delay)
+    from django.db import connections
+    for connection in connections.all():
+        connection.close()
+
+    client = Client()
+    rng = random.Random(1)
+    lookups = rng.sample(loan_ids, min(200, len(loan_ids)))
+
+    def view_loans():
+        for loan_id in lookups:
+            assert client.get(f'/api/view-loan/{loan_id}').status_code == 200
+
+    def search():
+        response = client.get('/api/customers/search', {"first_name": "first1", "limit": 50})
+        assert response.status_code == 200, response.content
+
+    print(json.dumps({
+        "refresh_ms": timed(lambda: refresh_rollups(full=True), args.repeat),
+        "search_ms": timed(search, args.repeat * 4),
+        "view_loan_ms": timed(view_loans, 1) / len(lookups),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--customers', type=int, default=20000)
+    parser.add_argument('--db-latency-ms', type=float, default=0.0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.workdir:
+        return child(args)
+
+    print(f"{args.customers} customers, added query latency {args.db_latency_ms} ms")
+    print(f"{'shards':>6} {'full refresh ms':>16} {'search ms':>10} {'view-loan ms':>13}")
+    for count in args.shards:
+        with tempfile.TemporaryDirectory() as workdir:
+            env = os.environ.copy()
+            env.pop('NEON_DATABASE_URL', None)
+            if count > 1:
+                env['SHARD_DATABASE_URLS'] = ','.join(
+                    f'sqlite:///{workdir}/shard{i}.sqlite3' for i in range(count))
+            else:
+                env.pop('SHARD_DATABASE_URLS', None)
+            output = subprocess.run(
+                [sys.executable, __file__, '--workdir', workdir, '--customers', str(args.customers),
+                 '--db-latency-ms', str(args.db_latency_ms), '--repeat', str(args.repeat)],
+                cwd=BASE_DIR, env=env, check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{count:>6} {result['refresh_ms']:16.1f} {result['search_ms']:10.2f} "
+                  f"{result['view_loan_ms']:13.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Worker cold-start benchmark.
+
+Boots the WSGI application in fresh interpreters the way a gunicorn worker
+does and reports wall-clock start time plus a `python -X importtime` breakdown
+of the slowest imports. Modules listed in HEAVY_MODULES must not be imported
+at boot; they belong to code paths such as `inject_data`.
+
+Usage (from the directory containing manage.py):
+
+    python benchmarks/startup.py [--runs 5] [--top 15]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+from workload import BASE_DIR, benchmark_env
+
+HEAVY_MODULES = ('pandas', 'numpy', 'scipy', 'sklearn', 'matplotlib', 'seaborn', 'xarray')
+
+BOOT_SNIPPET = (
+    "import sys;"
+    "from credit_approval.wsgi import application;"
+    "from django.urls import get_resolver;"
+    "get_resolver().url_patterns;"
+    "print(','.join(m for m in {heavy!r} if m in sys.modules))"
+).format(heavy=HEAVY_MODULES)
+
+
+def time_boot(env):
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-c', BOOT_SNIPPET],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    return time.perf_counter() - start, proc.stdout.strip()
+
+
+def import_times(env):
+    """Return [(cumulative_us, self_us, module)] parsed from -X importtime."""
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BOOT_SNIPPET],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), int(self_us), module.rstrip()[1:]))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    env = benchmark_env()
+    timings = []
+    heavy_loaded = ''
+    for _ in range(args.runs):
+        elapsed, heavy_loaded = time_boot(env)
+        timings.append(elapsed)
+
+    print(f"Worker cold start over {args.runs} runs:")
+    print(f"  min    {min(timings) * 1000:8.1f} ms")
+    print(f"  median {statistics.median(timings) * 1000:8.1f} ms")
+    print(f"  max    {max(timings) * 1000:8.1f} ms")
+
+    rows = import_times(env)
+    top_level = [r for r in rows if not r[2].startswith(' ')]
+    print(f"\nTotal import time: {sum(r[0] for r in top_level) / 1000:.1f} ms")
+    print(f"Top {args.top} imports by cumulative time:")
+    for cumulative_us, self_us, module in sorted(rows, reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  (self {self_us / 1000:6.1f} ms)  {module.strip()}")
+
+    if heavy_loaded:
+        print(f"\nFAIL: heavy modules imported at boot: {heavy_loaded}")
+        sys.exit(1)
+    print("\nOK: no heavy modules imported at boot")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Shared benchmark workload: a deterministic synthetic portfolio of customers
+and loans shaped like the sample spreadsheets.
+
+Benchmarks run against a throwaway SQLite file unless NEON_DATABASE_URL is
+already set, so they never touch a real database by accident.
+"""
+import os
+import random
+import sys
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_DB = BASE_DIR / 'benchmark.sqlite3'
+
+
+def benchmark_env(db_path=DEFAULT_DB):
+    env = os.environ.copy()
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'credit_approval.settings')
+    env.setdefault('SECRET_KEY', 'benchmark')
+    env.setdefault('NEON_DATABASE_URL', f'sqlite:///{db_path}')
+    return env
+
+
+def setup_django(db_path=DEFAULT_DB, migrate=True):
+    os.environ.update(benchmark_env(db_path))
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+
+    import django
+    django.setup()
+    if migrate:
+        from django.core.management import call_command
+        call_command('migrate', verbosity=0)
+
+
+def seed(num_customers=1000, loans_per_customer=4, seed_value=42):
+    """Replace all customers and loans with a reproducible synthetic portfolio."""
+    from core.models import Customer, Loan
+
+    rng = random.Random(seed_value)
+    today = date.today()
+
+    Loan.objects.all().delete()
+    Customer.objects.all().delete()
+
+    customers = []
+    for i in range(1, num_customers + 1):
+        salary = rng.randrange(20_000, 200_000, 1000)
+        customers.append(Customer(
+            customer_id=str(i),
+            first_name=f"First{i}",
+            last_name=f"Last{i}",
+            age=rng.randint(21, 65),
+            phone_number=str(9_000_000_000 + i),
+            monthly_salary=Decimal(salary),
+            approved_limit=Decimal(round(36 * salary, -5)),
+        ))
+    Customer.objects.bulk_create(customers, batch_size=5000)
+
+    loans = []
+    loan_id = 0
+    for customer in customers:
+        for _ in range(rng.randint(0, 2 * loans_per_customer)):
+            loan_id += 1
+            tenure = rng.choice((6, 12, 24, 36, 60))
+            approved = today - timedelta(days=rng.randint(0, 6 * 365))
+            amount = Decimal(rng.randrange(50_000, 1_000_000, 10_000))
+            loans.append(Loan(
+                loan_id=str(loan_id),
+                customer=customer,
+                loan_amount=amount,
+                tenure=tenure,
+                interest_rate=round(rng.uniform(8, 18), 2),
+                monthly_payment=(amount / tenure).quantize(Decimal('1')),
+                emis_paid_on_time=rng.randint(0, tenure),
+                date_of_approval=approved,
+                end_date=approved + timedelta(days=30 * tenure),
+            ))
+    Loan.objects.bulk_create(loans, batch_size=5000)
+    return len(customers), len(loans)
@@ -0,0 +1,224 @@
+"""
+Admission control: per-endpoint concurrency limits and token-bucket rate
+limits, enforced before the view runs so that a burst of expensive requests
+fails fast instead of queueing on database connections.
+
+Limits are configured per URL name in `ADMISSION_POLICIES`:
+
+- over its rate, a request is rejected with 429 and a `Retry-After` header;
+- over a concurrency limit, it waits up to `ADMISSION_QUEUE_TIMEOUT` seconds
+  for a slot and is then rejected with 503 and `Retry-After`;
+- `ADMISSION_MAX_CONCURRENCY` caps requests in flight across all endpoints,
+  and the last `ADMISSION_PRIORITY_RESERVE` slots only admit endpoints in the
+  priority class (loan reads, health probes), so they keep flowing while the
+  expensive endpoints are shedding.
+
+Counters live in shared memory allocated when this module is imported. With
+gunicorn's preload_app that happens in the master, so every forked worker
+sees the same limits and metrics. In-flight counts are also kept per worker
+so the master can return a dead worker's slots (gunicorn's child_exit hook).
+"""
+import math
+import multiprocessing
+import os
+import time
+
+from django.conf import settings
+from django.http import JsonResponse
+
+OTHER = 'other'  # every URL name without a policy
+STATS = ('admitted', 'queued', 'shed_rate_limited', 'shed_overloaded')
+MAX_WORKERS = 64  # processes that get their own in-flight row
+POLL_INTERVAL = 0.005
+
+
+class AdmissionController:
+    def __init__(self, policies, max_concurrency, priority_reserve, queue_timeout):
+        self.names = [name for name in policies if name != OTHER] + [OTHER]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.policies = [policies.get(name, {}) for name in self.names]
+        self.max_concurrency = max_concurrency
+        self.priority_reserve = priority_reserve
+        self.queue_timeout = queue_timeout
+
+        count = len(self.names)
+        self._lock = multiprocessing.Lock()
+        self._inflight = multiprocessing.RawArray('i', count)
+        self._worker_pids = multiprocessing.RawArray('i', MAX_WORKERS)
+        self._worker_inflight = multiprocessing.RawArray('i', MAX_WORKERS * count)
+        self._tokens = multiprocessing.RawArray('d', count)
+        self._refilled = multiprocessing.RawArray('d', count)
+        self._stats = multiprocessing.RawArray('q', count * len(STATS))
+        now = time.monotonic()
+        for i, policy in enumerate(self.policies):
+            self._tokens[i] = policy.get('burst') or policy.get('rate') or 0
+            self._refilled[i] = now
+        self._row = None
+        self._row_pid = None
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            policies=settings.ADMISSION_POLICIES,
+            max_concurrency=settings.ADMISSION_MAX_CONCURRENCY,
+            priority_reserve=settings.ADMISSION_PRIORITY_RESERVE,
+            queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+        )
+
+    # The helpers below expect self._lock to be held
+
+    def _stat(self, i, name):
+        self._stats[i * len(STATS) + STATS.index(name)] += 1
+
+    def _take_token(self, i):
+        """Consume one token; returns None, or the seconds until one is available."""
+        rate = self.policies[i].get('rate')
+        if not rate:
+            return None
+        burst = self.policies[i].get('burst') or rate
+        # CLOCK_MONOTONIC is system-wide, so workers agree on elapsed time
+        now = time.monotonic()
+        tokens = min(burst, self._tokens[i] + (now - self._refilled[i]) * rate)
+        self._refilled[i] = now
+        if tokens >= 1:
+            self._tokens[i] = tokens - 1
+            return None
+        self._tokens[i] = tokens
+        return max(1, math.ceil((1 - tokens) / rate))
+
+    def _has_capacity(self, i):
+        policy = self.policies[i]
+        if self.max_concurrency:
+            limit = self.max_concurrency
+            if not policy.get('priority'):
+                limit -= self.priority_reserve
+            if sum(self._inflight) >= limit:
+                return False
+        concurrency = policy.get('concurrency')
+        return not concurrency or self._inflight[i] < concurrency
+
+    def _acquire(self, i, delta=1):
+        self._inflight[i] += delta
+        if self._row is not None:
+            self._worker_inflight[self._row * len(self.names) + i] += delta
+
+    def _claim_row(self):
+        pid = os.getpid()
+        if self._row_pid == pid:
+            return
+        # First request in this process (or first after a fork)
+        self._row_pid, self._row = pid, None
+        for row in range(MAX_WORKERS):
+            if self._worker_pids[row] in (0, pid):
+                self._worker_pids[row] = pid
+                self._row = row
+                return
+
+    def admit(self, name):
+        """
+        Admit a request for URL name `name`. Returns None when admitted (call
+        `release(name)` when it finishes), or (status code, retry after seconds).
+        """
+        i = self.index.get(name, self.index[OTHER])
+        with self._lock:
+            self._claim_row()
+            retry_after = self._take_token(i)
+            if retry_after is not None:
+                self._stat(i, 'shed_rate_limited')
+                return 429, retry_after
+            if self._has_capacity(i):
+                self._acquire(i)
+                self._stat(i, 'admitted')
+                return None
+            self._stat(i, 'queued')
+
+        deadline = time.monotonic() + self.queue_timeout
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            with self._lock:
+                if self._has_capacity(i):
+                    self._acquire(i)
+                    self._stat(i, 'admitted')
+                    return None
+
+        with self._lock:
+            self._stat(i, 'shed_overloaded')
+            # Not served, so the request does not count against the rate limit
+            rate = self.policies[i].get('rate')
+            if rate:
+                self._tokens[i] = min(self.policies[i].get('burst') or rate, self._tokens[i] + 1)
+        return 503, max(1, math.ceil(self.queue_timeout))
+
+    def release(self, name):
+        i = self.index.get(name, self.index[OTHER])
+        with self._lock:
+            self._acquire(i, -1)
+
+    def release_worker(self, pid):
+        """Return the slots held by a worker process that exited mid-request."""
+        count = len(self.names)
+        with self._lock:
+            for row in range(MAX_WORKERS):
+                if self._worker_pids[row] != pid:
+                    continue
+                for i in range(count):
+                    self._inflight[i] -= self._worker_inflight[row * count + i]
+                    self._worker_inflight[row * count + i] = 0
+                self._worker_pids[row] = 0
+
+    def metrics(self):
+        with self._lock:
+            endpoints = {}
+            for i, name in enumerate(self.names):
+                policy = self.policies[i]
+                stats = self._stats[i * len(STATS):(i + 1) * len(STATS)]
+                endpoints[name] = dict(
+                    zip(STATS, stats),
+                    priority=bool(policy.get('priority')),
+                    in_flight=self._inflight[i],
+                    concurrency_limit=policy.get('concurrency'),
+                    rate_limit=policy.get('rate'),
+                    tokens=round(self._tokens[i], 2) if policy.get('rate') else None,
+                )
+            in_flight = sum(self._inflight)
+        return {
+            "enabled": settings.ADMISSION_CONTROL,
+            "in_flight": in_flight,
+            "max_concurrency": self.max_concurrency,
+            "priority_reserve": self.priority_reserve,
+            "queue_timeout": self.queue_timeout,
+            "endpoints": endpoints,
+        }
+
+
+controller = AdmissionController.from_settings()
+
+
+class AdmissionControlMiddleware:
+    """Applies `controller` to every resolved view; see the module docstring."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            name = getattr(request, 'admitted_as', None)
+            if name is not None:
+                controller.release(name)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not settings.ADMISSION_CONTROL:
+            return None
+        name = request.resolver_match.url_name
+        shed = controller.admit(name)
+        if shed is None:
+            request.admitted_as = name
+            return None
+
+        status_code, retry_after = shed
+        detail = "Rate limit exceeded." if status_code == 429 else "Server is at capacity."
+        response = JsonResponse({"detail": detail}, status=status_code)
+        response['Retry-After'] = str(retry_after)
+        return response
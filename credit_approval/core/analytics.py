@@ -0,0 +1,278 @@
+"""
+Portfolio analytics backed by rollup tables.
+
+PortfolioRollup holds additive loan measures per (age band, salary band,
+approval month, end month) and SegmentRollup holds customer counts and
+approved limits per band. Both are refreshed from SQL aggregates:
+
+- incrementally, by recomputing the approval months at or after the
+  watermark kept in RollupState plus every month logged in RollupChange
+  (`refresh_analytics`, or the refresh_analytics job);
+- fully, after bulk ingestion or on demand (`refresh_analytics --full`).
+
+Requests never touch the rollups. A new customer, an approved loan or a
+repayment only appends a RollupChange row on the default database, after
+its own write has committed, so writers never wait on each other or on a
+refresh. A refresh recomputes the logged months from the source tables
+instead of adding increments, so nothing is counted twice.
+
+Every refresh bumps RollupState.generation, which is part of the cache key,
+so summaries are served from cache until the next refresh.
+"""
+from datetime import datetime
+
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models.functions import ExtractYear, TruncMonth
+from django.utils import timezone
+
+from .models import Customer, Loan, PortfolioRollup, RollupChange, RollupState, SegmentRollup
+from .sharding import fan_out
+
+# (exclusive upper bound, label); the last band is open-ended
+AGE_BANDS = ((30, '<30'), (45, '30-44'), (60, '45-59'), (None, '60+'))
+SALARY_BANDS = ((50000, '<50k'), (100000, '50k-1L'), (200000, '1L-2L'), (None, '2L+'))
+UNKNOWN_BAND = 'unknown'
+
+DIMENSIONS = ('age_band', 'salary_band')
+
+MEASURES = {
+    'loan_count': models.Count('pk'),
+    'principal': models.Sum('loan_amount'),
+    'monthly_payment': models.Sum('monthly_payment'),
+    'total_emis': models.Sum('tenure'),
+    'emis_paid_on_time': models.Sum('emis_paid_on_time'),
+}
+
+
+def band_expression(field, bands):
+    whens = [models.When(**{f'{field}__isnull': True}, then=models.Value(UNKNOWN_BAND))]
+    whens += [
+        models.When(**{f'{field}__lt': upper}, then=models.Value(label))
+        for upper, label in bands if upper is not None
+    ]
+    return models.Case(*whens, default=models.Value(bands[-1][1]), output_field=models.CharField())
+
+
+def band_for(value, bands):
+    if value is None:
+        return UNKNOWN_BAND
+    for upper, label in bands:
+        if upper is None or value < upper:
+            return label
+
+
+def _bump_generation(state):
+    state.generation += 1
+    state.refreshed_at = timezone.now()
+
+
+def _merge_shard_rows(shard_rows, key_fields, measures):
+    """Add up per-shard aggregate rows that share the same key."""
+    merged = {}
+    for rows in shard_rows.values():
+        for row in rows:
+            key = tuple(row[field] for field in key_fields)
+            if key in merged:
+                for measure in measures:
+                    merged[key][measure] += row[measure]
+            else:
+                merged[key] = dict(row)
+    return list(merged.values())
+
+
+def _segment_rows(alias):
+    return list(
+        Customer.objects
+        .annotate(age_band=band_expression('age', AGE_BANDS),
+                  salary_band=band_expression('monthly_salary', SALARY_BANDS))
+        .values(*DIMENSIONS)
+        .annotate(models.Count('pk'), models.Sum('approved_limit'))
+        .order_by()
+    )
+
+
+def _loan_rows(approved):
+    loans = Loan.objects.all()
+    if approved is not None:
+        loans = loans.filter(approved)
+    return list(
+        loans
+        .annotate(age_band=band_expression('customer__age', AGE_BANDS),
+                  salary_band=band_expression('customer__monthly_salary', SALARY_BANDS),
+                  approval_month=TruncMonth('date_of_approval'),
+                  end_month=TruncMonth('end_date'))
+        .values(*DIMENSIONS, 'approval_month', 'end_month')
+        # Aliased so the annotations do not clash with Loan field names
+        .annotate(**{f'rollup_{name}': aggregate for name, aggregate in MEASURES.items()})
+        .order_by()
+    )
+
+
+def _next_month(month):
+    return month.replace(year=month.year + month.month // 12, month=month.month % 12 + 1)
+
+
+def _stale_months(since, months):
+    """(loan filter, rollup filter) for approval months >= `since` or in `months`."""
+    approved = models.Q(date_of_approval__gte=since)
+    rollups = models.Q(approval_month__gte=since)
+    for month in sorted(m for m in months if m < since):
+        # Ranges rather than TruncMonth, so the approval date index is used
+        approved |= models.Q(date_of_approval__gte=month, date_of_approval__lt=_next_month(month))
+        rollups |= models.Q(approval_month=month)
+    return approved, rollups
+
+
+def _take_changes():
+    """Delete the logged changes; returns (approval months, whether customers changed)."""
+    changes = list(RollupChange.objects.values_list('pk', 'approval_month'))
+    # By primary key: rows logged after the read above stay for the next refresh
+    pks = [pk for pk, _ in changes]
+    for start in range(0, len(pks), 1000):
+        RollupChange.objects.filter(pk__in=pks[start:start + 1000]).delete()
+    months = {month for _, month in changes}
+    return months - {None}, None in months
+
+
+def _refresh_segments():
+    # Every measure is additive, so per-shard rows are summed (core.sharding)
+    rows = _merge_shard_rows(fan_out(_segment_rows), DIMENSIONS, ('pk__count', 'approved_limit__sum'))
+    SegmentRollup.objects.all().delete()
+    SegmentRollup.objects.bulk_create([
+        SegmentRollup(age_band=row['age_band'], salary_band=row['salary_band'],
+                      customer_count=row['pk__count'], approved_limit=row['approved_limit__sum'])
+        for row in rows
+    ])
+
+
+def refresh_rollups(full=False):
+    """
+    Bring the rollup tables up to date. Returns the number of rollup rows
+    rewritten.
+    """
+    current_month = datetime.now().date().replace(day=1)
+
+    with transaction.atomic():
+        state, _ = RollupState.objects.select_for_update().get_or_create(pk=1)
+        # Writers log a change after their own commit, so every change read
+        # here is already visible to the aggregates below
+        months, customers_changed = _take_changes()
+        since = None if full else state.watermark
+
+        stale = PortfolioRollup.objects.all()
+        approved = None
+        if since is not None:
+            approved, rollups = _stale_months(since, months)
+            stale = stale.filter(rollups)
+
+        rows = _merge_shard_rows(
+            fan_out(lambda alias: _loan_rows(approved)),
+            (*DIMENSIONS, 'approval_month', 'end_month'),
+            [f'rollup_{name}' for name in MEASURES],
+        )
+        stale.delete()
+        created = PortfolioRollup.objects.bulk_create(
+            [PortfolioRollup(**{k.removeprefix('rollup_'): v for k, v in row.items()}) for row in rows],
+            batch_size=1000,
+        )
+
+        if since is None or customers_changed:
+            _refresh_segments()
+
+        state.watermark = current_month
+        _bump_generation(state)
+        state.save()
+    return len(created)
+
+
+def record_new_customer():
+    """Log a newly registered customer for the next refresh of the segment rollup."""
+    RollupChange.objects.create(approval_month=None)
+
+
+def record_loan_changes(approval_months):
+    """
+    Log the approval months of loans that were created or changed, once those
+    writes have committed, for the next refresh to recompute.
+    """
+    months = {month.replace(day=1) for month in approval_months}
+    if months:
+        RollupChange.objects.bulk_create([RollupChange(approval_month=month) for month in sorted(months)])
+
+
+def _as_float(value):
+    return float(value or 0)
+
+
+def _metrics(totals, active, segment):
+    # Rows come from Sum() aggregates and use Django's default "<field>__sum" aliases
+    total_emis = totals.get('total_emis__sum') or 0
+    outstanding = _as_float(active.get('principal__sum'))
+    approved_limit = _as_float(segment.get('approved_limit__sum'))
+    return {
+        "customer_count": segment.get('customer_count__sum') or 0,
+        "loan_count": totals.get('loan_count__sum') or 0,
+        "active_loan_count": active.get('loan_count__sum') or 0,
+        "outstanding_principal": outstanding,
+        "active_emi_volume": _as_float(active.get('monthly_payment__sum')),
+        "on_time_ratio": round(totals['emis_paid_on_time__sum'] / total_emis, 4) if total_emis else None,
+        "approved_limit": approved_limit,
+        "utilization": round(outstanding / approved_limit, 4) if approved_limit else None,
+    }
+
+
+def _compute_summary(group_by, current_month):
+    loan_sums = [models.Sum(name) for name in MEASURES]
+    limit_sums = [models.Sum('customer_count'), models.Sum('approved_limit')]
+    rollups = PortfolioRollup.objects.all()
+    # Loans ending this month count as outstanding until the month closes
+    active = rollups.filter(end_month__gte=current_month)
+
+    def by_segment(queryset, aggregates):
+        return {
+            tuple(row[d] for d in group_by): row
+            for row in queryset.values(*group_by).annotate(*aggregates).order_by()
+        }
+
+    segment_totals = by_segment(rollups, loan_sums)
+    segment_active = by_segment(active, loan_sums)
+    segment_limits = by_segment(SegmentRollup.objects.all(), limit_sums)
+
+    segments = []
+    for key in sorted(set(segment_totals) | set(segment_limits)):
+        entry = dict(zip(group_by, key))
+        entry.update(_metrics(segment_totals.get(key, {}), segment_active.get(key, {}),
+                              segment_limits.get(key, {})))
+        segments.append(entry)
+
+    by_year = [
+        {"year": row['year'], "loan_count": row['loan_count__sum'], "principal": _as_float(row['principal__sum'])}
+        for row in rollups.annotate(year=ExtractYear('approval_month')).values('year')
+        .annotate(models.Sum('loan_count'), models.Sum('principal'))
+        .order_by('year')
+    ]
+
+    return {
+        "totals": _metrics(rollups.aggregate(*loan_sums), active.aggregate(*loan_sums),
+                           SegmentRollup.objects.aggregate(*limit_sums)),
+        "loans_by_approval_year": by_year,
+        "segments": segments,
+    }
+
+
+def portfolio_summary(group_by=DIMENSIONS):
+    """Portfolio totals and per-segment metrics, cached until the next refresh."""
+    state = RollupState.objects.filter(pk=1).values('generation', 'refreshed_at').first()
+    if state is None:
+        refresh_rollups(full=True)
+        state = RollupState.objects.filter(pk=1).values('generation', 'refreshed_at').first()
+
+    current_month = datetime.now().date().replace(day=1)
+    key = f"portfolio:{state['generation']}:{current_month:%Y-%m}:{'+'.join(group_by)}"
+    summary = cache.get(key)
+    if summary is None:
+        summary = _compute_summary(group_by, current_month)
+        cache.set(key, summary, timeout=None)
+
+    return dict(summary, refreshed_at=state['refreshed_at'], group_by=list(group_by))
@@ -0,0 +1,192 @@
+"""
+Buffered decision audit log.
+
+Views call `record_decision`, which only puts a dict on a bounded in-process
+queue. A background writer thread drains the queue and writes DecisionAudit
+rows with bulk_create when `AUDIT_BATCH_SIZE` entries are waiting or every
+`AUDIT_FLUSH_INTERVAL` seconds, and flushes once more when the worker exits.
+
+When the queue is full the entry is dropped and counted instead of blocking
+the request; `audit_metrics()` exposes the counters per worker.
+
+The writer is started by the serving process (gunicorn's post_worker_init
+hook) and closed by worker_exit. Without it (tests, runserver) a full batch
+is written inline by the request that filled it, and whatever is still
+queued is flushed when the process exits.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import DecisionAudit
+
+logger = logging.getLogger(__name__)
+
+
+class AuditBuffer:
+    def __init__(self, max_size, batch_size, flush_interval):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_size)
+        self._flush_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = os.getpid()
+        self._exit_registered = False
+        self._stats = {"enqueued": 0, "written": 0, "dropped": 0, "failed": 0, "flushes": 0}
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def _reset_after_fork(self):
+        # Locks, queue and thread inherited from a parent process are unusable
+        self.__init__(self.max_size, self.batch_size, self.flush_interval)
+
+    def _flush_at_exit(self):
+        # Once per process, whether or not the writer is ever started
+        if not self._exit_registered:
+            self._exit_registered = True
+            atexit.register(self.close)
+
+    def start(self):
+        """Start the background writer for this process (idempotent)."""
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+        self._flush_at_exit()
+
+    def record(self, entry):
+        """Queue one audit entry without blocking. Returns False if it was dropped."""
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+        self._flush_at_exit()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("enqueued")
+
+        if self._queue.qsize() >= self.batch_size:
+            if self._thread is not None:
+                self._wake.set()
+            else:
+                self.flush()
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+            close_old_connections()
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self):
+        """Write every queued entry in batches. Returns the number written."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._drain(self.batch_size)
+                if not batch:
+                    break
+                try:
+                    DecisionAudit.objects.bulk_create([DecisionAudit(**entry) for entry in batch])
+                except Exception:
+                    logger.exception("Dropping %d audit records after a failed write", len(batch))
+                    self._count("failed", len(batch))
+                    break
+                written += len(batch)
+                self._count("written", len(batch))
+                self._count("flushes")
+        return written
+
+    def close(self, timeout=5):
+        """Stop the writer (if running) and flush what is left; called on process exit."""
+        if self._pid != os.getpid():
+            return
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def metrics(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats.update({
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self.max_size,
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "writer_running": self._thread is not None and self._thread.is_alive(),
+            "pid": os.getpid(),
+        })
+        return stats
+
+
+audit_buffer = AuditBuffer(
+    max_size=settings.AUDIT_QUEUE_SIZE,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_interval=settings.AUDIT_FLUSH_INTERVAL,
+)
+
+
+def slab_for(credit_score):
+    """Label of the interest rate slab a credit score falls in."""
+    if credit_score > 50:
+        return ">50"
+    if credit_score > 30:
+        return "30-50"
+    if credit_score > 10:
+        return "10-30"
+    return "<=10"
+
+
+def record_decision(endpoint, customer_id, data, credit_score, components, slab, approved,
+                    corrected_interest_rate, monthly_installment, loan_id=None, message=""):
+    return audit_buffer.record({
+        "endpoint": endpoint,
+        "customer_id": str(customer_id),
+        "decided_at": timezone.now(),
+        "inputs": {
+            "loan_amount": str(data['loan_amount']),
+            "interest_rate": data['interest_rate'],
+            "tenure": data['tenure'],
+        },
+        "score_components": components,
+        "credit_score": credit_score,
+        "slab": slab,
+        "approved": approved,
+        "corrected_interest_rate": corrected_interest_rate,
+        "monthly_installment": monthly_installment,
+        "loan_id": loan_id,
+        "message": message,
+    })
+
+
+def audit_metrics():
+    return audit_buffer.metrics()
@@ -0,0 +1,111 @@
+"""
+Central ID allocation for customers and loans.
+
+IDs come from IdSequence rows on the default database, so they are unique
+across every shard. Each process reserves a block of ID_BLOCK_SIZE IDs at a
+time with one locked UPDATE and hands them out from memory. IDs are
+therefore unique and increasing per process, but not gap-free or globally
+ordered. A sequence starts above the largest numeric ID already stored, so
+imported data (`inject_data`) is never reused.
+
+With sharding on, every allocated loan ID is also recorded in LoanDirectory
+with its customer, which is how `view-loan/<loan_id>` finds the loan's shard.
+The entry is written before the loan and removed again if the loan's insert
+fails.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.functions import Cast
+
+from .models import Customer, IdSequence, Loan, LoanDirectory
+from .sharding import fan_out, is_sharded
+
+SEQUENCES = {
+    'customer': (Customer, 'customer_id'),
+    'loan': (Loan, 'loan_id'),
+}
+
+
+def _largest_stored_id(name):
+    model, field = SEQUENCES[name]
+
+    def largest(alias):
+        return model.objects.filter(**{f'{field}__regex': r'^[0-9]+$'}).aggregate(
+            largest=models.Max(Cast(field, models.BigIntegerField()))
+        )['largest'] or 0
+
+    return max(fan_out(largest).values())
+
+
+class IdAllocator:
+    def __init__(self, block_size):
+        self.block_size = block_size
+        self._blocks = {}  # sequence name -> [next, end)
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def reserve(self, name, count):
+        """Reserve `count` consecutive IDs; returns the first."""
+        with transaction.atomic(using='default'):
+            if not IdSequence.objects.filter(name=name).exists():
+                IdSequence.objects.get_or_create(name=name, defaults={"next_value": _largest_stored_id(name) + 1})
+            sequence = IdSequence.objects.select_for_update().get(name=name)
+            first = sequence.next_value
+            sequence.next_value = first + count
+            sequence.save(update_fields=['next_value'])
+        return first
+
+    def next_id(self, name):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Blocks reserved before a fork would be handed out twice
+                self._blocks = {}
+                self._pid = os.getpid()
+            block = self._blocks.get(name)
+            if block is None or block[0] >= block[1]:
+                first = self.reserve(name, self.block_size)
+                block = self._blocks[name] = [first, first + self.block_size]
+            value = block[0]
+            block[0] += 1
+        return str(value)
+
+    def advance_past(self, name, value):
+        """Make sure IDs allocated from now on are greater than `value` (after an import)."""
+        with self._lock:
+            self._blocks.pop(name, None)
+        with transaction.atomic(using='default'):
+            updated = IdSequence.objects.filter(name=name, next_value__lte=value).update(next_value=value + 1)
+        return bool(updated)
+
+
+allocator = IdAllocator(settings.ID_BLOCK_SIZE)
+
+
+def allocate_customer_id():
+    return allocator.next_id('customer')
+
+
+def allocate_loan_id(customer_id):
+    loan_id = allocator.next_id('loan')
+    if is_sharded():
+        LoanDirectory.objects.create(loan_id=loan_id, customer_id=customer_id)
+    return loan_id
+
+
+def release_loan_id(loan_id):
+    """Forget a loan ID whose insert failed, so the directory only lists stored loans."""
+    if is_sharded():
+        LoanDirectory.objects.filter(loan_id=loan_id).delete()
+
+
+def register_loans(loan_customers):
+    """Record {loan_id: customer_id} for loans stored with their own IDs (imports)."""
+    if not is_sharded() or not loan_customers:
+        return
+    LoanDirectory.objects.bulk_create(
+        [LoanDirectory(loan_id=loan_id, customer_id=customer_id) for loan_id, customer_id in loan_customers.items()],
+        update_conflicts=True, unique_fields=['loan_id'], update_fields=['customer_id'], batch_size=1000,
+    )
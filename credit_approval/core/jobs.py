@@ -0,0 +1,455 @@
+"""
+Background jobs for work too slow for a request: repayment file ingestion,
+re-scoring customers, analytics refreshes (see core/tasks.py).
+
+A task is a function registered with `@task`. It is called with a
+`progress(done, total=None)` callback and the job's JSON params, and returns
+a JSON-serializable result. `enqueue(task_name, **params)` stores a job and
+returns its id; `python manage.py run_jobs` claims jobs and runs them in a
+process pool, retrying failures with exponential backoff up to the task's
+`max_retries`.
+
+Jobs, progress and results are kept by the backend named in `JOBS_BACKEND`:
+
+- `database`: the Job table, so it works anywhere the app does (SQLite
+  locally). Claims are compare-and-set UPDATEs, safe across workers.
+- `redis`: a hash per job plus a list (ready jobs) and a sorted set (jobs
+  waiting to retry) at `JOBS_REDIS_URL`. Claiming moves the id onto a
+  processing list in the same step, so a claimed job is never only in a
+  worker's memory. Finished jobs expire after `JOBS_RESULT_TTL` seconds.
+
+A claimed job holds a lease of `JOBS_LEASE_SECONDS`, renewed by a heartbeat
+thread while it runs. If its worker dies, the lease runs out and the next
+claim retries the job (or fails it once retries are used up). A pool child
+that dies takes the pool with it; the worker rebuilds the pool and retries
+the jobs that were in it.
+"""
+import inspect
+import json
+import logging
+import signal
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, connections, models
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+PENDING = (Job.QUEUED, Job.RETRYING)
+
+# Atomically take the oldest ready job onto the processing list and lease it
+CLAIM_SCRIPT = """
+local job_id = redis.call('LMOVE', KEYS[1], KEYS[2], 'RIGHT', 'LEFT')
+if job_id then
+    redis.call('ZADD', KEYS[3], ARGV[1], job_id)
+end
+return job_id
+"""
+# Re-lease expired jobs to the caller, so only one worker recovers each
+TAKE_EXPIRED_SCRIPT = """
+local job_ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, 100)
+for _, job_id in ipairs(job_ids) do
+    redis.call('ZADD', KEYS[1], ARGV[2], job_id)
+end
+return job_ids
+"""
+
+
+def _lease_expiry():
+    return timezone.now() + timedelta(seconds=settings.JOBS_LEASE_SECONDS)
+
+
+class Task:
+    def __init__(self, func, name, max_retries, retry_delay):
+        self.func = func
+        self.name = name
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+    def check_params(self, params):
+        """Raise TypeError if `params` do not match the task's signature."""
+        inspect.signature(self.func).bind(None, **params)
+
+
+def task(name=None, max_retries=None, retry_delay=None):
+    def register(func):
+        TASKS[name or func.__name__] = Task(
+            func,
+            name or func.__name__,
+            settings.JOBS_MAX_RETRIES if max_retries is None else max_retries,
+            settings.JOBS_RETRY_DELAY if retry_delay is None else retry_delay,
+        )
+        return func
+    return register
+
+
+class DatabaseBackend:
+    def enqueue(self, job):
+        Job.objects.create(**job)
+
+    def claim(self):
+        now = timezone.now()
+        candidates = (
+            Job.objects.filter(status__in=PENDING, run_after__lte=now)
+            .order_by('run_after').values_list('pk', flat=True)[:10]
+        )
+        for pk in candidates:
+            # Compare-and-set: only one worker's UPDATE matches a pending row
+            claimed = Job.objects.filter(pk=pk, status__in=PENDING).update(
+                status=Job.RUNNING, attempts=models.F('attempts') + 1, started_at=now, error='',
+                lease_expires_at=_lease_expiry(),
+            )
+            if claimed:
+                return self.get(pk)
+        return None
+
+    def heartbeat(self, job_id):
+        Job.objects.filter(pk=job_id, status=Job.RUNNING).update(lease_expires_at=_lease_expiry())
+
+    def expired(self):
+        """Running jobs whose lease ran out, each re-leased to the caller."""
+        now = timezone.now()
+        candidates = Job.objects.filter(status=Job.RUNNING, lease_expires_at__lt=now).values_list('pk', flat=True)
+        return [
+            self.get(pk) for pk in list(candidates[:100])
+            if Job.objects.filter(pk=pk, status=Job.RUNNING, lease_expires_at__lt=now)
+            .update(lease_expires_at=_lease_expiry())
+        ]
+
+    def get(self, job_id):
+        return Job.objects.filter(pk=job_id).values().first()
+
+    def set_progress(self, job_id, done, total):
+        Job.objects.filter(pk=job_id).update(progress_done=done, progress_total=total)
+
+    def finish(self, job_id, result):
+        Job.objects.filter(pk=job_id).update(
+            status=Job.SUCCEEDED, result=result, finished_at=timezone.now(), lease_expires_at=None,
+        )
+
+    def fail(self, job_id, error, retry_at=None):
+        if retry_at is not None:
+            Job.objects.filter(pk=job_id).update(
+                status=Job.RETRYING, error=error, run_after=retry_at, lease_expires_at=None,
+            )
+        else:
+            Job.objects.filter(pk=job_id).update(
+                status=Job.FAILED, error=error, finished_at=timezone.now(), lease_expires_at=None,
+            )
+
+
+class RedisBackend:
+    DATETIME_FIELDS = ('run_after', 'created_at', 'started_at', 'finished_at')
+
+    def __init__(self, url, result_ttl, prefix='jobs'):
+        import redis
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.result_ttl = result_ttl
+        self.ready = f"{prefix}:ready"
+        self.scheduled = f"{prefix}:scheduled"
+        self.processing = f"{prefix}:processing"
+        self.leases = f"{prefix}:leases"
+        self.prefix = prefix
+        self._claim = self.client.register_script(CLAIM_SCRIPT)
+        self._take_expired = self.client.register_script(TAKE_EXPIRED_SCRIPT)
+
+    def _key(self, job_id):
+        return f"{self.prefix}:job:{job_id}"
+
+    def _encode(self, fields):
+        return {
+            name: json.dumps(value.isoformat() if isinstance(value, datetime) else value)
+            for name, value in fields.items()
+        }
+
+    def enqueue(self, job):
+        pipe = self.client.pipeline()
+        pipe.hset(self._key(job['id']), mapping=self._encode(job))
+        pipe.lpush(self.ready, job['id'])
+        pipe.execute()
+
+    def claim(self):
+        # Move retries whose backoff has passed onto the ready list
+        for job_id in self.client.zrangebyscore(self.scheduled, '-inf', time.time(), start=0, num=100):
+            if self.client.zrem(self.scheduled, job_id):
+                self.client.lpush(self.ready, job_id)
+
+        job_id = self._claim(keys=[self.ready, self.processing, self.leases],
+                             args=[_lease_expiry().timestamp()])
+        if job_id is None:
+            return None
+        pipe = self.client.pipeline()
+        pipe.hset(self._key(job_id), mapping=self._encode({
+            'status': Job.RUNNING, 'started_at': timezone.now(), 'error': '',
+        }))
+        pipe.hincrby(self._key(job_id), 'attempts', 1)
+        pipe.execute()
+        return self.get(job_id)
+
+    def get(self, job_id):
+        raw = self.client.hgetall(self._key(job_id))
+        if not raw:
+            return None
+        job = {name: json.loads(value) for name, value in raw.items()}
+        for name in self.DATETIME_FIELDS:
+            if job.get(name):
+                job[name] = datetime.fromisoformat(job[name])
+        return job
+
+    def set_progress(self, job_id, done, total):
+        self.client.hset(self._key(job_id), mapping=self._encode({
+            'progress_done': done, 'progress_total': total,
+        }))
+
+    def heartbeat(self, job_id):
+        self.client.zadd(self.leases, {job_id: _lease_expiry().timestamp()}, xx=True)
+
+    def expired(self):
+        """Running jobs whose lease ran out, each re-leased to the caller."""
+        job_ids = self._take_expired(keys=[self.leases], args=[time.time(), _lease_expiry().timestamp()])
+        return [job for job_id in job_ids if (job := self.get(job_id)) is not None]
+
+    def _release(self, pipe, job_id):
+        pipe.lrem(self.processing, 0, job_id)
+        pipe.zrem(self.leases, job_id)
+
+    def _close(self, job_id, fields):
+        pipe = self.client.pipeline()
+        self._release(pipe, job_id)
+        pipe.hset(self._key(job_id), mapping=self._encode(dict(fields, finished_at=timezone.now())))
+        pipe.expire(self._key(job_id), self.result_ttl)
+        pipe.execute()
+
+    def finish(self, job_id, result):
+        self._close(job_id, {'status': Job.SUCCEEDED, 'result': result})
+
+    def fail(self, job_id, error, retry_at=None):
+        if retry_at is None:
+            self._close(job_id, {'status': Job.FAILED, 'error': error})
+            return
+        pipe = self.client.pipeline()
+        self._release(pipe, job_id)
+        pipe.hset(self._key(job_id), mapping=self._encode({
+            'status': Job.RETRYING, 'error': error, 'run_after': retry_at,
+        }))
+        pipe.zadd(self.scheduled, {job_id: retry_at.timestamp()})
+        pipe.execute()
+
+
+_backends = {}
+
+
+def get_backend():
+    name = settings.JOBS_BACKEND
+    if name not in _backends:
+        if name == 'database':
+            _backends[name] = DatabaseBackend()
+        elif name == 'redis':
+            _backends[name] = RedisBackend(settings.JOBS_REDIS_URL, settings.JOBS_RESULT_TTL)
+        else:
+            raise ImproperlyConfigured(f"JOBS_BACKEND must be 'database' or 'redis', got {name!r}")
+    return _backends[name]
+
+
+def enqueue(task_name, **params):
+    """Store a job for `task_name` and return its id. Params must be JSON-serializable."""
+    task = TASKS[task_name]
+    task.check_params(params)
+    now = timezone.now()
+    job = {
+        "id": uuid.uuid4().hex,
+        "task": task_name,
+        "params": params,
+        "status": Job.QUEUED,
+        "attempts": 0,
+        "max_retries": task.max_retries,
+        "run_after": now,
+        "progress_done": 0,
+        "progress_total": None,
+        "result": None,
+        "error": "",
+        "created_at": now,
+        "started_at": None,
+        "finished_at": None,
+        "lease_expires_at": None,
+    }
+    get_backend().enqueue(job)
+    return job["id"]
+
+
+def get_job(job_id):
+    return get_backend().get(job_id)
+
+
+@contextmanager
+def _heartbeat(job_id):
+    """Renew the job's lease while the block runs, so only a dead worker loses it."""
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(settings.JOBS_LEASE_SECONDS / 3):
+                try:
+                    get_backend().heartbeat(job_id)
+                except Exception:
+                    logger.exception("Heartbeat for job %s failed", job_id)
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=beat, name=f'job-heartbeat-{job_id}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _retry_or_fail(job, error):
+    """Schedule a retry with exponential backoff, or fail the job once retries are used up."""
+    backend = get_backend()
+    task = TASKS.get(job['task'])
+    if task is not None and job['attempts'] <= job['max_retries']:
+        delay = task.retry_delay * 2 ** (job['attempts'] - 1)
+        backend.fail(job['id'], error, retry_at=timezone.now() + timedelta(seconds=delay))
+    else:
+        backend.fail(job['id'], error)
+
+
+def run_job(job):
+    """Run one claimed job and record its result, retry or failure. Returns True on success."""
+    backend = get_backend()
+    task = TASKS.get(job['task'])
+
+    def progress(done, total=None):
+        backend.set_progress(job['id'], done, total)
+
+    try:
+        if task is None:
+            raise LookupError(f"unknown task {job['task']!r}")
+        with _heartbeat(job['id']):
+            result = task.func(progress, **job['params'])
+    except Exception as exc:
+        logger.exception("Job %s (%s) failed on attempt %d", job['id'], job['task'], job['attempts'])
+        _retry_or_fail(job, f"{type(exc).__name__}: {exc}")
+        return False
+
+    backend.finish(job['id'], result)
+    return True
+
+
+def requeue_expired():
+    """Retry (or fail) jobs whose worker stopped renewing their lease. Returns how many."""
+    lost = get_backend().expired()
+    for job in lost:
+        logger.error("Job %s (%s) lost its worker on attempt %d", job['id'], job['task'], job['attempts'])
+        _retry_or_fail(job, "Lease expired: the worker stopped responding")
+    return len(lost)
+
+
+def _run_in_child(job):
+    try:
+        return run_job(job)
+    finally:
+        close_old_connections()
+
+
+def run_pending():
+    """Run every claimable job in this process. Returns {'succeeded': n, 'failed': n}."""
+    counts = Counter()
+    backend = get_backend()
+    requeue_expired()
+    while (job := backend.claim()) is not None:
+        counts['succeeded' if run_job(job) else 'failed'] += 1
+    return counts
+
+
+def _new_pool(processes):
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Fork every child before this process opens a connection it could share
+    connections.close_all()
+    pool = ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('fork'))
+    pool.submit(int).result()
+    return pool
+
+
+def _collect(futures, running, counts):
+    """Count finished jobs; returns True if the pool broke (a child died)."""
+    from concurrent.futures.process import BrokenProcessPool
+
+    broken = False
+    for future in futures:
+        job = running.pop(future)
+        try:
+            succeeded = future.result()
+        except BrokenProcessPool:
+            broken, succeeded = True, False
+            logger.error("Job %s (%s) lost: its worker process died", job['id'], job['task'])
+            _retry_or_fail(job, "Worker process died")
+        counts['succeeded' if succeeded else 'failed'] += 1
+    return broken
+
+
+def run_worker(processes, burst=False, poll_interval=1.0):
+    """
+    Claim jobs in this process and run them in a pool of `processes` forked
+    children until SIGTERM/SIGINT (or, with `burst`, until nothing is
+    claimable). Jobs already running are finished before returning.
+    """
+    from concurrent.futures import FIRST_COMPLETED, wait
+    from concurrent.futures.process import BrokenProcessPool
+
+    stopping = []
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stopping.append(True))
+
+    counts = Counter()
+    backend = get_backend()
+    pool = _new_pool(processes)
+    running = {}  # future -> claimed job
+
+    def rebuild():
+        # A broken pool fails every job still in it; retry them on a new one
+        nonlocal pool
+        _collect(list(running), running, counts)
+        pool.shutdown(wait=False, cancel_futures=True)
+        pool = _new_pool(processes)
+
+    try:
+        while not stopping:
+            requeue_expired()
+            while len(running) < processes and (job := backend.claim()) is not None:
+                try:
+                    future = pool.submit(_run_in_child, job)
+                except BrokenProcessPool:
+                    # A child died since the last wait; the claimed job never started
+                    rebuild()
+                    future = pool.submit(_run_in_child, job)
+                running[future] = job
+            if not running:
+                if burst:
+                    break
+                time.sleep(poll_interval)
+                continue
+            done, _ = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            if _collect(done, running, counts):
+                rebuild()
+        _collect(list(running), running, counts)
+    finally:
+        pool.shutdown()
+    return counts
+
+
+from . import tasks  # noqa: E402,F401  registers the built-in tasks
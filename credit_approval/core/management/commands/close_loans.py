@@ -0,0 +1,29 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand
+from core.models import Loan
+from core.sharding import fan_out
+
+
+class Command(BaseCommand):
+    help = 'Marks loans whose end date has passed as closed (run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000,
+                            help='Loans updated per statement, to keep row locks short')
+
+    def handle(self, *args, **options):
+        today = datetime.now().date()
+
+        def close_expired(alias):
+            expired = Loan.objects.filter(is_active=True, end_date__lt=today)
+            closed = 0
+            while True:
+                batch = list(expired.values_list('loan_id', flat=True)[:options['batch_size']])
+                if not batch:
+                    break
+                closed += Loan.objects.filter(loan_id__in=batch).update(is_active=False)
+            return closed
+
+        # Every shard at once (just the default database when unsharded)
+        closed = sum(fan_out(close_expired).values())
+        self.stdout.write(self.style.SUCCESS(f'Closed {closed} loans.'))
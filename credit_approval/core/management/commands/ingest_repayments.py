@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from core.repayments import DEFAULT_BATCH_SIZE, ingest_repayments, read_payments_csv
+
+
+class Command(BaseCommand):
+    help = 'Records EMI payments from a CSV file (Loan ID, Amount, Due Date, Paid On)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with a header row; dates as YYYY-MM-DD')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        stats = ingest_repayments(read_payments_csv(options['path']), batch_size=options['batch_size'])
+        if stats['rejected']:
+            self.stdout.write(self.style.WARNING(f"Skipped {stats['rejected']} payments for unknown loans"))
+        if stats['duplicates']:
+            self.stdout.write(self.style.WARNING(f"Skipped {stats['duplicates']} payments already recorded"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Recorded {stats['recorded']} payments ({stats['on_time']} on time) in {stats['seconds']}s "
+            f"- {stats['payments_per_second']} payments/s"
+        ))
@@ -1,6 +1,10 @@
 import pandas as pd
+from datetime import datetime
 from django.core.management.base import BaseCommand
+from core.analytics import refresh_rollups
+from core.ids import allocator, register_loans
 from core.models import Customer, Loan
+from core.sharding import fan_out, select_customer_shard
 
 
 class Command(BaseCommand):
@@ -11,6 +15,10 @@ class Command(BaseCommand):
         customers = pd.read_excel('customer_data.xlsx')
         loans = pd.read_excel('loan_data.xlsx')
 
+        # Imported IDs are kept; new ones must be allocated above them (core.ids)
+        largest_ids = {'customer': 0, 'loan': 0}
+        loan_customers = {}
+
         # Customer data insertion
         for _, row in customers.iterrows():
             # Clean and convert data as needed
@@ -28,6 +36,7 @@ class Command(BaseCommand):
             monthly_salary = row['Monthly Salary']
             approved_limit = row['Approved Limit']
 
+            select_customer_shard(int(customer_id))
             Customer.objects.update_or_create(
                 customer_id=int(customer_id),  # ensure int type if your model uses IntegerField or AutoField
                 defaults={
@@ -39,8 +48,10 @@ class Command(BaseCommand):
                     'approved_limit': approved_limit,
                 }
             )
+            largest_ids['customer'] = max(largest_ids['customer'], int(customer_id))
 
         # Loan data insertion
+        today = datetime.now().date()
         for _, row in loans.iterrows():
             # customer_id = row['Customer ID']
             # loan_id = row['Loan ID']
@@ -54,6 +65,7 @@ class Command(BaseCommand):
                 continue
                 self.stdout.write(self.style.WARNING('Skipping loan row with empty Loan ID'))
 
+            select_customer_shard(int(customer_id))
             try:
                 customer = Customer.objects.get(customer_id=int(customer_id))
             except Customer.DoesNotExist:
@@ -85,6 +97,16 @@ class Command(BaseCommand):
                     'emis_paid_on_time': emis_paid_on_time,
                     'date_of_approval': date_of_approval,
                     'end_date': end_date,
+                    'is_active': end_date is not None and end_date.date() >= today,
                 }
             )
+            loan_customers[str(int(loan_id))] = customer.customer_id
+            largest_ids['loan'] = max(largest_ids['loan'], int(loan_id))
+
+        register_loans(loan_customers)
+        for name, largest in largest_ids.items():
+            allocator.advance_past(name, largest)
+        # A re-import may change any customer's loans; invalidate every ETag
+        fan_out(lambda alias: Customer.objects.bump_version())
+        refresh_rollups(full=True)
         self.stdout.write(self.style.SUCCESS('Data injection completed successfully.'))
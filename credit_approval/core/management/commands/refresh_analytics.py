@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from core.analytics import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = 'Refreshes the portfolio analytics rollup tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Recompute every rollup instead of only months after the watermark')
+
+    def handle(self, *args, **options):
+        rows = refresh_rollups(full=options['full'])
+        mode = 'Full' if options['full'] else 'Incremental'
+        self.stdout.write(self.style.SUCCESS(f'{mode} refresh rewrote {rows} rollup rows.'))
@@ -0,0 +1,28 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from core.jobs import run_pending, run_worker
+
+
+class Command(BaseCommand):
+    help = 'Runs queued background jobs (see core/jobs.py) in a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                            help='Pool size; 0 runs jobs in this process')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once no job is ready instead of polling for more')
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        if options['processes'] == 0:
+            if not options['burst']:
+                raise CommandError('--processes 0 requires --burst')
+            counts = run_pending()
+        else:
+            counts = run_worker(options['processes'], burst=options['burst'],
+                                poll_interval=options['poll_interval'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Ran {counts['succeeded'] + counts['failed']} jobs: "
+            f"{counts['succeeded']} succeeded, {counts['failed']} failed"
+        ))
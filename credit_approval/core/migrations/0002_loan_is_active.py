@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-19 08:43
+
+from datetime import date
+
+from django.db import migrations, models
+
+
+def close_expired_loans(apps, schema_editor):
+    Loan = apps.get_model('core', 'Loan')
+    Loan.objects.filter(end_date__lt=date.today()).update(is_active=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loan',
+            name='is_active',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.RunPython(close_expired_loans, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['customer', 'end_date'], name='loan_active_customer_idx'),
+        ),
+    ]
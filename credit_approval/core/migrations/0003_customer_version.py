@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 08:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_loan_is_active'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.4 on 2026-10-19 08:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_customer_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('age_band', models.CharField(max_length=10)),
+                ('salary_band', models.CharField(max_length=10)),
+                ('approval_month', models.DateField()),
+                ('end_month', models.DateField()),
+                ('loan_count', models.PositiveIntegerField()),
+                ('principal', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('monthly_payment', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('total_emis', models.BigIntegerField()),
+                ('emis_paid_on_time', models.BigIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('watermark', models.DateField(blank=True, null=True)),
+                ('generation', models.PositiveIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SegmentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('age_band', models.CharField(max_length=10)),
+                ('salary_band', models.CharField(max_length=10)),
+                ('customer_count', models.PositiveIntegerField(default=0)),
+                ('approved_limit', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['date_of_approval'], name='loan_approval_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='portfoliorollup',
+            index=models.Index(fields=['approval_month'], name='rollup_approval_month_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='portfoliorollup',
+            constraint=models.UniqueConstraint(fields=('age_band', 'salary_band', 'approval_month', 'end_month'), name='portfolio_rollup_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='segmentrollup',
+            constraint=models.UniqueConstraint(fields=('age_band', 'salary_band'), name='segment_rollup_key'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-19 08:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_portfolio_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Repayment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('due_date', models.DateField()),
+                ('paid_on', models.DateField()),
+                ('on_time', models.BooleanField()),
+                ('recorded_at', models.DateTimeField(auto_now_add=True)),
+                ('loan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='repayments', to='core.loan')),
+            ],
+        ),
+    ]
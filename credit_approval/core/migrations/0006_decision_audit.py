@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-19 08:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_repayment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DecisionAudit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('customer_id', models.CharField(max_length=20)),
+                ('endpoint', models.CharField(choices=[('check_eligibility', 'Check eligibility'), ('create_loan', 'Create loan')], max_length=20)),
+                ('decided_at', models.DateTimeField()),
+                ('inputs', models.JSONField()),
+                ('score_components', models.JSONField()),
+                ('credit_score', models.IntegerField()),
+                ('slab', models.CharField(max_length=20)),
+                ('approved', models.BooleanField()),
+                ('corrected_interest_rate', models.FloatField()),
+                ('monthly_installment', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('loan_id', models.CharField(blank=True, max_length=20, null=True)),
+                ('message', models.CharField(blank=True, max_length=100)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['customer_id', 'decided_at'], name='audit_customer_time_idx'), models.Index(fields=['decided_at'], name='audit_time_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:03
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_job'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['phone_number', 'customer_id'], name='customer_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(django.db.models.functions.text.Reverse('phone_number'), models.F('customer_id'), name='customer_phone_suffix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(django.db.models.functions.text.Lower('first_name'), models.F('customer_id'), name='customer_first_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(django.db.models.functions.text.Lower('last_name'), models.F('customer_id'), name='customer_last_name_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_customer_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdSequence',
+            fields=[
+                ('name', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('next_value', models.BigIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LoanDirectory',
+            fields=[
+                ('loan_id', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('customer_id', models.CharField(max_length=20)),
+            ],
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:32
+
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def drop_duplicate_repayments(apps, schema_editor):
+    """Keep the first payment per (loan, due date) and undo what the repeats counted."""
+    Loan = apps.get_model('core', 'Loan')
+    Repayment = apps.get_model('core', 'Repayment')
+    alias = schema_editor.connection.alias
+
+    first = {}
+    duplicates, on_time = [], Counter()
+    for pk, loan_id, due_date, paid_on_time in (
+        Repayment.objects.using(alias).order_by('pk').values_list('pk', 'loan_id', 'due_date', 'on_time')
+    ):
+        if (loan_id, due_date) in first:
+            duplicates.append(pk)
+            on_time[loan_id] += paid_on_time
+        else:
+            first[(loan_id, due_date)] = pk
+
+    for start in range(0, len(duplicates), 1000):
+        Repayment.objects.using(alias).filter(pk__in=duplicates[start:start + 1000]).delete()
+    for loan_id, count in on_time.items():
+        if count:
+            Loan.objects.using(alias).filter(pk=loan_id).update(
+                emis_paid_on_time=models.F('emis_paid_on_time') - count
+            )
+    Loan.objects.using(alias).filter(emis_paid_on_time__lt=0).update(emis_paid_on_time=0)
+    Loan.objects.using(alias).filter(emis_paid_on_time__gt=models.F('tenure')).update(
+        emis_paid_on_time=models.F('tenure')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_id_allocator'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_repayments, migrations.RunPython.noop, hints={'model_name': 'repayment'}),
+        migrations.AddConstraint(
+            model_name='repayment',
+            constraint=models.UniqueConstraint(fields=('loan', 'due_date'), name='repayment_loan_due_date'),
+        ),
+    ]
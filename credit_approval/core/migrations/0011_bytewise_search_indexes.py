@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:38
+
+import core.models
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_repayment_unique_emi'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='customer',
+            name='customer_phone_suffix_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='customer',
+            name='customer_first_name_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='customer',
+            name='customer_last_name_idx',
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(core.models.Bytewise(django.db.models.functions.text.Reverse('phone_number')), models.F('customer_id'), name='customer_phone_suffix_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(core.models.Bytewise(django.db.models.functions.text.Lower('first_name')), models.F('customer_id'), name='customer_first_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(core.models.Bytewise(django.db.models.functions.text.Lower('last_name')), models.F('customer_id'), name='customer_last_name_idx'),
+        ),
+    ]
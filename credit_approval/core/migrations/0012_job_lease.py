@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:39
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def expire_running_jobs(apps, schema_editor):
+    # Jobs left running by a dead worker before leases existed are retried by the next claim
+    Job = apps.get_model('core', 'Job')
+    Job.objects.using(schema_editor.connection.alias).filter(status='running').update(lease_expires_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_bytewise_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(expire_running_jobs, migrations.RunPython.noop, hints={'model_name': 'job'}),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-19 09:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_job_lease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('approval_month', models.DateField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:05
+
+from datetime import date
+
+from django.db import migrations
+
+
+def close_expired_loans(apps, schema_editor):
+    # 0002's data step names no model, so a sharded setup skips it there
+    Loan = apps.get_model('core', 'Loan')
+    Loan.objects.using(schema_editor.connection.alias).filter(end_date__lt=date.today()).update(is_active=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_rollup_change'),
+    ]
+
+    operations = [
+        migrations.RunPython(close_expired_loans, migrations.RunPython.noop, hints={'model_name': 'loan'}),
+    ]
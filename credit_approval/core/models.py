@@ -1,4 +1,43 @@
+from datetime import datetime
 from django.db import models
+from django.db.models.functions import Lower, Reverse
+
+
+class Bytewise(models.Func):
+    """
+    `expression` under a byte-wise collation ("C" on PostgreSQL, BINARY on
+    SQLite), so comparisons and ORDER BY follow code point order whatever
+    the database's default collation is.
+    """
+    # Not a Collate subclass: index expressions only accept Collate itself
+    template = '%(expressions)s COLLATE %(collation)s'
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, collation='"C"', **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, collation='BINARY', **extra_context)
+
+
+class LoanQuerySet(models.QuerySet):
+    def active(self, on=None):
+        """
+        Loans still running on `on` (default today). `is_active` lets the
+        partial index skip closed loans; the `end_date` check keeps results
+        exact for loans that expired since the last `close_loans` run.
+        """
+        on = on or datetime.now().date()
+        return self.filter(is_active=True, end_date__gte=on)
+
+
+class CustomerQuerySet(models.QuerySet):
+    def bump_version(self):
+        """
+        Invalidate cached representations (ETags) of these customers and their
+        loans. Call after any write that changes customer or loan data.
+        """
+        return self.update(version=models.F('version') + 1)
+
 
 class Customer(models.Model):
     customer_id = models.CharField(max_length=20,  primary_key=True)
@@ -9,6 +48,30 @@ class Customer(models.Model):
     monthly_salary = models.DecimalField(max_digits=12, decimal_places=2)
     approved_limit = models.DecimalField(max_digits=12, decimal_places=2)
     # current_debt field removed as it does not appear in updated columns
+    # Incremented on every write to the customer or their loans; drives ETags
+    version = models.PositiveIntegerField(default=0)
+
+    objects = CustomerQuerySet.as_manager()
+
+    class Meta:
+        # Customer search (core/search.py). Each index ends with the primary key,
+        # so keyset-paginated results are read straight off the index.
+        indexes = [
+            models.Index(fields=['phone_number', 'customer_id'], name='customer_phone_idx'),
+            # Prefix searches scan a range of keys, which only works under a
+            # byte-wise collation; the query expressions must match these exactly.
+            # Phone suffix search is a prefix search on the reversed number.
+            models.Index(Bytewise(Reverse('phone_number')), models.F('customer_id'), name='customer_phone_suffix_idx'),
+            models.Index(Bytewise(Lower('first_name')), models.F('customer_id'), name='customer_first_name_idx'),
+            models.Index(Bytewise(Lower('last_name')), models.F('customer_id'), name='customer_last_name_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # New customers are numbered by the central allocator (core.ids)
+        if not self.customer_id:
+            from .ids import allocate_customer_id
+            self.customer_id = allocate_customer_id()
+        super().save(*args, **kwargs)
 
 class Loan(models.Model):
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name="loans")
@@ -20,3 +83,196 @@ class Loan(models.Model):
     emis_paid_on_time = models.IntegerField()
     date_of_approval = models.DateField()  # renamed to match your column
     end_date = models.DateField()
+    # Cleared by the daily `close_loans` command once end_date has passed
+    is_active = models.BooleanField(default=True)
+
+    objects = LoanQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['customer', 'end_date'],
+                condition=models.Q(is_active=True),
+                name='loan_active_customer_idx',
+            ),
+            models.Index(fields=['date_of_approval'], name='loan_approval_date_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Allocated centrally so view-loan can find the loan's shard (core.ids)
+        if self.loan_id:
+            return super().save(*args, **kwargs)
+        from .ids import allocate_loan_id, release_loan_id
+        self.loan_id = allocate_loan_id(self.customer_id)
+        try:
+            super().save(*args, **kwargs)
+        except Exception:
+            # The directory must not point at a loan that was never stored
+            release_loan_id(self.loan_id)
+            self.loan_id = ''
+            raise
+
+
+class Repayment(models.Model):
+    """One EMI payment against a loan; on-time payments feed Loan.emis_paid_on_time."""
+    loan = models.ForeignKey(Loan, on_delete=models.CASCADE, related_name="repayments")
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    due_date = models.DateField()
+    paid_on = models.DateField()
+    on_time = models.BooleanField()
+    recorded_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # One payment per EMI, so a replayed request or file cannot count twice
+            models.UniqueConstraint(fields=['loan', 'due_date'], name='repayment_loan_due_date'),
+        ]
+
+
+class PortfolioRollup(models.Model):
+    """
+    Additive loan measures per customer segment, approval month and end month.
+    Rebuilt by core.analytics.refresh_rollups only.
+    """
+    age_band = models.CharField(max_length=10)
+    salary_band = models.CharField(max_length=10)
+    approval_month = models.DateField()
+    end_month = models.DateField()
+    loan_count = models.PositiveIntegerField()
+    principal = models.DecimalField(max_digits=18, decimal_places=2)
+    monthly_payment = models.DecimalField(max_digits=18, decimal_places=2)
+    total_emis = models.BigIntegerField()
+    emis_paid_on_time = models.BigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['age_band', 'salary_band', 'approval_month', 'end_month'],
+                name='portfolio_rollup_key',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['approval_month'], name='rollup_approval_month_idx'),
+        ]
+
+
+class SegmentRollup(models.Model):
+    age_band = models.CharField(max_length=10)
+    salary_band = models.CharField(max_length=10)
+    customer_count = models.PositiveIntegerField(default=0)
+    approved_limit = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['age_band', 'salary_band'], name='segment_rollup_key'),
+        ]
+
+
+class RollupState(models.Model):
+    """Singleton row (pk=1) holding the refresh watermark and cache generation."""
+    # First approval month the next incremental refresh recomputes
+    watermark = models.DateField(null=True, blank=True)
+    generation = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+
+
+class RollupChange(models.Model):
+    """
+    Append-only log of what changed since the last rollup refresh: an approval
+    month whose loans changed, or no month for a new customer. Consumed by
+    core.analytics.refresh_rollups.
+    """
+    approval_month = models.DateField(null=True, blank=True)
+
+
+class DecisionAudit(models.Model):
+    """
+    Compliance record of one eligibility or create-loan decision. Written in
+    batches by core.audit.AuditBuffer, never from the request thread.
+    """
+    CHECK_ELIGIBILITY = 'check_eligibility'
+    CREATE_LOAN = 'create_loan'
+    ENDPOINT_CHOICES = [
+        (CHECK_ELIGIBILITY, 'Check eligibility'),
+        (CREATE_LOAN, 'Create loan'),
+    ]
+
+    # Plain column rather than a foreign key: audit rows outlive customers
+    customer_id = models.CharField(max_length=20)
+    endpoint = models.CharField(max_length=20, choices=ENDPOINT_CHOICES)
+    decided_at = models.DateTimeField()
+    inputs = models.JSONField()
+    score_components = models.JSONField()
+    credit_score = models.IntegerField()
+    slab = models.CharField(max_length=20)
+    approved = models.BooleanField()
+    corrected_interest_rate = models.FloatField()
+    monthly_installment = models.DecimalField(max_digits=15, decimal_places=2)
+    loan_id = models.CharField(max_length=20, null=True, blank=True)
+    message = models.CharField(max_length=100, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['customer_id', 'decided_at'], name='audit_customer_time_idx'),
+            models.Index(fields=['decided_at'], name='audit_time_idx'),
+        ]
+
+
+class Job(models.Model):
+    """
+    A background job and its result, stored by core.jobs.DatabaseBackend.
+    (The Redis backend keeps the same fields in a hash instead.)
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    RETRYING = 'retrying'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (RETRYING, 'Waiting to retry'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.CharField(max_length=32, primary_key=True)
+    task = models.CharField(max_length=50)
+    params = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_retries = models.PositiveIntegerField(default=0)
+    # Not picked up by a worker before this time (retry backoff)
+    run_after = models.DateTimeField()
+    progress_done = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # While running: renewed by the worker's heartbeat; once past, the job is retried
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_pending_idx'),
+        ]
+
+
+class IdSequence(models.Model):
+    """
+    Next unallocated customer or loan ID. Always on the default database, so
+    IDs stay unique across shards (see core.ids).
+    """
+    name = models.CharField(max_length=20, primary_key=True)
+    next_value = models.BigIntegerField()
+
+
+class LoanDirectory(models.Model):
+    """
+    Owning customer of every loan, on the default database; with sharding on,
+    view-loan and repayments find a loan's shard from it.
+    """
+    loan_id = models.CharField(max_length=20, primary_key=True)
+    customer_id = models.CharField(max_length=20)
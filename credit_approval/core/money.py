@@ -0,0 +1,104 @@
+"""
+Fixed-point money arithmetic.
+
+Amounts are integers in paise (1 rupee = 100 paise) and annual interest
+rates are integers in basis points (13.01% = 1301). EMIs are computed
+exactly as rationals and rounded half-up to the paisa once, so every
+endpoint gets the same answer for the same inputs and there is no float
+drift or Decimal context to configure.
+
+`emi_paise_array` is the NumPy counterpart for grids and batches. It works
+in float64 and rounds to int64 paise, so it is not exact: an EMI whose true
+value lies within float64 rounding error of a half paisa can come out one
+paisa away from `emi_paise`. Use the scalar function where the amount is
+stored or charged.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+from math import gcd
+
+PAISE_PER_RUPEE = 100
+BASIS_POINTS_PER_PERCENT = 100
+# Monthly rate = rate_bp / (12 months * 100 percent * 100 basis points)
+MONTHLY_RATE_DENOMINATOR = 12 * 100 * BASIS_POINTS_PER_PERCENT
+# Longest tenure the API accepts (50 years). The exact (1+r)^n grows with n,
+# so an unbounded tenure makes one EMI arbitrarily expensive to compute.
+MAX_TENURE_MONTHS = 600
+# Largest paise value float64 holds exactly
+MAX_ARRAY_PAISE = 2 ** 53
+
+
+def to_paise(amount):
+    """Rupees (Decimal, int, str or float) to integer paise, rounding half up."""
+    if isinstance(amount, int):
+        return amount * PAISE_PER_RUPEE
+    if isinstance(amount, float):
+        amount = repr(amount)  # shortest repr, so 0.1 becomes exactly "0.1"
+    return int((Decimal(amount) * PAISE_PER_RUPEE).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_paise(paise):
+    return Decimal(paise) / PAISE_PER_RUPEE
+
+
+def to_rupees(paise):
+    """Paise as a float for JSON responses; exact for any amount below 10^13 rupees."""
+    return paise / PAISE_PER_RUPEE
+
+
+def to_basis_points(rate):
+    """Annual percentage rate (e.g. 13.01) to integer basis points (1301)."""
+    if isinstance(rate, float):
+        rate = repr(rate)
+    return int((Decimal(rate) * BASIS_POINTS_PER_PERCENT).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def _divide_half_up(numerator, denominator):
+    return (2 * numerator + denominator) // (2 * denominator)
+
+
+def emi_paise(principal_paise, tenure_months, rate_bp):
+    """
+    EMI = P * r * (1+r)^n / ((1+r)^n - 1) with r = rate_bp / 120000, evaluated
+    exactly in integers and rounded half up to the paisa.
+    """
+    if rate_bp == 0:
+        return _divide_half_up(principal_paise, tenure_months)
+
+    base = MONTHLY_RATE_DENOMINATOR
+    # (1+r)^n = ((base+bp)/base)^n; reducing the fraction first keeps the
+    # powers small for round rates (12% -> (101/100)^n)
+    common = gcd(base, rate_bp)
+    growth_num = ((base + rate_bp) // common) ** tenure_months
+    growth_den = (base // common) ** tenure_months
+    # P * (bp/base) * (num/den) / ((num - den)/den) = P * bp * num / (base * (num - den))
+    return _divide_half_up(principal_paise * rate_bp * growth_num, base * (growth_num - growth_den))
+
+
+def emi_paise_array(principal_paise, tenure_months, rate_bp):
+    """
+    Vectorized EMI over NumPy arrays (broadcastable); returns int64 paise.
+    Raises ValueError if any EMI overflows or is not a number, rather than
+    returning whatever the int64 cast makes of it.
+    """
+    import numpy as np
+
+    principal = np.asarray(principal_paise, dtype=np.float64)
+    tenure = np.asarray(tenure_months, dtype=np.float64)
+    monthly_rate = np.asarray(rate_bp, dtype=np.float64) / MONTHLY_RATE_DENOMINATOR
+    # Overflow becomes inf and is rejected below rather than warned about
+    with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+        growth = np.power(1 + monthly_rate, tenure)
+        emi = np.where(
+            monthly_rate == 0,
+            principal / tenure,
+            principal * monthly_rate * growth / (growth - 1),
+        )
+        emi = np.floor(emi + 0.5)
+    if not np.all(np.isfinite(emi)) or np.any(np.abs(emi) > MAX_ARRAY_PAISE):
+        raise ValueError("EMI out of range")
+    return emi.astype(np.int64)
+
+
+def exceeds_share(amount_paise, total_paise, numerator, denominator):
+    """True if amount > total * numerator / denominator, compared exactly."""
+    return amount_paise * denominator > total_paise * numerator
@@ -0,0 +1,97 @@
+"""
+What-if offer grid: evaluate every (loan amount, tenure, interest rate)
+combination for one customer with the same rules as check-eligibility.
+
+The customer's scoring inputs are loaded once, and the grid is then
+evaluated with NumPy array arithmetic (int64 paise EMIs, see core.money)
+instead of one request per cell.
+"""
+from .money import emi_paise_array, exceeds_share
+from .profiles import get_profile
+from .scoring import get_scorer
+
+# Slab rules shared with check-eligibility: (score above, minimum interest rate)
+INTEREST_SLABS = ((50, None), (30, 12.0), (10, 16.0))
+
+
+def load_scoring_inputs(customer):
+    profile = get_profile(customer)
+    # Money in integer paise, as everywhere in the eligibility rules
+    return {
+        "credit_score": get_scorer().score_profile(profile)[0],
+        "sum_emis": profile.active_emis,
+        "sum_current_loans": profile.active_principal,
+        "monthly_salary": profile.monthly_salary,
+        "approved_limit": profile.approved_limit,
+    }
+
+
+def axis_length(axis):
+    if not axis['step']:
+        return 1
+    return int(round((axis['max'] - axis['min']) / axis['step'])) + 1
+
+
+def axis_values(axis):
+    """Inclusive min..max range as a NumPy array, robust to float step accumulation."""
+    import numpy as np
+    return np.round(axis['min'] + axis['step'] * np.arange(axis_length(axis)), 2)
+
+
+def evaluate_offer_grid(inputs, loan_amounts, tenures, interest_rates):
+    """
+    Return one dict per grid cell (loan amount major, then tenure, then rate)
+    plus the best approvable offer: the largest amount, then the lowest
+    corrected rate, then the lowest EMI.
+    """
+    import numpy as np
+
+    amount, tenure, rate = np.meshgrid(
+        np.asarray(loan_amounts, dtype=float),
+        np.asarray(tenures, dtype=int),
+        np.asarray(interest_rates, dtype=float),
+        indexing='ij',
+    )
+    amount, tenure, rate = amount.ravel(), tenure.ravel(), rate.ravel()
+
+    score = inputs["credit_score"]
+    approval = np.zeros(rate.shape, dtype=bool)
+    corrected = rate.copy()
+
+    if not exceeds_share(inputs["sum_emis"], inputs["monthly_salary"], 1, 2):
+        for threshold, minimum_rate in INTEREST_SLABS:
+            if score > threshold:
+                if minimum_rate is None:
+                    approval[:] = True
+                else:
+                    approval = rate >= minimum_rate
+                    corrected = np.where(approval, rate, minimum_rate)
+                break
+        if inputs["sum_current_loans"] > inputs["approved_limit"]:
+            approval[:] = False
+
+    emi = emi_paise_array(np.rint(amount * 100), tenure, np.rint(corrected * 100))
+
+    cells = [
+        {
+            "loan_amount": a,
+            "tenure": t,
+            "interest_rate": r,
+            "approval": ok,
+            "corrected_interest_rate": c,
+            "monthly_installment": e,
+        }
+        for a, t, r, ok, c, e in zip(
+            amount.tolist(), tenure.tolist(), rate.tolist(),
+            approval.tolist(), corrected.tolist(), (emi / 100).tolist(),
+        )
+    ]
+
+    best_offer = None
+    approved_idx = np.flatnonzero(approval)
+    if approved_idx.size:
+        # lexsort sorts by the last key first
+        order = np.lexsort((emi[approved_idx], corrected[approved_idx], -amount[approved_idx]))
+        best_offer = cells[approved_idx[order[0]]]
+
+    return cells, best_offer
@@ -0,0 +1,201 @@
+"""
+Customer scoring profiles: salary, approved limit and loan aggregates, i.e.
+everything check-eligibility, create-loan and the offer grid need besides
+the request itself.
+
+Each worker keeps the profiles of recently seen customers in an LRU cache.
+A profile is valid while its customer's `version` is unchanged (every write
+to a customer or their loans bumps it, see CustomerQuerySet.bump_version)
+and for the day it was built on, since loans stop being active at their end
+date. Views load the customer row anyway, so checking validity costs no
+extra query; a hit skips the loan aggregate queries entirely. Saving a
+Customer or Loan through the ORM also drops the entry in this worker.
+
+The cache is bounded by entry count and by an estimate of the memory its
+records use (PROFILE_CACHE_MAX_ENTRIES, PROFILE_CACHE_MAX_BYTES).
+"""
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from django.conf import settings
+from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Customer, Loan
+from .money import to_paise
+
+
+class CustomerProfile:
+    # Money in integer paise (core.money); `as_of` is the date's ordinal
+    __slots__ = (
+        'customer_id', 'version', 'as_of', 'age', 'monthly_salary', 'approved_limit',
+        'loan_count', 'total_emis', 'on_time_emis', 'current_year_loans',
+        'approved_volume', 'active_principal', 'active_emis',
+    )
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values[name])
+
+    @property
+    def over_limit(self):
+        return self.active_principal > self.approved_limit
+
+    def features(self):
+        """Model features, see core.scoring.FEATURES."""
+        limit = self.approved_limit or 1
+        salary = self.monthly_salary or 1
+        return {
+            "over_limit": self.over_limit,
+            "paid_on_time_ratio": self.on_time_emis / self.total_emis if self.total_emis else 0.0,
+            "loan_count": self.loan_count,
+            "current_year_loans": self.current_year_loans,
+            "approved_volume_ratio": self.approved_volume / limit,
+            "active_principal_ratio": self.active_principal / limit,
+            "active_emi_ratio": self.active_emis / salary,
+            "age": self.age if self.age is not None else -1,
+        }
+
+    def size(self):
+        """Approximate bytes held by this record (object plus attribute values)."""
+        return sys.getsizeof(self) + sum(sys.getsizeof(getattr(self, name)) for name in self.__slots__)
+
+
+def build_profiles(customers):
+    """{customer_id: CustomerProfile} from one grouped loan query."""
+    today = datetime.now().date()
+    active = models.Q(is_active=True, end_date__gte=today)
+    totals = {
+        row['customer_id']: row
+        for row in Loan.objects.filter(customer__in=[c.pk for c in customers])
+        .values('customer_id')
+        .annotate(
+            loan_count=models.Count('pk'),
+            total_emis=models.Sum('tenure'),
+            on_time_emis=models.Sum('emis_paid_on_time'),
+            current_year_loans=models.Count('pk', filter=models.Q(date_of_approval__year=today.year)),
+            approved_volume=models.Sum('loan_amount'),
+            active_principal=models.Sum('loan_amount', filter=active),
+            active_emis=models.Sum('monthly_payment', filter=active),
+        )
+        .order_by()
+    }
+
+    profiles = {}
+    for customer in customers:
+        row = totals.get(customer.pk, {})
+        profiles[customer.pk] = CustomerProfile(
+            customer_id=customer.pk,
+            version=customer.version,
+            as_of=today.toordinal(),
+            age=customer.age,
+            monthly_salary=to_paise(customer.monthly_salary),
+            approved_limit=to_paise(customer.approved_limit),
+            loan_count=row.get('loan_count') or 0,
+            total_emis=row.get('total_emis') or 0,
+            on_time_emis=row.get('on_time_emis') or 0,
+            current_year_loans=row.get('current_year_loans') or 0,
+            approved_volume=to_paise(row.get('approved_volume') or 0),
+            active_principal=to_paise(row.get('active_principal') or 0),
+            active_emis=to_paise(row.get('active_emis') or 0),
+        )
+    return profiles
+
+
+def build_profile(customer):
+    return build_profiles([customer])[customer.pk]
+
+
+class ProfileCache:
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # customer_id -> (profile, size), least recent first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0}
+
+    def get(self, customer):
+        """
+        Profile for a customer row loaded by the caller; built and cached
+        when missing or out of date.
+        """
+        today = datetime.now().date().toordinal()
+        with self._lock:
+            entry = self._entries.get(customer.pk)
+            if entry is not None:
+                profile = entry[0]
+                if profile.version == customer.version and profile.as_of == today:
+                    self._entries.move_to_end(customer.pk)
+                    self._counts["hits"] += 1
+                    return profile
+                self._counts["stale"] += 1
+            else:
+                self._counts["misses"] += 1
+
+        # Built outside the lock; the customer row was read first, so these
+        # aggregates are at least as new as `customer.version`
+        profile = build_profile(customer)
+        self.put(profile)
+        return profile
+
+    def put(self, profile):
+        if not self.max_entries:
+            return
+        size = profile.size()
+        with self._lock:
+            old = self._entries.pop(profile.customer_id, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[profile.customer_id] = (profile, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._counts["evictions"] += 1
+
+    def invalidate(self, customer_id):
+        with self._lock:
+            entry = self._entries.pop(customer_id, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def metrics(self):
+        with self._lock:
+            lookups = self._counts["hits"] + self._counts["misses"] + self._counts["stale"]
+            return dict(
+                self._counts,
+                entries=len(self._entries),
+                bytes=self._bytes,
+                max_entries=self.max_entries,
+                max_bytes=self.max_bytes,
+                hit_rate=round(self._counts["hits"] / lookups, 4) if lookups else None,
+            )
+
+
+profile_cache = ProfileCache(
+    max_entries=settings.PROFILE_CACHE_MAX_ENTRIES,
+    max_bytes=settings.PROFILE_CACHE_MAX_BYTES,
+)
+
+
+def get_profile(customer):
+    return profile_cache.get(customer)
+
+
+@receiver([post_save, post_delete], sender=Customer)
+def _customer_changed(sender, instance, **kwargs):
+    profile_cache.invalidate(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Loan)
+def _loan_changed(sender, instance, **kwargs):
+    profile_cache.invalidate(instance.customer_id)
@@ -0,0 +1,159 @@
+"""
+Credit scoring backends, selected by `CREDIT_SCORER`:
+
+- `heuristic` (default): the hand-weighted components in core.utils.
+- `model`: a scikit-learn regressor trained by `python manage.py train_scorer`
+  and saved uncompressed with joblib at `CREDIT_SCORER_MODEL`.
+
+The model is loaded once per process with `mmap_mode='r'`, so its arrays are
+pages of the artifact file shared by every worker rather than private copies.
+Under gunicorn it is loaded in the master before forking (core.warmup), so
+no request pays for the load.
+
+Both backends apply the approved-limit rule (score 0 when active loans exceed
+the limit) and return (score, components) for the audit log. Requests are
+scored from the customer's cached profile (core.profiles) with
+`score_profile`; `score_many` builds the profiles for a whole batch of
+customers in one query (and the model scorer calls `predict` once per batch).
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .profiles import build_profile, build_profiles
+from .utils import award_points, credit_score_components, over_limit_components, score_from_components
+
+logger = logging.getLogger(__name__)
+
+FEATURES = (
+    'paid_on_time_ratio', 'loan_count', 'current_year_loans', 'approved_volume_ratio',
+    'active_principal_ratio', 'active_emi_ratio', 'age',
+)
+
+
+def customer_features(customers):
+    """{customer_id: feature dict (plus `over_limit`)} from one grouped loan query."""
+    return {pk: profile.features() for pk, profile in build_profiles(customers).items()}
+
+
+def feature_matrix(rows):
+    import numpy as np
+    return np.array([[row[name] for name in FEATURES] for row in rows], dtype=np.float64)
+
+
+class HeuristicScorer:
+    name = 'heuristic'
+
+    def score(self, customer, loans):
+        components = credit_score_components(customer, loans)
+        return score_from_components(components), components
+
+    def score_profile(self, profile):
+        if profile.over_limit:
+            components = over_limit_components()
+        else:
+            components = award_points(
+                profile.on_time_emis / (profile.total_emis or 1), profile.loan_count,
+                profile.current_year_loans, profile.approved_volume / profile.approved_limit,
+            )
+        return score_from_components(components), components
+
+    def score_many(self, customers, batch_size=2000):
+        scores = {}
+        for i in range(0, len(customers), batch_size):
+            for pk, profile in build_profiles(customers[i:i + batch_size]).items():
+                scores[pk] = self.score_profile(profile)[0]
+        return scores
+
+
+class ModelScorer:
+    name = 'model'
+
+    def __init__(self, path, budget_ms):
+        self.path = path
+        self.budget_ms = budget_ms
+        self.stats = {"requests": 0, "over_budget": 0, "fallbacks": 0}
+        self._artifact = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def load(self):
+        """Load (memory-map) the artifact once per process; returns it."""
+        if self._artifact is None:
+            with self._lock:
+                if self._artifact is None:
+                    import joblib
+
+                    artifact = joblib.load(self.path, mmap_mode='r')
+                    if tuple(artifact['features']) != FEATURES:
+                        raise ImproperlyConfigured(
+                            f"{self.path} was trained on {artifact['features']}, expected {FEATURES}; "
+                            "retrain it with `manage.py train_scorer`"
+                        )
+                    self._artifact = artifact
+        return self._artifact
+
+    def _predict(self, rows):
+        import numpy as np
+        import sklearn
+
+        model = self.load()['model']
+        # Inputs are built here and always finite; skip per-call validation.
+        # sklearn's config is thread-local, so it is set around each call.
+        with sklearn.config_context(assume_finite=True):
+            predictions = model.predict(feature_matrix(rows))
+        return np.clip(np.rint(predictions), 0, 100).astype(int).tolist()
+
+    def score(self, customer, loans):
+        return self.score_profile(build_profile(customer))
+
+    def score_profile(self, profile):
+        start = time.perf_counter()
+        self._count("requests")
+        try:
+            features = profile.features()
+            version = self.load()['version']
+            score = 0 if profile.over_limit else self._predict([features])[0]
+        except Exception:
+            # A broken or missing artifact must not take eligibility down
+            logger.exception("Model scoring failed; using the heuristic")
+            self._count("fallbacks")
+            return HeuristicScorer().score_profile(profile)
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms > self.budget_ms:
+            self._count("over_budget")
+            logger.warning("Model scoring took %.1f ms (budget %s ms)", elapsed_ms, self.budget_ms)
+        return score, dict(features, model=version)
+
+    def score_many(self, customers, batch_size=2000):
+        scores = {}
+        for i in range(0, len(customers), batch_size):
+            chunk = customers[i:i + batch_size]
+            features = customer_features(chunk)
+            rows = [features[customer.pk] for customer in chunk]
+            for customer, row, predicted in zip(chunk, rows, self._predict(rows)):
+                scores[customer.pk] = 0 if row["over_limit"] else predicted
+        return scores
+
+
+_scorers = {}
+
+
+def get_scorer():
+    name = settings.CREDIT_SCORER
+    if name not in _scorers:
+        if name == 'heuristic':
+            _scorers[name] = HeuristicScorer()
+        elif name == 'model':
+            _scorers[name] = ModelScorer(settings.CREDIT_SCORER_MODEL, settings.CREDIT_SCORER_BUDGET_MS)
+        else:
+            raise ImproperlyConfigured(f"CREDIT_SCORER must be 'heuristic' or 'model', got {name!r}")
+    return _scorers[name]
@@ -0,0 +1,96 @@
+"""
+Customer search for support staff: exact phone number, phone number suffix,
+and case-insensitive first/last name prefix.
+
+Every criterion is answered from one of the Customer search indexes
+(see Customer.Meta): prefixes become a range `key >= prefix AND key <
+next_prefix` on the index expression, and a suffix is a prefix of the
+reversed phone number. The range is only right in code point order (a
+linguistic collation may sort 'z' + 1 = '{' before the letters), so the
+prefix indexes, the comparisons and the ordering all use a byte-wise
+collation (models.Bytewise). Results are ordered by (index key,
+customer_id) and paginated with a keyset cursor, so page N costs the same
+as page 1. With sharding on, every shard is searched in parallel and the
+pages are merged in the same code point order.
+"""
+import base64
+import heapq
+import json
+import re
+from itertools import islice
+
+from django.db.models import F, Q
+from django.db.models.functions import Lower, Reverse
+
+from .models import Bytewise, Customer
+from .sharding import fan_out
+
+# criterion: (index expression, how the query value becomes a key prefix, exact match?)
+CRITERIA = {
+    'phone': (F('phone_number'), lambda value: _digits(value), True),
+    'phone_suffix': (Bytewise(Reverse('phone_number')), lambda value: _digits(value)[::-1], False),
+    'first_name': (Bytewise(Lower('first_name')), lambda value: value.strip().lower(), False),
+    'last_name': (Bytewise(Lower('last_name')), lambda value: value.strip().lower(), False),
+}
+
+
+def _digits(value):
+    return re.sub(r'\D', '', value)
+
+
+def _next_prefix(prefix):
+    """Smallest string greater than every string starting with `prefix`, in code point order."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def encode_cursor(key, customer_id):
+    return base64.urlsafe_b64encode(json.dumps([key, customer_id]).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Returns (key, customer_id); raises ValueError for a malformed cursor."""
+    try:
+        key, customer_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError("invalid cursor")
+    if not isinstance(key, str) or not isinstance(customer_id, str):
+        raise ValueError("invalid cursor")
+    return key, customer_id
+
+
+def search_customers(criterion, value, limit=20, cursor=None):
+    """
+    Return (customers, next_cursor) for one search criterion. `next_cursor`
+    is None on the last page.
+    """
+    # Each shard returns its first limit + 1 matches in key order; merged, the
+    # first limit + 1 of those are the first of all customers
+    pages = fan_out(lambda alias: _search_shard(criterion, value, limit, cursor))
+    page = list(islice(heapq.merge(*pages.values(), key=lambda c: (c.search_key, c.customer_id)), limit + 1))
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_cursor(page[-1].search_key, page[-1].customer_id)
+    return page, next_cursor
+
+
+def _search_shard(criterion, value, limit, cursor):
+    expression, to_key, exact = CRITERIA[criterion]
+    prefix = to_key(value)
+    customers = Customer.objects.annotate(search_key=expression)
+
+    if exact:
+        customers = customers.filter(search_key=prefix)
+    else:
+        # The range selects the index slice; startswith keeps the match exact
+        customers = customers.filter(
+            search_key__gte=prefix, search_key__lt=_next_prefix(prefix), search_key__startswith=prefix
+        )
+
+    if cursor is not None:
+        after_key, after_id = decode_cursor(cursor)
+        customers = customers.filter(search_key__gte=after_key).filter(
+            Q(search_key__gt=after_key) | Q(customer_id__gt=after_id)
+        )
+
+    return list(customers.order_by('search_key', 'customer_id')[:limit + 1])
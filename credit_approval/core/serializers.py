@@ -1,5 +1,20 @@
+import math
+
 from rest_framework import serializers
-from .models import Customer, Loan
+from .models import Customer, DecisionAudit, Loan
+from .money import MAX_TENURE_MONTHS
+from .offers import axis_length
+from .repayments import DEFAULT_BATCH_SIZE
+from .search import CRITERIA, decode_cursor
+
+class FiniteFloatField(serializers.FloatField):
+    """FloatField that rejects NaN and infinity, which FloatField accepts."""
+
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        if not math.isfinite(value):
+            self.fail('invalid')
+        return value
 
 class CustomerRegisterSerializer(serializers.ModelSerializer):
     monthly_income = serializers.DecimalField(max_digits=12, decimal_places=2, source='monthly_salary')
@@ -28,8 +43,8 @@ class CustomerResponseSerializer(serializers.ModelSerializer):
 class CheckEligibilitySerializer(serializers.Serializer):
     customer_id = serializers.IntegerField()
     loan_amount = serializers.DecimalField(max_digits=15, decimal_places=2)
-    interest_rate = serializers.FloatField()
-    tenure = serializers.IntegerField(min_value=1)
+    interest_rate = FiniteFloatField()
+    tenure = serializers.IntegerField(min_value=1, max_value=MAX_TENURE_MONTHS)
 
 class CheckEligibilityResponseSerializer(serializers.Serializer):
     customer_id = serializers.IntegerField()
@@ -42,8 +57,8 @@ class CheckEligibilityResponseSerializer(serializers.Serializer):
 class CreateLoanSerializer(serializers.Serializer):
     customer_id = serializers.IntegerField()
     loan_amount = serializers.DecimalField(max_digits=15, decimal_places=2)
-    interest_rate = serializers.FloatField()
-    tenure = serializers.IntegerField(min_value=1)
+    interest_rate = FiniteFloatField()
+    tenure = serializers.IntegerField(min_value=1, max_value=MAX_TENURE_MONTHS)
 
 class CreateLoanResponseSerializer(serializers.Serializer):
     loan_id = serializers.IntegerField(allow_null=True)
@@ -76,3 +91,144 @@ class LoanWithCustomerSerializer(serializers.Serializer):
             "phone_number": c.phone_number,
             "age": c.age,
         }
+
+class PortfolioAnalyticsQuerySerializer(serializers.Serializer):
+    group_by = serializers.ChoiceField(choices=['age_band', 'salary_band', 'both'], default='both')
+
+class RepaymentSerializer(serializers.Serializer):
+    loan_id = serializers.IntegerField()
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0)
+    due_date = serializers.DateField()
+    paid_on = serializers.DateField()
+
+class RepaymentResponseSerializer(serializers.Serializer):
+    repayment_id = serializers.IntegerField()
+    loan_id = serializers.IntegerField()
+    on_time = serializers.BooleanField()
+    emis_paid_on_time = serializers.IntegerField()
+    repayments_left = serializers.IntegerField()
+
+class GridAxisSerializer(serializers.Serializer):
+    min = FiniteFloatField(min_value=0)
+    max = FiniteFloatField(min_value=0)
+    step = FiniteFloatField(min_value=0, default=0)
+
+    def validate(self, attrs):
+        if attrs['max'] < attrs['min']:
+            raise serializers.ValidationError("max must not be less than min.")
+        if attrs['step'] == 0 and attrs['max'] != attrs['min']:
+            raise serializers.ValidationError("step is required when max differs from min.")
+        return attrs
+
+class OfferGridSerializer(serializers.Serializer):
+    MAX_CELLS = 5000
+
+    customer_id = serializers.IntegerField()
+    loan_amount = GridAxisSerializer()
+    tenure = GridAxisSerializer()
+    interest_rate = GridAxisSerializer()
+
+    def validate_loan_amount(self, value):
+        # Same bound as the 15-digit loan_amount of the single-loan endpoints
+        if value['max'] >= 10 ** 13:
+            raise serializers.ValidationError("loan_amount must be below 10^13.")
+        return value
+
+    def validate_tenure(self, value):
+        if value['min'] < 1 or value['step'] % 1 or value['min'] % 1:
+            raise serializers.ValidationError("tenure must be whole months starting at 1.")
+        if value['max'] > MAX_TENURE_MONTHS:
+            raise serializers.ValidationError(f"tenure must be at most {MAX_TENURE_MONTHS} months.")
+        return value
+
+    def validate(self, attrs):
+        cells = 1
+        for axis in ('loan_amount', 'tenure', 'interest_rate'):
+            cells *= axis_length(attrs[axis])
+        if cells > self.MAX_CELLS:
+            raise serializers.ValidationError(f"grid has {cells} cells; at most {self.MAX_CELLS} allowed.")
+        return attrs
+
+class OfferGridCellSerializer(serializers.Serializer):
+    loan_amount = serializers.FloatField()
+    tenure = serializers.IntegerField()
+    interest_rate = serializers.FloatField()
+    approval = serializers.BooleanField()
+    corrected_interest_rate = serializers.FloatField()
+    monthly_installment = serializers.FloatField()
+
+class OfferGridResponseSerializer(serializers.Serializer):
+    customer_id = serializers.IntegerField()
+    credit_score = serializers.IntegerField()
+    cells = OfferGridCellSerializer(many=True)
+    best_offer = OfferGridCellSerializer(allow_null=True)
+
+class DecisionAuditQuerySerializer(serializers.Serializer):
+    MAX_LIMIT = 500
+
+    customer_id = serializers.CharField(required=False)
+    endpoint = serializers.ChoiceField(choices=DecisionAudit.ENDPOINT_CHOICES, required=False)
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=MAX_LIMIT, default=100)
+
+class DecisionAuditSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DecisionAudit
+        fields = '__all__'
+
+class RepaymentFileJobSerializer(serializers.Serializer):
+    file = serializers.FileField(help_text="CSV with columns Loan ID, Amount, Due Date, Paid On")
+    batch_size = serializers.IntegerField(min_value=1, max_value=50000, default=DEFAULT_BATCH_SIZE)
+
+class RescoreJobSerializer(serializers.Serializer):
+    customer_ids = serializers.ListField(
+        child=serializers.CharField(max_length=20), required=False, max_length=10000,
+        help_text="Omit to re-score every customer"
+    )
+
+class JobSerializer(serializers.Serializer):
+    id = serializers.CharField()
+    task = serializers.CharField()
+    status = serializers.CharField()
+    attempts = serializers.IntegerField()
+    max_retries = serializers.IntegerField()
+    progress_done = serializers.IntegerField()
+    progress_total = serializers.IntegerField(allow_null=True)
+    result = serializers.JSONField(allow_null=True)
+    error = serializers.CharField(allow_blank=True)
+    created_at = serializers.DateTimeField()
+    started_at = serializers.DateTimeField(allow_null=True)
+    finished_at = serializers.DateTimeField(allow_null=True)
+
+class CustomerSearchQuerySerializer(serializers.Serializer):
+    MIN_SUFFIX_DIGITS = 3
+
+    phone = serializers.CharField(required=False, help_text="Exact phone number")
+    phone_suffix = serializers.CharField(required=False, help_text="Last digits of the phone number")
+    first_name = serializers.CharField(required=False, help_text="Case-insensitive prefix")
+    last_name = serializers.CharField(required=False, help_text="Case-insensitive prefix")
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+    cursor = serializers.CharField(required=False, help_text="next_cursor of the previous page")
+
+    def validate(self, attrs):
+        given = [name for name in CRITERIA if name in attrs]
+        if len(given) != 1:
+            raise serializers.ValidationError(f"Give exactly one of: {', '.join(CRITERIA)}.")
+        criterion = given[0]
+        key = CRITERIA[criterion][1](attrs[criterion])
+        if not key:
+            raise serializers.ValidationError({criterion: "Nothing to search for."})
+        if criterion == 'phone_suffix' and len(key) < self.MIN_SUFFIX_DIGITS:
+            raise serializers.ValidationError({criterion: f"Give at least {self.MIN_SUFFIX_DIGITS} digits."})
+        if 'cursor' in attrs:
+            try:
+                decode_cursor(attrs['cursor'])
+            except ValueError:
+                raise serializers.ValidationError({"cursor": "Invalid cursor."})
+        attrs['criterion'] = criterion
+        return attrs
+
+class CustomerSearchResponseSerializer(serializers.Serializer):
+    results = CustomerResponseSerializer(many=True)
+    next_cursor = serializers.CharField(allow_null=True)
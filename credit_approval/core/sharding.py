@@ -0,0 +1,200 @@
+"""
+Customer-hash sharding, on when SHARD_DATABASE_URLS lists the shard
+databases (aliases shard0..shardN-1 in settings.SHARDS).
+
+A customer, their loans and their repayments live on
+`shard_for(customer_id)`, a CRC32 of the ID modulo the number of shards.
+Everything else (jobs, audit log, rollups, the ID allocator and the loan
+directory in core.ids) stays on `default`. Without SHARD_DATABASE_URLS the
+only shard is `default` and nothing here changes behaviour.
+
+ShardRouter places customer data:
+
+- an instance goes where it was loaded from, or else to its customer's shard;
+- a query goes to the shard selected for the current request or block with
+  `select_customer_shard`, `select_loan_shard` or `use_shard`; querying
+  sharded models with no shard selected is an error rather than a silent
+  read of the wrong database.
+
+Work that spans customers (search, analytics refreshes, re-scoring, bulk
+repayments) runs once per shard with `fan_out`, in parallel threads, and
+merges the results.
+
+Changing the number of shards moves customers between them; that needs a
+migration of the data and is not handled here.
+"""
+import os
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import close_old_connections
+
+SHARDED_MODELS = {'customer', 'loan', 'repayment'}
+
+_current = ContextVar('shard', default=None)
+_pool = {"executor": None, "size": 0, "pid": None}
+_pool_lock = threading.Lock()
+_in_pool = threading.local()
+
+
+class ShardNotSelected(RuntimeError):
+    pass
+
+
+def is_sharded():
+    return settings.SHARDS != ['default']
+
+
+def shard_for(customer_id):
+    shards = settings.SHARDS
+    if len(shards) == 1:
+        return shards[0]
+    return shards[zlib.crc32(str(customer_id).encode()) % len(shards)]
+
+
+def current_shard():
+    return _current.get()
+
+
+def select_shard(alias):
+    """Route sharded queries to `alias` for the rest of this request (see ShardMiddleware)."""
+    _current.set(alias)
+    return alias
+
+
+def select_customer_shard(customer_id):
+    return select_shard(shard_for(customer_id))
+
+
+def loan_shards(loan_ids):
+    """{loan_id: shard} for the known loans among `loan_ids` (all of them when unsharded)."""
+    if not is_sharded():
+        return dict.fromkeys(loan_ids, 'default')
+    from .models import LoanDirectory
+    return {
+        loan_id: shard_for(customer_id)
+        for loan_id, customer_id in LoanDirectory.objects.filter(loan_id__in=loan_ids)
+        .values_list('loan_id', 'customer_id')
+    }
+
+
+def select_loan_shard(loan_id):
+    """Select the shard holding `loan_id`; returns it, or None for an unknown loan."""
+    alias = loan_shards([str(loan_id)]).get(str(loan_id))
+    if alias is not None:
+        select_shard(alias)
+    return alias
+
+
+@contextmanager
+def use_shard(alias):
+    token = _current.set(alias)
+    try:
+        yield alias
+    finally:
+        _current.reset(token)
+
+
+def _run_on(alias, func):
+    _in_pool.active = True
+    # Pool threads outlive requests, so retire their connections like a request would
+    close_old_connections()
+    try:
+        with use_shard(alias):
+            return func(alias)
+    finally:
+        _in_pool.active = False
+
+
+def _executor(size):
+    with _pool_lock:
+        # A pool inherited through fork has no threads behind it
+        if _pool["executor"] is None or _pool["size"] < size or _pool["pid"] != os.getpid():
+            if _pool["executor"] is not None and _pool["pid"] == os.getpid():
+                # Let fan-outs already queued on it finish, then its threads exit
+                _pool["executor"].shutdown(wait=False)
+            # Sized for every shard up front, so it is built once per process
+            size = max(size, len(settings.SHARDS))
+            _pool["executor"] = ThreadPoolExecutor(size, thread_name_prefix='shard-fan-out')
+            _pool["size"] = size
+            _pool["pid"] = os.getpid()
+        return _pool["executor"]
+
+
+def fan_out(func, shards=None):
+    """
+    Call `func(alias)` with each shard selected and return {alias: result}.
+    Shards are queried in parallel threads; with one shard, or when already
+    inside a fan-out, the calls run in this thread.
+    """
+    shards = list(settings.SHARDS if shards is None else shards)
+    if len(shards) <= 1 or getattr(_in_pool, 'active', False):
+        results = {}
+        for alias in shards:
+            with use_shard(alias):
+                results[alias] = func(alias)
+        return results
+
+    executor = _executor(len(shards))
+    futures = {alias: executor.submit(_run_on, alias, func) for alias in shards}
+    return {alias: future.result() for alias, future in futures.items()}
+
+
+def _is_sharded_model(model):
+    return model._meta.app_label == 'core' and model._meta.model_name in SHARDED_MODELS
+
+
+class ShardRouter:
+    def _shard(self, model, instance=None, **hints):
+        if instance is not None:
+            if instance._state.db:
+                return instance._state.db
+            if instance._meta.model_name == 'customer' and instance.pk:
+                return shard_for(instance.pk)
+            if instance._meta.model_name == 'loan' and instance.customer_id:
+                return shard_for(instance.customer_id)
+        alias = _current.get()
+        if alias is None:
+            raise ShardNotSelected(
+                f"No shard selected for a {model._meta.label} query; "
+                "use select_customer_shard(), use_shard() or fan_out()"
+            )
+        return alias
+
+    def db_for_read(self, model, **hints):
+        if _is_sharded_model(model):
+            return self._shard(model, **hints)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        if _is_sharded_model(model):
+            return self._shard(model, **hints)
+        return 'default'
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        model_name = model_name or hints.get('model_name')
+        if app_label == 'core' and model_name is None and is_sharded():
+            # A data migration that names no model cannot be routed to the
+            # right databases; it has to be repeated with hints
+            return False
+        if app_label == 'core' and model_name in SHARDED_MODELS:
+            return db in settings.SHARDS
+        return db == 'default'
+
+
+class ShardMiddleware:
+    """Start every request with no shard selected, whatever this thread served before."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _current.set(None)
+        try:
+            return self.get_response(request)
+        finally:
+            _current.reset(token)
@@ -0,0 +1,105 @@
+"""
+Built-in background tasks (see core/jobs.py). Each takes a `progress`
+callback first, then JSON params, and returns a JSON-serializable result.
+"""
+import os
+import threading
+from collections import Counter
+
+from .analytics import refresh_rollups
+from .audit import slab_for
+from .jobs import task
+from .models import Customer
+from .repayments import DEFAULT_BATCH_SIZE, ingest_repayments, read_payments_csv
+from .scoring import get_scorer
+from .sharding import fan_out, shard_for
+
+
+# Not retried: a partly ingested file would record its first chunks twice
+@task(max_retries=0)
+def ingest_repayments_file(progress, path, batch_size=DEFAULT_BATCH_SIZE, delete_after=False):
+    with open(path, newline='') as f:
+        total = max(0, sum(1 for _ in f) - 1)  # minus the header row
+    progress(0, total)
+
+    stats = ingest_repayments(
+        read_payments_csv(path), batch_size=batch_size,
+        on_chunk=lambda counts: progress(counts['recorded'] + counts['duplicates'] + counts['rejected'], total),
+    )
+    if delete_after:
+        os.remove(path)
+    return stats
+
+
+@task()
+def rescore_customers(progress, customer_ids=None, batch_size=500):
+    """
+    Recompute credit scores, e.g. after a bulk ingestion. Returns the number
+    of customers per interest rate slab, plus each score when specific
+    customers were requested.
+    """
+    ids = None if customer_ids is None else [str(customer_id) for customer_id in customer_ids]
+    # Only the shards holding the requested customers (all shards by default)
+    counts = fan_out(
+        lambda alias: _customers(ids).count(),
+        shards=None if ids is None else sorted({shard_for(customer_id) for customer_id in ids}),
+    )
+    total = sum(counts.values())
+    progress(0, total)
+
+    # Shards are re-scored in parallel; progress is their combined count
+    lock = threading.Lock()
+    done = [0]
+
+    def advance(count):
+        with lock:
+            done[0] += count
+            progress(done[0], total)
+
+    def rescore_shard(alias):
+        scorer = get_scorer()
+        slabs = Counter()
+        scores = {}
+        batch = []
+        for customer in _customers(ids).iterator(chunk_size=batch_size):
+            batch.append(customer)
+            if len(batch) == batch_size:
+                advance(_score_batch(scorer, batch, slabs, scores if ids is not None else None))
+                batch = []
+        if batch:
+            advance(_score_batch(scorer, batch, slabs, scores if ids is not None else None))
+        return slabs, scores
+
+    slabs = Counter()
+    scores = {}
+    results = fan_out(rescore_shard, shards=[alias for alias, count in counts.items() if count])
+    for shard_slabs, shard_scores in results.values():
+        slabs.update(shard_slabs)
+        scores.update(shard_scores)
+    progress(total, total)
+
+    result = {"customers": total, "slabs": dict(slabs)}
+    if customer_ids is not None:
+        result["scores"] = scores
+    return result
+
+
+def _customers(customer_ids):
+    customers = Customer.objects.order_by('pk')
+    if customer_ids is not None:
+        customers = customers.filter(pk__in=customer_ids)
+    return customers
+
+
+def _score_batch(scorer, customers, slabs, scores):
+    # One vectorized predict per batch with the model scorer
+    for customer_id, score in scorer.score_many(customers).items():
+        slabs[slab_for(score)] += 1
+        if scores is not None:
+            scores[customer_id] = score
+    return len(customers)
+
+
+@task()
+def refresh_analytics(progress, full=False):
+    return {"rollup_rows": refresh_rollups(full=full)}
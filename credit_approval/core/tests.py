@@ -1,8 +1,52 @@
+import os
+import random
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.conf import settings
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from unittest import skipUnless
 from django.urls import reverse
+from django.utils import timezone
+from drf_yasg.generators import OpenAPISchemaGenerator
+import numpy as np
 from rest_framework.test import APITestCase
 from rest_framework import status
 from decimal import Decimal
-from .models import Customer, Loan
+from django.db import IntegrityError
+from django.db.models import Sum
+from django.db.models.functions import Lower
+from .models import (
+    Bytewise, Customer, DecisionAudit, Job, Loan, LoanDirectory, PortfolioRollup, Repayment, RollupChange,
+    SegmentRollup,
+)
+from .admission import AdmissionController
+from .audit import AuditBuffer, audit_buffer
+from . import jobs
+from .analytics import portfolio_summary, refresh_rollups
+from .ids import IdAllocator
+from .money import (
+    MAX_TENURE_MONTHS, emi_paise, emi_paise_array, exceeds_share, from_paise, to_basis_points, to_paise,
+)
+from .profiles import CustomerProfile, ProfileCache, build_profile
+from .repayments import ingest_repayments
+from .search import CRITERIA
+from .scoring import HeuristicScorer, ModelScorer, get_scorer
+from . import sharding
+from .sharding import ShardNotSelected, shard_for, use_shard
+from .utils import calculate_monthly_installment
+from .warmup import warm_up
+from credit_approval.schema import clear_schema_cache
+
+
+def tearDownModule():
+    # Views queue on the shared buffer; write it while the test database exists, not at exit
+    audit_buffer.flush()
 
 
 class CustomerRegistrationTests(APITestCase):
@@ -65,6 +109,24 @@ class CheckEligibilityTests(APITestCase):
         self.assertIn('monthly_installment', response.data)
         self.assertIn('tenure', response.data)
 
+    def test_tenure_is_capped(self):
+        response = self.client.post(reverse('check_eligibility'), {
+            "customer_id": self.customer.customer_id, "loan_amount": "500000",
+            "interest_rate": 15.0, "tenure": MAX_TENURE_MONTHS + 1
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tenure', response.data)
+
+    def test_non_finite_interest_rate_is_rejected(self):
+        for rate in ("NaN", "inf", "-Infinity"):
+            for name in ('check_eligibility', 'create_loan'):
+                response = self.client.post(reverse(name), {
+                    "customer_id": self.customer.customer_id, "loan_amount": "500000",
+                    "interest_rate": rate, "tenure": 12
+                }, format='json')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn('interest_rate', response.data)
+
 
 class CreateLoanTests(APITestCase):
     def setUp(self):
@@ -191,3 +253,1174 @@ class ViewLoansByCustomerTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 2)
 
+
+
+@override_settings(SWAGGER_SCHEMA_FILE=None)
+class SchemaTests(APITestCase):
+    def setUp(self):
+        clear_schema_cache()
+
+    def test_schema_generated_once_per_worker(self):
+        with mock.patch.object(OpenAPISchemaGenerator, 'get_schema', autospec=True,
+                               side_effect=OpenAPISchemaGenerator.get_schema) as get_schema:
+            first = self.client.get('/swagger.json')
+            second = self.client.get('/swagger.json')
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(get_schema.call_count, 1)
+        self.assertIn('/check-eligibility', first.json()['paths'])
+
+    def test_schema_served_from_precomputed_file(self):
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+            f.write(b'{"swagger": "2.0", "paths": {}}')
+        self.addCleanup(os.remove, f.name)
+
+        with override_settings(SWAGGER_SCHEMA_FILE=f.name):
+            response = self.client.get('/swagger.json')
+        self.assertEqual(response.json(), {"swagger": "2.0", "paths": {}})
+
+
+class HealthTests(APITestCase):
+    def test_liveness(self):
+        response = self.client.get(reverse('health_live'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_readiness_requires_warm_up(self):
+        with mock.patch.dict('core.warmup._state', {"warm": False}):
+            response = self.client.get(reverse('health_ready'))
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+            warm_up()
+            response = self.client.get(reverse('health_ready'))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['checks'], {"warm": True, "database": True})
+
+
+class LoanLifecycleTests(APITestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            customer_id="501",
+            first_name="Frank",
+            last_name="Moore",
+            age=38,
+            phone_number="7778889999",
+            monthly_salary=Decimal('90000'),
+            approved_limit=Decimal('3200000')
+        )
+        today = date.today()
+        self.live = Loan.objects.create(
+            customer=self.customer, loan_id="9001",
+            loan_amount=Decimal('300000'), tenure=24, interest_rate=12.0,
+            monthly_payment=Decimal('14000'), emis_paid_on_time=3,
+            date_of_approval=today - timedelta(days=90), end_date=today + timedelta(days=600)
+        )
+        self.expired = Loan.objects.create(
+            customer=self.customer, loan_id="9002",
+            loan_amount=Decimal('100000'), tenure=12, interest_rate=14.0,
+            monthly_payment=Decimal('9000'), emis_paid_on_time=12,
+            date_of_approval=today - timedelta(days=400), end_date=today - timedelta(days=30)
+        )
+
+    def test_active_excludes_expired_before_close_job(self):
+        self.assertTrue(Loan.objects.get(loan_id="9002").is_active)
+        self.assertEqual(list(Loan.objects.active()), [self.live])
+
+    def test_close_loans_command(self):
+        call_command('close_loans', stdout=StringIO())
+        self.assertFalse(Loan.objects.get(loan_id="9002").is_active)
+        self.assertTrue(Loan.objects.get(loan_id="9001").is_active)
+        self.assertEqual(list(Loan.objects.active()), [self.live])
+        # Historical queries still see closed loans
+        self.assertEqual(Loan.objects.filter(customer=self.customer).count(), 2)
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            customer_id="601",
+            first_name="Grace",
+            last_name="Hall",
+            age=33,
+            phone_number="6665554444",
+            monthly_salary=Decimal('65000'),
+            approved_limit=Decimal('2300000')
+        )
+        self.loan = Loan.objects.create(
+            customer=self.customer, loan_id="9101",
+            loan_amount=Decimal('200000'), tenure=12, interest_rate=13.0,
+            monthly_payment=Decimal('17900'), emis_paid_on_time=4,
+            date_of_approval='2024-06-01', end_date='2025-06-01'
+        )
+
+    def test_view_loan_not_modified(self):
+        url = reverse('view_loan', args=[9101])
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        etag = first['ETag']
+
+        with self.assertNumQueries(1):
+            second = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(second.content, b'')
+
+    def test_view_loans_etag_changes_on_write(self):
+        url = reverse('view_loans_by_customer', args=[601])
+        etag = self.client.get(url)['ETag']
+
+        Customer.objects.filter(pk=self.customer.pk).bump_version()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data), 1)
+
+    def test_unknown_loan_still_404(self):
+        response = self.client.get(reverse('view_loan', args=[424242]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class PortfolioAnalyticsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        today = date.today()
+        self.young = Customer.objects.create(
+            customer_id="701", first_name="Hank", last_name="Ito", age=25,
+            phone_number="1112223333", monthly_salary=Decimal('40000'),
+            approved_limit=Decimal('1400000')
+        )
+        self.senior = Customer.objects.create(
+            customer_id="702", first_name="Ivy", last_name="Jones", age=61,
+            phone_number="4445556666", monthly_salary=Decimal('250000'),
+            approved_limit=Decimal('9000000')
+        )
+        Loan.objects.create(
+            customer=self.young, loan_id="9201", loan_amount=Decimal('200000'),
+            tenure=24, interest_rate=12.0, monthly_payment=Decimal('9400'),
+            emis_paid_on_time=6, date_of_approval=date(2023, 5, 10),
+            end_date=today + timedelta(days=365)
+        )
+        Loan.objects.create(
+            customer=self.senior, loan_id="9202", loan_amount=Decimal('500000'),
+            tenure=12, interest_rate=10.0, monthly_payment=Decimal('44000'),
+            emis_paid_on_time=12, date_of_approval=date(2021, 1, 15),
+            end_date=date(2022, 1, 15)
+        )
+        refresh_rollups(full=True)
+
+    def test_totals_match_live_aggregates(self):
+        response = self.client.get(reverse('portfolio_analytics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        totals = response.data['totals']
+        self.assertEqual(totals['loan_count'], 2)
+        self.assertEqual(totals['outstanding_principal'], 200000.0)
+        self.assertEqual(totals['active_emi_volume'], 9400.0)
+        self.assertEqual(totals['on_time_ratio'], round(18 / 36, 4))
+        self.assertEqual(totals['approved_limit'], 10400000.0)
+        self.assertEqual(
+            [(y['year'], y['loan_count']) for y in response.data['loans_by_approval_year']],
+            [(2021, 1), (2023, 1)]
+        )
+
+    def test_group_by_age_band(self):
+        response = self.client.get(reverse('portfolio_analytics'), {'group_by': 'age_band'})
+        segments = {s['age_band']: s for s in response.data['segments']}
+        self.assertEqual(set(segments), {'<30', '60+'})
+        self.assertEqual(segments['<30']['utilization'], round(200000 / 1400000, 4))
+        self.assertEqual(segments['60+']['active_loan_count'], 0)
+
+    def test_incremental_refresh_picks_up_new_loans(self):
+        today = date.today()
+        Loan.objects.create(
+            customer=self.senior, loan_id="9203", loan_amount=Decimal('300000'),
+            tenure=12, interest_rate=11.0, monthly_payment=Decimal('26500'),
+            emis_paid_on_time=0, date_of_approval=today,
+            end_date=today + timedelta(days=365)
+        )
+        refresh_rollups()
+        totals = portfolio_summary()['totals']
+        self.assertEqual(totals['loan_count'], 3)
+        self.assertEqual(totals['outstanding_principal'], 500000.0)
+
+    def test_new_loans_and_customers_are_counted_by_the_next_refresh(self):
+        response = self.client.post(reverse('create_loan'), {
+            "customer_id": "702", "loan_amount": "300000", "interest_rate": 14.0, "tenure": 12
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(reverse('register_customer'), {
+            "first_name": "Jo", "last_name": "Kim", "age": 33, "monthly_income": 60000, "phone_number": "9990001111"
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # The requests only log the change; they never write the rollups
+        self.assertEqual(RollupChange.objects.count(), 2)
+        self.assertEqual(PortfolioRollup.objects.aggregate(n=Sum('loan_count'))['n'], 2)
+
+        refresh_rollups()
+        self.assertFalse(RollupChange.objects.exists())
+        self.assertEqual(PortfolioRollup.objects.aggregate(n=Sum('loan_count'))['n'], 3)
+        self.assertEqual(SegmentRollup.objects.aggregate(n=Sum('customer_count'))['n'], 3)
+        incremental = set(PortfolioRollup.objects.values_list(
+            'age_band', 'salary_band', 'approval_month', 'end_month', 'loan_count', 'principal'))
+        refresh_rollups(full=True)
+        self.assertEqual(set(PortfolioRollup.objects.values_list(
+            'age_band', 'salary_band', 'approval_month', 'end_month', 'loan_count', 'principal')), incremental)
+
+    def test_summary_cached_until_next_refresh(self):
+        portfolio_summary()
+        with self.assertNumQueries(1):
+            portfolio_summary()
+
+
+class RepaymentTests(APITestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            customer_id="801", first_name="Jack", last_name="King", age=42,
+            phone_number="3334445555", monthly_salary=Decimal('120000'),
+            approved_limit=Decimal('4300000')
+        )
+        self.loans = [
+            Loan.objects.create(
+                customer=self.customer, loan_id=str(loan_id), loan_amount=Decimal('240000'),
+                tenure=24, interest_rate=12.0, monthly_payment=Decimal('11300'),
+                emis_paid_on_time=2, date_of_approval=date(2024, 1, 5),
+                end_date=date(2026, 1, 5)
+            )
+            for loan_id in (9301, 9302)
+        ]
+        refresh_rollups(full=True)
+
+    def test_record_single_repayment(self):
+        response = self.client.post(reverse('repayments'), {
+            "loan_id": 9301, "amount": "11300", "due_date": "2024-04-05", "paid_on": "2024-04-03"
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(response.data['on_time'])
+        self.assertEqual(response.data['emis_paid_on_time'], 3)
+        self.assertEqual(response.data['repayments_left'], 21)
+        self.assertEqual(Customer.objects.get(pk="801").version, 1)
+
+    def test_replayed_payment_is_not_counted_again(self):
+        payment = {"loan_id": 9301, "amount": "11300", "due_date": "2024-04-05", "paid_on": "2024-04-03"}
+        first = self.client.post(reverse('repayments'), payment, format='json')
+        replay = self.client.post(reverse('repayments'), payment, format='json')
+        self.assertEqual(replay.status_code, status.HTTP_200_OK)
+        self.assertEqual(replay.data['repayment_id'], first.data['repayment_id'])
+        self.assertEqual(replay.data['emis_paid_on_time'], 3)
+        self.assertEqual(Repayment.objects.count(), 1)
+
+    def test_on_time_emis_capped_at_tenure(self):
+        loan = self.loans[0]
+        payments = [
+            {"loan_id": loan.loan_id, "amount": Decimal('11300'), "due_date": date(2024, 1, 5) + timedelta(days=31 * i),
+             "paid_on": date(2024, 1, 1) + timedelta(days=31 * i)}
+            for i in range(30)
+        ]
+        stats = ingest_repayments(payments + payments[:5])
+        self.assertEqual((stats['recorded'], stats['duplicates']), (30, 5))
+        loan.refresh_from_db()
+        self.assertEqual(loan.emis_paid_on_time, loan.tenure)
+        # The loan's approval month is recomputed, though it is before the watermark
+        refresh_rollups()
+        self.assertEqual(PortfolioRollup.objects.aggregate(n=Sum('emis_paid_on_time'))['n'], 24 + 2)
+
+    def test_unknown_loan(self):
+        response = self.client.post(reverse('repayments'), {
+            "loan_id": 404404, "amount": "100", "due_date": "2024-04-05", "paid_on": "2024-04-03"
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bulk_ingest_groups_by_loan(self):
+        payments = [
+            {"loan_id": 9301, "amount": Decimal('11300'), "due_date": date(2024, 3, 5), "paid_on": date(2024, 3, 5)},
+            {"loan_id": 9301, "amount": Decimal('11300'), "due_date": date(2024, 4, 5), "paid_on": date(2024, 4, 1)},
+            {"loan_id": 9302, "amount": Decimal('11300'), "due_date": date(2024, 3, 5), "paid_on": date(2024, 3, 20)},
+            {"loan_id": 9302, "amount": Decimal('11300'), "due_date": date(2024, 4, 5), "paid_on": date(2024, 4, 5)},
+            {"loan_id": 555, "amount": Decimal('100'), "due_date": date(2024, 4, 5), "paid_on": date(2024, 4, 5)},
+        ]
+        stats = ingest_repayments(payments, batch_size=3)
+
+        self.assertEqual((stats['recorded'], stats['on_time'], stats['rejected']), (4, 3, 1))
+        self.assertEqual(Loan.objects.get(pk="9301").emis_paid_on_time, 4)
+        self.assertEqual(Loan.objects.get(pk="9302").emis_paid_on_time, 3)
+        self.assertEqual(Repayment.objects.count(), 4)
+        # The next incremental refresh recomputes the month the loans were approved in
+        self.assertEqual(set(RollupChange.objects.values_list('approval_month', flat=True)), {date(2024, 1, 1)})
+        refresh_rollups()
+        self.assertEqual(portfolio_summary()['totals']['on_time_ratio'], round(7 / 48, 4))
+
+
+class OfferGridTests(APITestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            customer_id="901", first_name="Kate", last_name="Lee", age=36,
+            phone_number="2223334444", monthly_salary=Decimal('100000'),
+            approved_limit=Decimal('3600000')
+        )
+        today = date.today()
+        Loan.objects.create(
+            customer=self.customer, loan_id="9401", loan_amount=Decimal('300000'),
+            tenure=24, interest_rate=12.0, monthly_payment=Decimal('14100'),
+            emis_paid_on_time=20, date_of_approval=today - timedelta(days=120),
+            end_date=today + timedelta(days=600)
+        )
+
+    def grid(self, **overrides):
+        data = {
+            "customer_id": 901,
+            "loan_amount": {"min": 100000, "max": 300000, "step": 100000},
+            "tenure": {"min": 12, "max": 36, "step": 12},
+            "interest_rate": {"min": 8, "max": 16, "step": 4},
+        }
+        data.update(overrides)
+        return self.client.post(reverse('offer_grid'), data, format='json')
+
+    def test_grid_matches_check_eligibility(self):
+        response = self.grid()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['cells']), 27)
+
+        for cell in response.data['cells'][::5]:
+            single = self.client.post(reverse('check_eligibility'), {
+                "customer_id": 901,
+                "loan_amount": cell['loan_amount'],
+                "interest_rate": cell['interest_rate'],
+                "tenure": cell['tenure'],
+            }, format='json').data
+            self.assertEqual(cell['approval'], single['approval'])
+            self.assertEqual(cell['corrected_interest_rate'], single['corrected_interest_rate'])
+            self.assertAlmostEqual(cell['monthly_installment'], single['monthly_installment'], places=2)
+
+    def test_best_offer_is_largest_cheapest_approved_cell(self):
+        best = self.grid().data['best_offer']
+        self.assertEqual(best['loan_amount'], 300000)
+        self.assertTrue(best['approval'])
+        self.assertEqual(best['interest_rate'], 8)
+        self.assertEqual(best['tenure'], 36)
+
+    def test_grid_size_is_capped(self):
+        response = self.grid(loan_amount={"min": 1, "max": 100000, "step": 1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_grid_axes_are_bounded(self):
+        response = self.grid(tenure={"min": 12, "max": 100000, "step": 50000})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tenure', response.data)
+        response = self.grid(interest_rate={"min": 1e300, "max": 1e300, "step": 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.grid(interest_rate={"min": 10, "max": "Infinity", "step": 1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('interest_rate', response.data)
+
+
+class DecisionAuditTests(APITestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            customer_id="951", first_name="Omar", last_name="Shah", age=41,
+            phone_number="3334445555", monthly_salary=Decimal('80000'),
+            approved_limit=Decimal('2900000')
+        )
+        # A private buffer per test, so records queued by other tests never leak in
+        self.buffer = AuditBuffer(max_size=5, batch_size=3, flush_interval=60)
+        patcher = mock.patch('core.audit.audit_buffer', self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Leftover records must not be flushed into the real database at exit
+        patcher = mock.patch('core.audit.atexit')
+        self.atexit = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def check(self, interest_rate=10):
+        return self.client.post(reverse('check_eligibility'), {
+            "customer_id": 951, "loan_amount": 100000, "interest_rate": interest_rate, "tenure": 12
+        }, format='json')
+
+    def test_decision_is_queued_then_written_in_batch(self):
+        response = self.check()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(DecisionAudit.objects.exists())
+
+        self.assertEqual(self.buffer.flush(), 1)
+        audit = DecisionAudit.objects.get()
+        self.assertEqual(audit.customer_id, "951")
+        self.assertEqual(audit.endpoint, DecisionAudit.CHECK_ELIGIBILITY)
+        self.assertEqual(audit.approved, response.data['approval'])
+        self.assertEqual(float(audit.monthly_installment), response.data['monthly_installment'])
+        self.assertEqual(audit.inputs['tenure'], 12)
+        self.assertEqual(set(audit.score_components), {
+            'over_limit', 'paid_on_time', 'loan_count', 'current_year_activity', 'approved_volume'
+        })
+        self.assertIn(audit.slab, ('>50', '30-50', '10-30', '<=10'))
+
+    def test_full_batch_flushes_without_writer(self):
+        for _ in range(3):
+            self.check()
+        self.assertEqual(DecisionAudit.objects.count(), 3)
+        self.assertEqual(self.buffer.metrics()['queue_depth'], 0)
+
+    def test_full_queue_drops_and_counts(self):
+        self.buffer.batch_size = 100  # never reached, so nothing drains
+        for _ in range(7):
+            self.check()
+        metrics = self.buffer.metrics()
+        self.assertEqual(metrics['enqueued'], 5)
+        self.assertEqual(metrics['dropped'], 2)
+        self.assertEqual(metrics['queue_depth'], 5)
+
+    def test_create_loan_rejection_is_audited(self):
+        self.client.post(reverse('create_loan'), {
+            "customer_id": 951, "loan_amount": 5000000, "interest_rate": 20, "tenure": 12
+        }, format='json')
+        self.buffer.flush()
+        audit = DecisionAudit.objects.get(endpoint=DecisionAudit.CREATE_LOAN)
+        self.assertFalse(audit.approved)
+        self.assertIsNone(audit.loan_id)
+
+    def test_query_by_customer_and_time(self):
+        self.check()
+        self.buffer.flush()
+        DecisionAudit.objects.create(
+            customer_id="952", endpoint=DecisionAudit.CHECK_ELIGIBILITY, decided_at=timezone.now(),
+            inputs={}, score_components={}, credit_score=0, slab='<=10', approved=False,
+            corrected_interest_rate=10, monthly_installment=Decimal('0')
+        )
+
+        response = self.client.get(reverse('audit_decisions'), {"customer_id": "951"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['customer_id'] for row in response.data], ["951"])
+
+        future = (timezone.now() + timedelta(hours=1)).isoformat()
+        response = self.client.get(reverse('audit_decisions'), {"since": future})
+        self.assertEqual(response.data, [])
+
+        response = self.client.get(reverse('audit_decisions'), {"limit": 1000})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_queued_records_are_flushed_at_exit_without_a_writer(self):
+        self.check()
+        self.check()
+        self.atexit.register.assert_called_once_with(self.buffer.close)
+        self.assertFalse(DecisionAudit.objects.exists())
+        self.buffer.close()
+        self.assertEqual(DecisionAudit.objects.count(), 2)
+
+    def test_metrics_endpoint(self):
+        self.check()
+        response = self.client.get(reverse('audit_metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['enqueued'], 1)
+        self.assertEqual(response.data['queue_depth'], 1)
+        self.assertFalse(response.data['writer_running'])
+
+
+class AdmissionControlTests(APITestCase):
+    def setUp(self):
+        Customer.objects.create(
+            customer_id="961", first_name="Ravi", last_name="Nair", age=33,
+            phone_number="4445556666", monthly_salary=Decimal('60000'),
+            approved_limit=Decimal('2200000')
+        )
+        self.controller = AdmissionController(
+            policies={
+                'check_eligibility': {'concurrency': 2, 'rate': 1, 'burst': 3},
+                'view_loans_by_customer': {'priority': True},
+            },
+            max_concurrency=4, priority_reserve=1, queue_timeout=0,
+        )
+        patcher = mock.patch('core.admission.controller', self.controller)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def check(self):
+        return self.client.post(reverse('check_eligibility'), {
+            "customer_id": 961, "loan_amount": 100000, "interest_rate": 14, "tenure": 12
+        }, format='json')
+
+    def endpoint_metrics(self, name):
+        return self.controller.metrics()['endpoints'][name]
+
+    def test_rate_limit_returns_429_with_retry_after(self):
+        for _ in range(3):
+            self.assertEqual(self.check().status_code, status.HTTP_200_OK)
+        response = self.check()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        metrics = self.endpoint_metrics('check_eligibility')
+        self.assertEqual((metrics['admitted'], metrics['shed_rate_limited']), (3, 1))
+        self.assertEqual(metrics['in_flight'], 0)
+
+    def test_concurrency_limit_returns_503(self):
+        self.controller.admit('check_eligibility')
+        self.controller.admit('check_eligibility')
+        response = self.check()
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn('Retry-After', response)
+        metrics = self.endpoint_metrics('check_eligibility')
+        self.assertEqual((metrics['queued'], metrics['shed_overloaded']), (1, 1))
+
+        self.controller.release('check_eligibility')
+        self.assertEqual(self.check().status_code, status.HTTP_200_OK)
+
+    def test_priority_reads_use_reserved_capacity(self):
+        for _ in range(3):
+            self.assertIsNone(self.controller.admit('repayments'))
+        # Standard requests stop at max_concurrency - priority_reserve
+        self.assertEqual(self.controller.admit('repayments')[0], 503)
+        response = self.client.get(reverse('view_loans_by_customer', args=[961]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_dead_worker_slots_are_released(self):
+        self.controller.admit('check_eligibility')
+        self.controller.admit('repayments')
+        self.assertEqual(self.controller.metrics()['in_flight'], 2)
+        self.controller.release_worker(os.getpid())
+        self.assertEqual(self.controller.metrics()['in_flight'], 0)
+
+    def test_disabled(self):
+        with override_settings(ADMISSION_CONTROL=False):
+            for _ in range(5):
+                self.assertEqual(self.check().status_code, status.HTTP_200_OK)
+
+    def test_metrics_endpoint(self):
+        self.check()
+        response = self.client.get(reverse('admission_metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['endpoints']['check_eligibility']['admitted'], 1)
+        self.assertEqual(response.data['in_flight'], 1)  # the metrics request itself
+
+
+class JobQueueTests(APITestCase):
+    def setUp(self):
+        customer = Customer.objects.create(
+            customer_id="971", first_name="Lena", last_name="Das", age=29,
+            phone_number="5556667777", monthly_salary=Decimal('90000'),
+            approved_limit=Decimal('3200000')
+        )
+        Loan.objects.create(
+            customer=customer, loan_id="9701", loan_amount=Decimal('240000'),
+            tenure=24, interest_rate=12.0, monthly_payment=Decimal('11300'),
+            emis_paid_on_time=2, date_of_approval=date(2024, 1, 5), end_date=date(2026, 1, 5)
+        )
+        upload_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(upload_dir.cleanup)
+        self.upload_dir = upload_dir.name
+        overrides = override_settings(JOBS_UPLOAD_DIR=self.upload_dir)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_rescore_job_reports_progress_and_result(self):
+        response = self.client.post(reverse('job_rescore'), {"customer_ids": ["971"]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], Job.QUEUED)
+        self.assertTrue(response['Location'].endswith(f"/api/jobs/{response.data['id']}"))
+
+        self.assertEqual(jobs.run_pending()['succeeded'], 1)
+        job = self.client.get(reverse('job_detail', args=[response.data['id']])).data
+        self.assertEqual(job['status'], Job.SUCCEEDED)
+        self.assertEqual((job['progress_done'], job['progress_total']), (1, 1))
+        self.assertEqual(job['result']['customers'], 1)
+        self.assertIn("971", job['result']['scores'])
+
+    def test_rescore_progress_counts_the_last_partial_batch(self):
+        for i in range(4):
+            Customer.objects.create(
+                customer_id=str(972 + i), first_name="Batch", last_name=str(i), age=30,
+                phone_number=f"555666{i:04d}", monthly_salary=Decimal('50000'),
+                approved_limit=Decimal('1800000')
+            )
+        reported = []
+        jobs.TASKS['rescore_customers'].func(lambda done, total=None: reported.append((done, total)), batch_size=2)
+        # 5 customers in batches of 2: the last one is reported before the final call
+        self.assertEqual(reported, [(0, 5), (2, 5), (4, 5), (5, 5), (5, 5)])
+
+    def test_repayment_file_job(self):
+        csv_file = SimpleUploadedFile("payments.csv", (
+            b"Loan ID,Amount,Due Date,Paid On\n"
+            b"9701,11300,2024-03-05,2024-03-01\n"
+            b"9701,11300,2024-04-05,2024-04-09\n"
+            b"404,100,2024-04-05,2024-04-05\n"
+        ), content_type="text/csv")
+        response = self.client.post(reverse('job_ingest_repayments'), {"file": csv_file, "batch_size": 2},
+                                    format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        jobs.run_pending()
+        job = jobs.get_job(response.data['id'])
+        self.assertEqual(job['status'], Job.SUCCEEDED)
+        self.assertEqual((job['progress_done'], job['progress_total']), (3, 3))
+        self.assertEqual((job['result']['recorded'], job['result']['rejected']), (2, 1))
+        self.assertEqual(Loan.objects.get(pk="9701").emis_paid_on_time, 3)
+        self.assertEqual(os.listdir(self.upload_dir), [])
+
+    def test_failed_job_is_retried_then_gives_up(self):
+        calls = []
+
+        @jobs.task(name='flaky_test_task', max_retries=2, retry_delay=0)
+        def flaky(progress, fail_times):
+            calls.append(1)
+            if len(calls) <= fail_times:
+                raise RuntimeError("boom")
+            return {"calls": len(calls)}
+        self.addCleanup(jobs.TASKS.pop, 'flaky_test_task')
+
+        job_id = jobs.enqueue('flaky_test_task', fail_times=2)
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertEqual(jobs.run_pending(), {'failed': 2, 'succeeded': 1})
+        job = jobs.get_job(job_id)
+        self.assertEqual((job['status'], job['attempts'], job['result']), (Job.SUCCEEDED, 3, {"calls": 3}))
+
+        calls.clear()
+        job_id = jobs.enqueue('flaky_test_task', fail_times=5)
+        with self.assertLogs('core.jobs', 'ERROR') as logs:
+            jobs.run_pending()
+        self.assertEqual(len(logs.records), 3)
+        job = jobs.get_job(job_id)
+        self.assertEqual((job['status'], job['attempts']), (Job.FAILED, 3))
+        self.assertEqual(job['error'], "RuntimeError: boom")
+
+    def test_retry_waits_for_backoff(self):
+        @jobs.task(name='failing_test_task', max_retries=1, retry_delay=60)
+        def failing(progress):
+            raise ValueError("nope")
+        self.addCleanup(jobs.TASKS.pop, 'failing_test_task')
+
+        job_id = jobs.enqueue('failing_test_task')
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertEqual(jobs.run_pending(), {'failed': 1})
+        job = jobs.get_job(job_id)
+        self.assertEqual(job['status'], Job.RETRYING)
+        self.assertGreater(job['run_after'], timezone.now())
+
+    def test_job_of_a_dead_worker_is_retried_when_its_lease_expires(self):
+        job_id = jobs.enqueue('refresh_analytics', full=True)
+        claimed = jobs.get_backend().claim()  # a worker that then dies
+        self.assertEqual(claimed['id'], job_id)
+        self.assertGreater(claimed['lease_expires_at'], timezone.now())
+
+        jobs.get_backend().heartbeat(job_id)
+        self.assertEqual(jobs.run_pending(), {})  # lease still held
+
+        Job.objects.filter(pk=job_id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+        jobs.TASKS['refresh_analytics'].retry_delay = 0
+        self.addCleanup(setattr, jobs.TASKS['refresh_analytics'], 'retry_delay', settings.JOBS_RETRY_DELAY)
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertEqual(jobs.run_pending(), {'succeeded': 1})
+        job = jobs.get_job(job_id)
+        self.assertEqual((job['status'], job['attempts'], job['lease_expires_at']), (Job.SUCCEEDED, 2, None))
+
+    def test_expired_job_without_retries_fails(self):
+        path = os.path.join(self.upload_dir, "payments.csv")
+        with open(path, "w") as f:
+            f.write("Loan ID,Amount,Due Date,Paid On\n")
+        job_id = jobs.enqueue('ingest_repayments_file', path=path)
+        jobs.get_backend().claim()
+        Job.objects.filter(pk=job_id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertEqual(jobs.requeue_expired(), 1)
+        job = jobs.get_job(job_id)
+        self.assertEqual(job['status'], Job.FAILED)
+        self.assertIn("Lease expired", job['error'])
+
+    def test_worker_rebuilds_pool_when_a_child_dies(self):
+        from concurrent.futures import Future
+        from concurrent.futures.process import BrokenProcessPool
+
+        class FakePool:
+            def __init__(self, broken):
+                self.broken = broken
+
+            def submit(self, func, *args):
+                future = Future()
+                if self.broken:
+                    future.set_exception(BrokenProcessPool("child died"))
+                else:
+                    future.set_result(func(*args))
+                return future
+
+            def shutdown(self, wait=True, cancel_futures=False):
+                pass
+
+        pools = iter([FakePool(broken=True), FakePool(broken=False)])
+        jobs.TASKS['refresh_analytics'].retry_delay = 0
+        self.addCleanup(setattr, jobs.TASKS['refresh_analytics'], 'retry_delay', settings.JOBS_RETRY_DELAY)
+        job_id = jobs.enqueue('refresh_analytics', full=True)
+        with mock.patch('core.jobs._new_pool', lambda processes: next(pools)), \
+                mock.patch('core.jobs.close_old_connections'), mock.patch('core.jobs.signal.signal'), \
+                self.assertLogs('core.jobs', 'ERROR'):
+            counts = jobs.run_worker(2, burst=True, poll_interval=0.01)
+        self.assertEqual(counts, {'failed': 1, 'succeeded': 1})
+        job = jobs.get_job(job_id)
+        self.assertEqual((job['status'], job['attempts']), (Job.SUCCEEDED, 2))
+
+    def test_bad_params_are_rejected_at_enqueue(self):
+        with self.assertRaises(TypeError):
+            jobs.enqueue('rescore_customers', unknown=1)
+        self.assertFalse(Job.objects.exists())
+
+    def test_unknown_job(self):
+        response = self.client.get(reverse('job_detail', args=['missing']))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_worker_command_in_process(self):
+        jobs.enqueue('refresh_analytics', full=True)
+        out = StringIO()
+        call_command('run_jobs', processes=0, burst=True, stdout=out)
+        self.assertIn("1 succeeded", out.getvalue())
+
+
+class CustomerSearchTests(APITestCase):
+    def setUp(self):
+        people = [
+            ("981", "Anita", "Rao", "9876501234"),
+            ("982", "anil", "Kumar", "9123401234"),
+            ("983", "Arun", "Anand", "9000055555"),
+            ("984", "Bina", "Andrews", "9000001234"),
+            ("985", "ANJALI", "Mehta", "8000012345"),
+        ]
+        for customer_id, first_name, last_name, phone in people:
+            Customer.objects.create(
+                customer_id=customer_id, first_name=first_name, last_name=last_name, age=30,
+                phone_number=phone, monthly_salary=Decimal('50000'), approved_limit=Decimal('1800000')
+            )
+
+    def search(self, **params):
+        return self.client.get(reverse('customer_search'), params)
+
+    def ids(self, response):
+        return [row['customer_id'] for row in response.data['results']]
+
+    def test_phone_exact_and_suffix(self):
+        self.assertEqual(self.ids(self.search(phone="98765-01234")), ["981"])
+        self.assertEqual(sorted(self.ids(self.search(phone_suffix="1234"))), ["981", "982", "984"])
+        self.assertEqual(self.ids(self.search(phone_suffix="12345")), ["985"])
+
+    def test_name_prefix_is_case_insensitive(self):
+        self.assertEqual(self.ids(self.search(first_name="AN")), ["982", "981", "985"])
+        self.assertEqual(self.ids(self.search(last_name="an")), ["983", "984"])
+        self.assertEqual(self.ids(self.search(first_name="zz")), [])
+
+    def test_prefix_ending_in_last_letter_or_digit(self):
+        for customer_id, first_name, phone in (("986", "Liz", "7000000099"), ("987", "Lizzy", "7000001999"),
+                                               ("988", "Lj", "7000000001")):
+            Customer.objects.create(
+                customer_id=customer_id, first_name=first_name, last_name="Zed", age=30,
+                phone_number=phone, monthly_salary=Decimal('50000'), approved_limit=Decimal('1800000')
+            )
+        self.assertEqual(self.ids(self.search(first_name="liz")), ["986", "987"])
+        self.assertEqual(self.ids(self.search(last_name="z")), ["986", "987", "988"])
+        self.assertEqual(self.ids(self.search(phone_suffix="999")), ["987"])
+
+    def test_range_search_is_bytewise_on_every_backend(self):
+        # The prefix range is only correct in code point order, so it must not
+        # depend on the database's default collation (linguistic on most Postgres)
+        index_expressions = {index.name: index.expressions[0] for index in Customer._meta.indexes if index.expressions}
+        for criterion, index_name in (('phone_suffix', 'customer_phone_suffix_idx'),
+                                      ('first_name', 'customer_first_name_idx'),
+                                      ('last_name', 'customer_last_name_idx')):
+            expression = CRITERIA[criterion][0]
+            self.assertIsInstance(expression, Bytewise)
+            # Postgres only uses the index when the query expression matches it
+            self.assertEqual(expression, index_expressions[index_name])
+
+        postgres = mock.Mock(vendor='postgresql')
+        postgres.ops.quote_name = lambda name: f'"{name}"'
+        compiler = mock.Mock()
+        compiler.compile.return_value = ('LOWER("first_name")', [])
+        self.assertEqual(Bytewise(Lower('first_name')).as_sql(compiler, postgres)[0], 'LOWER("first_name") COLLATE "C"')
+
+        sql = str(Customer.objects.annotate(key=CRITERIA['first_name'][0]).filter(key__gte='a').order_by('key').query)
+        self.assertEqual(sql.count('COLLATE BINARY'), 2)
+
+    def test_keyset_pagination_visits_every_match_once(self):
+        seen, cursor = [], None
+        while True:
+            params = {"first_name": "a", "limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = self.search(**params)
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen += self.ids(response)
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, ["982", "981", "985", "983"])
+
+    def test_invalid_queries(self):
+        self.assertEqual(self.search().status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.search(phone="1", first_name="a").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.search(phone_suffix="12").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.search(first_name="a", cursor="bogus").status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ScoringTests(APITestCase):
+    def setUp(self):
+        rng = random.Random(7)
+        for i in range(40):
+            customer = Customer.objects.create(
+                customer_id=str(990 + i), first_name="Scored", last_name=str(i), age=25 + i % 30,
+                phone_number=f"70000{i:05d}", monthly_salary=Decimal(40000 + 1000 * i),
+                approved_limit=Decimal(1500000 + 36000 * i)
+            )
+            for j in range(rng.randint(0, 4)):
+                tenure = rng.choice([12, 24, 36])
+                start = date(2020 + rng.randint(0, 5), rng.randint(1, 12), 1)
+                Loan.objects.create(
+                    customer=customer, loan_id=str(99000 + 10 * i + j),
+                    loan_amount=Decimal(rng.randint(50, 900) * 1000), tenure=tenure, interest_rate=12.0,
+                    monthly_payment=Decimal(rng.randint(2, 30) * 1000),
+                    emis_paid_on_time=rng.randint(0, tenure), date_of_approval=start,
+                    end_date=start + timedelta(days=30 * tenure)
+                )
+        # Over its limit: scored 0 by rule whatever the model predicts
+        self.over_limit = Customer.objects.get(customer_id="990")
+        Loan.objects.create(
+            customer=self.over_limit, loan_id="99999", loan_amount=Decimal('5000000'), tenure=60,
+            interest_rate=12.0, monthly_payment=Decimal('5000'), emis_paid_on_time=0,
+            date_of_approval=date.today(), end_date=date.today() + timedelta(days=1800)
+        )
+
+        model_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(model_dir.cleanup)
+        self.model_path = os.path.join(model_dir.name, 'credit_scorer.joblib')
+
+    def train(self):
+        call_command('train_scorer', output=self.model_path, max_iter=50, min_samples_leaf=2, verbosity=0)
+        return ModelScorer(self.model_path, budget_ms=1000)
+
+    def test_heuristic_is_the_default(self):
+        self.assertIsInstance(get_scorer(), HeuristicScorer)
+
+    def test_model_scores_single_and_batch_alike(self):
+        scorer = self.train()
+        customers = list(Customer.objects.order_by('pk'))
+        batch = scorer.score_many(customers)
+        heuristic = HeuristicScorer().score_many(customers)
+        for customer in customers:
+            score, components = scorer.score(customer, customer.loans.all())
+            self.assertEqual(score, batch[customer.pk])
+            self.assertTrue(0 <= score <= 100)
+            self.assertIn('model', components)
+        # Distilled from the heuristic, so close to it on average
+        errors = [abs(batch[pk] - heuristic[pk]) for pk in heuristic]
+        self.assertLess(sum(errors) / len(errors), 5)
+        self.assertEqual(batch[self.over_limit.pk], 0)
+        self.assertEqual(scorer.stats["fallbacks"], 0)
+
+    def test_heuristic_batch_matches_single_scores_in_one_query(self):
+        scorer = HeuristicScorer()
+        customers = list(Customer.objects.order_by('pk'))
+        with self.assertNumQueries(2):
+            batch = scorer.score_many(customers, batch_size=25)
+        for customer in customers:
+            self.assertEqual(batch[customer.pk], scorer.score(customer, customer.loans.all())[0])
+        self.assertEqual(batch[self.over_limit.pk], 0)
+
+    def test_eligibility_uses_the_configured_scorer(self):
+        scorer = self.train()
+        with override_settings(CREDIT_SCORER='model'), mock.patch.dict('core.scoring._scorers', {'model': scorer}):
+            response = self.client.post(reverse('check_eligibility'), {
+                "customer_id": "995", "loan_amount": "100000", "interest_rate": 12.0, "tenure": 12
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(scorer.stats["requests"], 1)
+
+    def test_missing_artifact_falls_back_to_heuristic(self):
+        scorer = ModelScorer(self.model_path, budget_ms=1000)
+        customer = Customer.objects.get(customer_id="995")
+        with self.assertLogs('core.scoring', 'ERROR'):
+            score, components = scorer.score(customer, customer.loans.all())
+        self.assertEqual(score, HeuristicScorer().score(customer, customer.loans.all())[0])
+        self.assertNotIn('model', components)
+        self.assertEqual(scorer.stats["fallbacks"], 1)
+
+        # Over-limit customers skip predict, but still need the artifact's version
+        with self.assertLogs('core.scoring', 'ERROR'):
+            score, components = scorer.score(self.over_limit, self.over_limit.loans.all())
+        self.assertEqual(score, 0)
+        self.assertNotIn('model', components)
+        self.assertEqual(scorer.stats["fallbacks"], 2)
+
+
+class ProfileCacheTests(APITestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            customer_id="1051", first_name="Ravi", last_name="Iyer", age=41,
+            phone_number="6665554444", monthly_salary=Decimal('80000'),
+            approved_limit=Decimal('2900000')
+        )
+        Loan.objects.create(
+            customer=self.customer, loan_id="10501", loan_amount=Decimal('300000'),
+            tenure=36, interest_rate=13.0, monthly_payment=Decimal('10100'),
+            emis_paid_on_time=20, date_of_approval=date(2023, 6, 1), end_date=date(2099, 6, 1)
+        )
+        self.cache = ProfileCache(max_entries=100, max_bytes=1024 * 1024)
+        patcher = mock.patch('core.profiles.profile_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def check(self, loan_amount="100000"):
+        return self.client.post(reverse('check_eligibility'), {
+            "customer_id": "1051", "loan_amount": loan_amount, "interest_rate": 14.0, "tenure": 12
+        }, format='json')
+
+    def test_repeat_request_is_served_from_the_cache(self):
+        first = self.check()
+        # Only the customer row (which carries the version) is read on a hit
+        with self.assertNumQueries(1):
+            second = self.check()
+        self.assertEqual(first.data, second.data)
+        metrics = self.client.get(reverse('profile_cache_metrics')).data
+        self.assertEqual((metrics['misses'], metrics['hits'], metrics['entries']), (1, 1, 1))
+        self.assertEqual(metrics['hit_rate'], 0.5)
+        self.assertGreater(metrics['bytes'], 0)
+
+    def test_version_bump_invalidates_across_workers(self):
+        self.check()
+        # A bulk write elsewhere: no signal reaches this worker, only the version changes
+        Loan.objects.filter(loan_id="10501").update(loan_amount=Decimal('2850000'))
+        self.assertEqual(self.cache.get(Customer.objects.get(pk="1051")).active_principal, 30000000)
+        Customer.objects.filter(pk="1051").bump_version()
+        profile = self.cache.get(Customer.objects.get(pk="1051"))
+        self.assertEqual(profile.active_principal, 285000000)
+        self.assertEqual(self.cache.metrics()['stale'], 1)
+
+    def test_saving_a_loan_invalidates_in_this_worker(self):
+        self.check()
+        Loan.objects.create(
+            customer=self.customer, loan_id="10502", loan_amount=Decimal('50000'),
+            tenure=12, interest_rate=13.0, monthly_payment=Decimal('4500'),
+            emis_paid_on_time=0, date_of_approval=date(2024, 1, 1), end_date=date(2099, 1, 1)
+        )
+        self.assertEqual(self.cache.metrics()['entries'], 0)
+        self.assertEqual(self.cache.get(self.customer).loan_count, 2)
+
+    def test_profile_expires_at_the_end_of_the_day(self):
+        profile = self.cache.get(self.customer)
+        profile.as_of -= 1
+        self.assertIsNot(self.cache.get(self.customer), profile)
+
+    def test_cached_score_matches_the_queryset_rules(self):
+        scorer = HeuristicScorer()
+        self.assertEqual(
+            scorer.score_profile(build_profile(self.customer)),
+            scorer.score(self.customer, self.customer.loans.all()),
+        )
+
+    def test_caps_evict_least_recently_used(self):
+        profile = build_profile(self.customer)
+        cache = ProfileCache(max_entries=2, max_bytes=profile.size() * 10)
+        for customer_id in ("a", "b", "c"):
+            cache.put(CustomerProfile(**{name: getattr(profile, name) for name in CustomerProfile.__slots__}
+                                      | {"customer_id": customer_id}))
+        self.assertEqual(list(cache._entries), ["b", "c"])
+
+        cache = ProfileCache(max_entries=100, max_bytes=int(profile.size() * 2.5))
+        for customer_id in ("a", "b", "c", "d"):
+            cache.put(CustomerProfile(**{name: getattr(profile, name) for name in CustomerProfile.__slots__}
+                                      | {"customer_id": customer_id}))
+        self.assertEqual(cache.metrics()['entries'], 2)
+        self.assertEqual(cache.metrics()['evictions'], 2)
+
+
+class IdAllocatorTests(APITestCase):
+    def test_ids_start_above_stored_ones_and_blocks_do_not_overlap(self):
+        Customer.objects.create(
+            customer_id="500", first_name="Ida", last_name="Rao", age=30, phone_number="9998887777",
+            monthly_salary=Decimal('50000'), approved_limit=Decimal('1800000')
+        )
+        first, second = IdAllocator(block_size=10), IdAllocator(block_size=10)
+        self.assertEqual([first.next_id('customer') for _ in range(3)], ["501", "502", "503"])
+        self.assertEqual(second.next_id('customer'), "511")
+
+        first.advance_past('customer', 1000)
+        self.assertEqual(first.next_id('customer'), "1001")
+
+    def test_registration_assigns_an_id(self):
+        response = self.client.post(reverse('register_customer'), {
+            "first_name": "Omar", "last_name": "Sethi", "age": 31,
+            "monthly_income": "40000.00", "phone_number": "9090909090"
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Customer.objects.filter(pk=str(response.data['customer_id'])).exists())
+
+
+class ShardHashTests(SimpleTestCase):
+    @override_settings(SHARDS=['shard0', 'shard1', 'shard2'])
+    def test_customers_spread_evenly_and_stably(self):
+        placements = [shard_for(customer_id) for customer_id in range(3000)]
+        for alias in settings.SHARDS:
+            self.assertAlmostEqual(placements.count(alias), 1000, delta=100)
+        self.assertEqual(shard_for(42), shard_for("42"))
+        self.assertEqual(placements, [shard_for(customer_id) for customer_id in range(3000)])
+
+    @override_settings(SHARDS=['default'])
+    def test_one_shard_is_the_default_database(self):
+        self.assertFalse(sharding.is_sharded())
+        self.assertEqual(shard_for(7), 'default')
+
+    @override_settings(SHARDS=['shard0', 'shard1', 'shard2'])
+    def test_fan_out_pool_is_built_once_and_replaced_cleanly(self):
+        with mock.patch.dict('core.sharding._pool', {"executor": None, "size": 0, "pid": None}):
+            first = sharding._executor(2)
+            self.addCleanup(first.shutdown)
+            self.assertIs(sharding._executor(3), first)
+            self.assertEqual(first._max_workers, 3)
+
+            second = sharding._executor(5)
+            self.addCleanup(second.shutdown)
+            self.assertIsNot(second, first)
+            self.assertTrue(first._shutdown)
+
+
+@skipUnless(len(settings.SHARDS) > 1, "set SHARD_DATABASE_URLS to two or more databases")
+class ShardingTests(TransactionTestCase):
+    databases = '__all__'
+
+    def register(self, first_name, phone_number):
+        response = self.client.post(reverse('register_customer'), {
+            "first_name": first_name, "last_name": "Shard", "age": 35,
+            "monthly_income": "90000.00", "phone_number": phone_number
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return str(response.data['customer_id'])
+
+    def create_loan(self, customer_id):
+        response = self.client.post(reverse('create_loan'), {
+            "customer_id": customer_id, "loan_amount": "100000", "interest_rate": 14.0, "tenure": 12
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        return str(response.data['loan_id'])
+
+    def setUp(self):
+        self.customers = [self.register(f"Name{i:02d}", f"90000{i:05d}") for i in range(12)]
+        self.loans = {customer_id: self.create_loan(customer_id) for customer_id in self.customers}
+
+    def test_customers_and_loans_live_on_their_hash_shard(self):
+        used = set()
+        for customer_id, loan_id in self.loans.items():
+            alias = shard_for(customer_id)
+            used.add(alias)
+            self.assertTrue(Customer.objects.using(alias).filter(pk=customer_id).exists())
+            self.assertTrue(Loan.objects.using(alias).filter(pk=loan_id, customer_id=customer_id).exists())
+            for other in set(settings.SHARDS) - {alias}:
+                self.assertFalse(Customer.objects.using(other).filter(pk=customer_id).exists())
+            self.assertEqual(LoanDirectory.objects.get(pk=loan_id).customer_id, customer_id)
+        self.assertGreater(len(used), 1)
+
+    def test_failed_loan_insert_leaves_no_directory_entry(self):
+        customer = Customer.objects.using(shard_for(self.customers[0])).get(pk=self.customers[0])
+        before = LoanDirectory.objects.count()
+        loan = Loan(customer=customer, loan_amount=Decimal('1000'), tenure=None, interest_rate=10.0,
+                    monthly_payment=Decimal('100'), emis_paid_on_time=0,
+                    date_of_approval=date.today(), end_date=date.today())
+        with self.assertRaises(IntegrityError):
+            loan.save()
+        self.assertEqual(LoanDirectory.objects.count(), before)
+        self.assertEqual(loan.loan_id, '')
+
+    def test_loan_and_customer_endpoints_find_the_shard(self):
+        customer_id, loan_id = next(iter(self.loans.items()))
+        response = self.client.get(reverse('view_loan', args=[loan_id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(str(response.data['customer']['id']), customer_id)
+        self.assertEqual(len(self.client.get(reverse('view_loans_by_customer', args=[customer_id])).data), 1)
+        self.assertEqual(self.client.get(reverse('view_loan', args=[987654321])).status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+        response = self.client.post(reverse('repayments'), {
+            "loan_id": loan_id, "amount": "9000", "due_date": "2026-01-05", "paid_on": "2026-01-01"
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['emis_paid_on_time'], 1)
+
+    def test_search_merges_shards_in_order(self):
+        seen, cursor = [], None
+        while True:
+            params = {"first_name": "name", "limit": 5}
+            if cursor:
+                params["cursor"] = cursor
+            response = self.client.get(reverse('customer_search'), params)
+            seen += [row['name'] for row in response.data['results']]
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, [f"Name{i:02d} Shard" for i in range(12)])
+
+    def test_cross_shard_work_fans_out(self):
+        stats = ingest_repayments(
+            {"loan_id": loan_id, "amount": Decimal('9000'), "due_date": date(2026, 1, 5), "paid_on": date(2026, 1, 1)}
+            for loan_id in list(self.loans.values()) + ["404"]
+        )
+        self.assertEqual((stats['recorded'], stats['rejected']), (12, 1))
+
+        refresh_rollups(full=True)
+        totals = portfolio_summary()['totals']
+        self.assertEqual((totals['customer_count'], totals['loan_count']), (12, 12))
+
+        job_id = jobs.enqueue('rescore_customers')
+        self.assertEqual(jobs.run_pending()['succeeded'], 1)
+        self.assertEqual(jobs.get_job(job_id)['result']['customers'], 12)
+
+    def test_queries_without_a_shard_are_refused(self):
+        with self.assertRaises(ShardNotSelected):
+            Customer.objects.count()
+        with use_shard(shard_for(self.customers[0])):
+            self.assertTrue(Customer.objects.filter(pk=self.customers[0]).exists())
+
+
+class MoneyPropertyTests(SimpleTestCase):
+    """Randomized property checks of core.money over seeded inputs."""
+    CASES = 2000
+
+    def random_loans(self, seed):
+        rng = random.Random(seed)
+        for _ in range(self.CASES):
+            principal = rng.randrange(100_000, 10_000_000_000)  # 1,000 to 10 crore rupees, in paise
+            tenure = rng.randint(1, 360)
+            rate_bp = rng.choice((0, rng.randint(1, 3000)))
+            yield principal, tenure, rate_bp
+
+    @staticmethod
+    def float_emi(principal, tenure, rate_bp):
+        # The pre-fixed-point float formula, in paise
+        if rate_bp == 0:
+            return principal / tenure
+        r = rate_bp / 100 / 12 / 100
+        return principal * r * (1 + r) ** tenure / ((1 + r) ** tenure - 1)
+
+    def test_exact_emi_matches_float_formula(self):
+        for principal, tenure, rate_bp in self.random_loans(1):
+            self.assertLessEqual(
+                abs(emi_paise(principal, tenure, rate_bp) - self.float_emi(principal, tenure, rate_bp)), 0.5 + 1e-6
+            )
+
+    def test_vectorized_emi_matches_exact(self):
+        loans = list(self.random_loans(2))
+        principal, tenure, rate_bp = (np.array(column) for column in zip(*loans))
+        vectorized = emi_paise_array(principal, tenure, rate_bp)
+        exact = np.array([emi_paise(*loan) for loan in loans])
+        self.assertLessEqual(int(np.abs(vectorized - exact).max()), 1)
+
+    def test_vectorized_emi_rejects_overflow(self):
+        with self.assertRaises(ValueError):
+            emi_paise_array(np.array([10_000_000]), np.array([100_000]), np.array([1200]))
+
+    def test_emi_monotonic_and_covers_principal(self):
+        for principal, tenure, rate_bp in self.random_loans(3):
+            emi = emi_paise(principal, tenure, rate_bp)
+            self.assertGreaterEqual(emi * tenure, principal - tenure)
+            self.assertGreaterEqual(emi_paise(principal, tenure, rate_bp + 1), emi)
+            if tenure > 1:
+                self.assertLessEqual(emi, emi_paise(principal, tenure - 1, rate_bp))
+
+    def test_paise_round_trip(self):
+        rng = random.Random(4)
+        for _ in range(self.CASES):
+            amount = Decimal(rng.randrange(0, 10**12)) / 100
+            self.assertEqual(from_paise(to_paise(amount)), amount)
+            self.assertEqual(to_paise(float(amount)), to_paise(amount))
+
+    def test_share_comparison_is_exact(self):
+        self.assertFalse(exceeds_share(5000, 10000, 1, 2))
+        self.assertTrue(exceeds_share(5001, 10000, 1, 2))
+        self.assertEqual(to_basis_points(13.01), 1301)
+        self.assertEqual(calculate_monthly_installment(Decimal('100000'), 12, 14.0), 8978.71)
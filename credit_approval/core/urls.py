@@ -1,13 +1,29 @@
 from django.urls import path
 from .views import (
-    RegisterCustomerAPIView, CheckEligibilityAPIView,
-    CreateLoanAPIView, ViewLoanAPIView, ViewLoansByCustomerAPIView
+    RegisterCustomerAPIView, CustomerSearchAPIView, CheckEligibilityAPIView,
+    CreateLoanAPIView, ViewLoanAPIView, ViewLoansByCustomerAPIView,
+    OfferGridAPIView, RepaymentAPIView, PortfolioAnalyticsAPIView, LivenessAPIView, ReadinessAPIView,
+    DecisionAuditAPIView, DecisionAuditMetricsAPIView, AdmissionMetricsAPIView, ProfileCacheMetricsAPIView,
+    RepaymentFileJobAPIView, RescoreJobAPIView, JobDetailAPIView
 )
 
 urlpatterns = [
     path('register', RegisterCustomerAPIView.as_view(), name='register_customer'),
+    path('customers/search', CustomerSearchAPIView.as_view(), name='customer_search'),
     path('check-eligibility', CheckEligibilityAPIView.as_view(), name='check_eligibility'),
     path('create-loan', CreateLoanAPIView.as_view(), name='create_loan'),
+    path('offer-grid', OfferGridAPIView.as_view(), name='offer_grid'),
     path('view-loan/<int:loan_id>', ViewLoanAPIView.as_view(), name='view_loan'),
     path('view-loans/<int:customer_id>', ViewLoansByCustomerAPIView.as_view(), name='view_loans_by_customer'),
+    path('repayments', RepaymentAPIView.as_view(), name='repayments'),
+    path('analytics/portfolio', PortfolioAnalyticsAPIView.as_view(), name='portfolio_analytics'),
+    path('audit/decisions', DecisionAuditAPIView.as_view(), name='audit_decisions'),
+    path('audit/metrics', DecisionAuditMetricsAPIView.as_view(), name='audit_metrics'),
+    path('jobs/ingest-repayments', RepaymentFileJobAPIView.as_view(), name='job_ingest_repayments'),
+    path('jobs/rescore', RescoreJobAPIView.as_view(), name='job_rescore'),
+    path('jobs/<str:job_id>', JobDetailAPIView.as_view(), name='job_detail'),
+    path('profile-cache/metrics', ProfileCacheMetricsAPIView.as_view(), name='profile_cache_metrics'),
+    path('admission/metrics', AdmissionMetricsAPIView.as_view(), name='admission_metrics'),
+    path('health/live', LivenessAPIView.as_view(), name='health_live'),
+    path('health/ready', ReadinessAPIView.as_view(), name='health_ready'),
 ]
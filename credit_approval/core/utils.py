@@ -1,6 +1,7 @@
-from django.db import models
+import calendar
+from django.db import connections, models, router
 from datetime import datetime
-import math
+from .money import emi_paise, to_basis_points, to_paise, to_rupees
 
 def calculate_monthly_installment(principal, tenure_in_months, annual_interest_rate):
     """
@@ -11,33 +12,37 @@ def calculate_monthly_installment(principal, tenure_in_months, annual_interest_r
     P = principal loan amount
     r = monthly interest rate (annual_interest_rate/12/100)
     n = tenure in months
+
+    Computed exactly in integer paise by core.money and returned in rupees.
     """
-    if annual_interest_rate == 0:
-        return principal / tenure_in_months
-    
-    r = annual_interest_rate / 12 / 100
-    n = tenure_in_months
-    emi = principal * r * (1 + r)**n / ((1 + r)**n - 1)
-    return round(emi, 2)
+    emi = emi_paise(to_paise(principal), tenure_in_months, to_basis_points(annual_interest_rate))
+    return to_rupees(emi)
 
-def calculate_credit_score(customer, loans_queryset):
+def add_months(day, months):
+    """`day` moved forward by whole months, clamped to the end of shorter months."""
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    return day.replace(year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1]))
+
+SCORE_COMPONENTS = ('paid_on_time', 'loan_count', 'current_year_activity', 'approved_volume')
+
+
+def credit_score_components(customer, loans_queryset):
     """
-    Calculate credit score based on:
-    i. Past loans paid on time
-    ii. Number of loans taken
-    iii. Loan activity current year
-    iv. Loan approved volume
-    v. > approved_limit condition results in 0
-    
-    Returns an int score between 0-100.
+    Points awarded per credit score component:
+    i. Past loans paid on time (max 30)
+    ii. Number of loans taken (max 20)
+    iii. Loan activity current year (max 20)
+    iv. Loan approved volume (max 30)
+    v. > approved_limit condition sets `over_limit` and awards no points
     """
     # Sum of current loans (active loans)
-    sum_current_loans = loans_queryset.filter(end_date__gte=datetime.now().date()).aggregate(
+    sum_current_loans = loans_queryset.active().aggregate(
         total=models.Sum('loan_amount')
     )['total'] or 0
     
     if sum_current_loans > customer.approved_limit:
-        return 0
+        return over_limit_components()
     
     # Number of loans taken (count)
     num_loans = loans_queryset.count()
@@ -54,16 +59,69 @@ def calculate_credit_score(customer, loans_queryset):
     
     # Loan approved volume: sum of loan_amounts
     approved_volume = loans_queryset.aggregate(total=models.Sum('loan_amount'))['total'] or 0
-    
-    # Assign weights to different components (customizable)
-    score = 0
-    score += min(30, paid_on_time_ratio * 30)  # max 30 points
-    score += min(20, max(0, 20 - num_loans))    # fewer loans better, max 20
-    score += min(20, current_year_loans * 4)   # more activity up to 20
     approved_volume_float = float(approved_volume)
     approved_limit_float = float(customer.approved_limit)
 
-    score += min(30, max(0, 30 - (approved_volume_float / approved_limit_float) * 30))  # volume penalty
+    return award_points(paid_on_time_ratio, num_loans, current_year_loans,
+                        approved_volume_float / approved_limit_float)
+
+
+def award_points(paid_on_time_ratio, num_loans, current_year_loans, approved_volume_ratio):
+    """Components for a customer within their approved limit."""
+    # Assign weights to different components (customizable)
+    return {
+        "over_limit": False,
+        "paid_on_time": min(30, paid_on_time_ratio * 30),  # max 30 points
+        "loan_count": min(20, max(0, 20 - num_loans)),    # fewer loans better, max 20
+        "current_year_activity": min(20, current_year_loans * 4),   # more activity up to 20
+        "approved_volume": min(30, max(0, 30 - approved_volume_ratio * 30)),  # volume penalty
+    }
+
+
+def over_limit_components():
+    return dict.fromkeys(SCORE_COMPONENTS, 0) | {"over_limit": True}
 
+
+def score_from_components(components):
+    if components["over_limit"]:
+        return 0
+    return int(min(100, sum(components[name] for name in SCORE_COMPONENTS)))
+
+
+def calculate_credit_score(customer, loans_queryset):
+    """
+    Calculate credit score from credit_score_components().
     
-    return int(min(100, score))
+    Returns an int score between 0-100.
+    """
+    return score_from_components(credit_score_components(customer, loans_queryset))
+
+
+def bulk_increment(model, field_name, deltas):
+    """
+    Add deltas[pk] to `field_name` for every pk in `deltas` with one
+    UPDATE ... FROM (VALUES ...) statement. The increment happens in the
+    database, so concurrent writers never lose updates, and the statement
+    costs the same whether it touches ten rows or ten thousand.
+
+    Needs PostgreSQL or SQLite 3.33+ (UPDATE ... FROM).
+    """
+    if not deltas:
+        return 0
+    connection = connections[router.db_for_write(model)]
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    pk = qn(model._meta.pk.column)
+    column = qn(model._meta.get_field(field_name).column)
+    values = ", ".join(["(%s, %s)"] * len(deltas))
+    params = [value for item in deltas.items() for value in item]
+
+    # The CTE names the VALUES columns portably across both backends
+    sql = (
+        f"WITH deltas (pk, delta) AS (VALUES {values}) "
+        f"UPDATE {table} SET {column} = {table}.{column} + deltas.delta "
+        f"FROM deltas WHERE {table}.{pk} = deltas.pk"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
@@ -1,19 +1,46 @@
 from django.shortcuts import render
 from datetime import datetime
-from django.db import models
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Customer, Loan
+from .models import Customer, DecisionAudit, Loan
 from .serializers import (
     CustomerRegisterSerializer, CustomerResponseSerializer,
     CheckEligibilitySerializer, CheckEligibilityResponseSerializer,
     CreateLoanSerializer, CreateLoanResponseSerializer,
-    LoanWithCustomerSerializer, LoanDetailSerializer
+    LoanWithCustomerSerializer, LoanDetailSerializer,
+    PortfolioAnalyticsQuerySerializer,
+    RepaymentSerializer, RepaymentResponseSerializer,
+    OfferGridSerializer, OfferGridResponseSerializer,
+    DecisionAuditQuerySerializer, DecisionAuditSerializer,
+    RepaymentFileJobSerializer, RescoreJobSerializer, JobSerializer,
+    CustomerSearchQuerySerializer, CustomerSearchResponseSerializer
 )
-from .utils import calculate_monthly_installment, calculate_credit_score
+from .scoring import get_scorer
+from .profiles import get_profile
+from .ids import allocate_customer_id
+from .sharding import current_shard, select_customer_shard, select_loan_shard
+from .audit import audit_metrics, record_decision, slab_for
+from . import admission, profiles
+from .jobs import enqueue, get_job
+from .search import search_customers
+from .money import emi_paise, exceeds_share, from_paise, to_basis_points, to_paise, to_rupees
+from .utils import add_months
+from .warmup import is_warm
+from .analytics import DIMENSIONS, portfolio_summary, record_loan_changes, record_new_customer
+from .repayments import record_repayment
+from .offers import axis_values, evaluate_offer_grid, load_scoring_inputs
 from django.shortcuts import get_object_or_404
+from django.http import Http404
 from decimal import Decimal
+from django.db import connections
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from django.conf import settings
+from django.urls import reverse
+from rest_framework.parsers import MultiPartParser
+import os
+import uuid
 
 from drf_yasg.utils import swagger_auto_schema
 
@@ -26,11 +53,35 @@ class RegisterCustomerAPIView(APIView):
     def post(self, request):
         serializer = CustomerRegisterSerializer(data=request.data)
         if serializer.is_valid():
-            customer = serializer.save()
+            # The ID decides the shard, so it is allocated before the insert
+            customer_id = allocate_customer_id()
+            select_customer_shard(customer_id)
+            customer = serializer.save(customer_id=customer_id)
+            record_new_customer()
             response_serializer = CustomerResponseSerializer(customer)
             return Response(response_serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class CustomerSearchAPIView(APIView):
+    
+    @swagger_auto_schema(
+        query_serializer=CustomerSearchQuerySerializer,
+        responses={200: CustomerSearchResponseSerializer}
+    )
+    def get(self, request):
+        serializer = CustomerSearchQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        params = serializer.validated_data
+        customers, next_cursor = search_customers(
+            params['criterion'], params[params['criterion']], limit=params['limit'], cursor=params.get('cursor')
+        )
+        return Response({
+            "results": CustomerResponseSerializer(customers, many=True).data,
+            "next_cursor": next_cursor,
+        }, status=status.HTTP_200_OK)
+
 class CheckEligibilityAPIView(APIView):
     
     @swagger_auto_schema(
@@ -44,26 +95,27 @@ class CheckEligibilityAPIView(APIView):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         data = serializer.validated_data
+        select_customer_shard(data['customer_id'])
         customer = get_object_or_404(Customer, customer_id=data['customer_id'])
-        loans = Loan.objects.filter(customer=customer)
+        # Loan aggregates, cached per worker until the customer's version changes
+        profile = get_profile(customer)
 
-        credit_score = calculate_credit_score(customer, loans)
+        credit_score, components = get_scorer().score_profile(profile)
 
-        # Filter active loans (end_date >= today)
-        active_loans = loans.filter(end_date__gte=datetime.now().date())
-
-        # Sum of current EMIs - convert Decimal to float for comparison
-        sum_emis = sum([float(loan.monthly_payment) for loan in active_loans]) or 0.0
-        monthly_salary = float(customer.monthly_salary)
+        # Money is compared in integer paise (see core/money.py); active loans only
+        sum_emis = profile.active_emis
+        monthly_salary = profile.monthly_salary
 
         # Reject if total EMIs exceed 50% of monthly salary
-        if sum_emis > monthly_salary * 0.5:
+        if exceeds_share(sum_emis, monthly_salary, 1, 2):
             approval = False
             corrected_interest_rate = float(data['interest_rate'])  # no correction here
+            slab = "emi_cap"
         else:
             interest_rate = float(data['interest_rate'])
             approved = False
             corrected_interest_rate = interest_rate  # Initialize with requested interest rate
+            slab = slab_for(credit_score)
 
             # Eligibility and interest rate slab rules
             if credit_score > 50:
@@ -84,25 +136,23 @@ class CheckEligibilityAPIView(APIView):
                 approved = False
 
             # Check if sum of current loans exceeds approved_limit
-            sum_current_loans = loans.filter(end_date__gte=datetime.now().date()).aggregate(
-                total=models.Sum('loan_amount')
-            )['total'] or Decimal(0)
-            
-            # Convert Decimal to float for comparison
-            sum_current_loans_float = float(sum_current_loans)
-            approved_limit_float = float(customer.approved_limit)
-
-            if sum_current_loans_float > approved_limit_float:
+            if profile.active_principal > profile.approved_limit:
                 approved = False
                 credit_score = 0
 
             approval = approved
 
         # Calculate EMI with the corrected_interest_rate
-        emi = calculate_monthly_installment(
-            float(data['loan_amount']),
-            int(data['tenure']),
-            corrected_interest_rate
+        emi = emi_paise(
+            to_paise(data['loan_amount']),
+            data['tenure'],
+            to_basis_points(corrected_interest_rate)
+        )
+
+        # Queued for the background audit writer; never written on this thread
+        record_decision(
+            DecisionAudit.CHECK_ELIGIBILITY, customer.customer_id, data, credit_score, components,
+            slab, approval, corrected_interest_rate, from_paise(emi),
         )
         
         response_data = {
@@ -111,7 +161,7 @@ class CheckEligibilityAPIView(APIView):
             "interest_rate": float(data['interest_rate']),
             "corrected_interest_rate": corrected_interest_rate,
             "tenure": data['tenure'],
-            "monthly_installment": emi
+            "monthly_installment": to_rupees(emi)
         }
 
         return Response(response_data, status=status.HTTP_200_OK)
@@ -128,21 +178,26 @@ class CreateLoanAPIView(APIView):
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         data = serializer.validated_data
+        select_customer_shard(data['customer_id'])
         customer = get_object_or_404(Customer, customer_id=data['customer_id'])
-        loans = Loan.objects.filter(customer=customer)
+        profile = get_profile(customer)
         
         # Reuse eligibility check logic (simplified call)
-        credit_score = calculate_credit_score(customer, loans)
-        active_loans = loans.filter(end_date__gte=datetime.now().date())
-        sum_emis = sum([loan.monthly_payment for loan in active_loans]) or Decimal(0)
-        monthly_salary = customer.monthly_salary
+        credit_score, components = get_scorer().score_profile(profile)
+        sum_emis = profile.active_emis
+        monthly_salary = profile.monthly_salary
         
-        if sum_emis > monthly_salary * Decimal('0.5'):
+        if exceeds_share(sum_emis, monthly_salary, 1, 2):
+            message = "Total EMIs exceed 50% of monthly salary."
+            record_decision(
+                DecisionAudit.CREATE_LOAN, customer.customer_id, data, credit_score, components,
+                "emi_cap", False, float(data['interest_rate']), Decimal(0), message=message,
+            )
             return Response({
                 "loan_id": None,
                 "customer_id": customer.customer_id,
                 "loan_approved": False,
-                "message": "Total EMIs exceed 50% of monthly salary.",
+                "message": message,
                 "monthly_installment": 0
             }, status=status.HTTP_400_BAD_REQUEST)
         
@@ -169,12 +224,11 @@ class CreateLoanAPIView(APIView):
             approved = False
         
         # Check sum of current loans
-        sum_current_loans = active_loans.aggregate(total=models.Sum('loan_amount'))['total'] or 0
-        if sum_current_loans + data['loan_amount'] > customer.approved_limit:
+        if profile.active_principal + to_paise(data['loan_amount']) > profile.approved_limit:
             approved = False
 
-        emi = calculate_monthly_installment(
-            data['loan_amount'], data['tenure'], corrected_interest_rate
+        emi = emi_paise(
+            to_paise(data['loan_amount']), data['tenure'], to_basis_points(corrected_interest_rate)
         )
         
         if approved:
@@ -183,33 +237,102 @@ class CreateLoanAPIView(APIView):
                 loan_amount=data['loan_amount'],
                 tenure=data['tenure'],
                 interest_rate=corrected_interest_rate,
-                monthly_payment=emi
+                monthly_payment=from_paise(emi),
+                emis_paid_on_time=0,
+                date_of_approval=datetime.now().date(),
+                end_date=add_months(datetime.now().date(), data['tenure']),
+            )
+            Customer.objects.filter(pk=customer.pk).bump_version()
+            record_loan_changes([loan.date_of_approval])
+            record_decision(
+                DecisionAudit.CREATE_LOAN, customer.customer_id, data, credit_score, components,
+                slab_for(credit_score), True, corrected_interest_rate, from_paise(emi),
+                loan_id=loan.loan_id, message="Loan approved successfully.",
             )
             response_data = {
                 "loan_id": loan.loan_id,
                 "customer_id": customer.customer_id,
                 "loan_approved": True,
                 "message": "Loan approved successfully.",
-                "monthly_installment": emi
+                "monthly_installment": to_rupees(emi)
             }
             return Response(response_data, status=status.HTTP_201_CREATED)
         else:
+            record_decision(
+                DecisionAudit.CREATE_LOAN, customer.customer_id, data, credit_score, components,
+                slab_for(credit_score), False, corrected_interest_rate, from_paise(emi),
+                message="Loan not approved due to credit rating or limits.",
+            )
             response_data = {
                 "loan_id": None,
                 "customer_id": customer.customer_id,
                 "loan_approved": False,
                 "message": "Loan not approved due to credit rating or limits.",
-                "monthly_installment": emi
+                "monthly_installment": to_rupees(emi)
             }
             return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
 
+def loan_etag(request, loan_id):
+    if select_loan_shard(loan_id) is None:
+        return None
+    # Version lookup only: no loan row is loaded or serialized for a 304
+    version = Loan.objects.filter(loan_id=loan_id).values_list('customer__version', flat=True).first()
+    if version is None:
+        return None
+    return f"loan-{loan_id}-v{version}"
+
+def customer_loans_etag(request, customer_id):
+    select_customer_shard(customer_id)
+    version = Customer.objects.filter(customer_id=customer_id).values_list('version', flat=True).first()
+    if version is None:
+        return None
+    return f"customer-{customer_id}-v{version}"
+
+class OfferGridAPIView(APIView):
+    
+    @swagger_auto_schema(
+        request_body=OfferGridSerializer,
+        responses={200: OfferGridResponseSerializer}
+    )
+    def post(self, request):
+        serializer = OfferGridSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        select_customer_shard(data['customer_id'])
+        customer = get_object_or_404(Customer, customer_id=data['customer_id'])
+        inputs = load_scoring_inputs(customer)
+
+        try:
+            cells, best_offer = evaluate_offer_grid(
+                inputs,
+                axis_values(data['loan_amount']),
+                axis_values(data['tenure']),
+                axis_values(data['interest_rate']),
+            )
+        except ValueError:
+            # EMIs too large to represent, e.g. from extreme interest rates
+            return Response({"detail": "Grid values out of range."}, status=status.HTTP_400_BAD_REQUEST)
+        response_data = {
+            "customer_id": customer.customer_id,
+            "credit_score": inputs['credit_score'],
+            "cells": cells,
+            "best_offer": best_offer,
+        }
+        return Response(response_data, status=status.HTTP_200_OK)
+
 class ViewLoanAPIView(APIView):
     
     @swagger_auto_schema(
         responses={201: LoanDetailSerializer}
     )
-    
+    @method_decorator(condition(etag_func=loan_etag))
     def get(self, request, loan_id):
+        # The loan directory (core.ids) names the shard, usually already
+        # selected by loan_etag; unknown loans are 404
+        if current_shard() is None and select_loan_shard(loan_id) is None:
+            raise Http404("No Loan matches the given query.")
         loan = get_object_or_404(Loan, loan_id=loan_id)
         loan_data = {
             "loan_id": loan.loan_id,
@@ -232,7 +355,9 @@ class ViewLoansByCustomerAPIView(APIView):
     @swagger_auto_schema(
         responses={201: LoanWithCustomerSerializer}
     )
+    @method_decorator(condition(etag_func=customer_loans_etag))
     def get(self, request, customer_id):
+        select_customer_shard(customer_id)
         customer = get_object_or_404(Customer, customer_id=customer_id)
         loans = Loan.objects.filter(customer=customer)
         results = []
@@ -247,3 +372,169 @@ class ViewLoansByCustomerAPIView(APIView):
                 "repayments_left": repayments_left
             })
         return Response(results, status=status.HTTP_200_OK)
+
+class RepaymentAPIView(APIView):
+    
+    @swagger_auto_schema(
+        request_body=RepaymentSerializer,
+        responses={201: RepaymentResponseSerializer, 200: RepaymentResponseSerializer}
+    )
+    def post(self, request):
+        serializer = RepaymentSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        repayment, created = None, False
+        if select_loan_shard(data['loan_id']) is not None:
+            repayment, created = record_repayment(
+                data['loan_id'], data['amount'], data['due_date'], data['paid_on']
+            )
+        if repayment is None:
+            return Response({"detail": "Loan not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        loan = Loan.objects.only('tenure', 'emis_paid_on_time').get(loan_id=repayment.loan_id)
+        response_data = {
+            "repayment_id": repayment.pk,
+            "loan_id": repayment.loan_id,
+            "on_time": repayment.on_time,
+            "emis_paid_on_time": loan.emis_paid_on_time,
+            "repayments_left": max(0, loan.tenure - loan.emis_paid_on_time),
+        }
+        # A replayed EMI returns the payment already recorded for that due date
+        return Response(response_data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+class PortfolioAnalyticsAPIView(APIView):
+    
+    @swagger_auto_schema(query_serializer=PortfolioAnalyticsQuerySerializer)
+    def get(self, request):
+        serializer = PortfolioAnalyticsQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        group_by = serializer.validated_data['group_by']
+        dimensions = DIMENSIONS if group_by == 'both' else (group_by,)
+        return Response(portfolio_summary(dimensions), status=status.HTTP_200_OK)
+
+class DecisionAuditAPIView(APIView):
+    
+    @swagger_auto_schema(
+        query_serializer=DecisionAuditQuerySerializer,
+        responses={200: DecisionAuditSerializer(many=True)}
+    )
+    def get(self, request):
+        serializer = DecisionAuditQuerySerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        params = serializer.validated_data
+        # Served by the (customer_id, decided_at) and decided_at indexes
+        audits = DecisionAudit.objects.all()
+        if 'customer_id' in params:
+            audits = audits.filter(customer_id=params['customer_id'])
+        if 'endpoint' in params:
+            audits = audits.filter(endpoint=params['endpoint'])
+        if 'since' in params:
+            audits = audits.filter(decided_at__gte=params['since'])
+        if 'until' in params:
+            audits = audits.filter(decided_at__lt=params['until'])
+        audits = audits.order_by('-decided_at', '-pk')[:params['limit']]
+        return Response(DecisionAuditSerializer(audits, many=True).data, status=status.HTTP_200_OK)
+
+class DecisionAuditMetricsAPIView(APIView):
+    
+    @swagger_auto_schema(auto_schema=None)
+    def get(self, request):
+        # Counters of the worker that served this request
+        return Response(audit_metrics(), status=status.HTTP_200_OK)
+
+class AdmissionMetricsAPIView(APIView):
+    
+    @swagger_auto_schema(auto_schema=None)
+    def get(self, request):
+        # Shared by all workers, unlike the per-worker audit metrics
+        return Response(admission.controller.metrics(), status=status.HTTP_200_OK)
+
+class ProfileCacheMetricsAPIView(APIView):
+    
+    @swagger_auto_schema(auto_schema=None)
+    def get(self, request):
+        # Per worker, like the audit metrics
+        return Response(profiles.profile_cache.metrics(), status=status.HTTP_200_OK)
+
+def job_accepted(request, job_id):
+    response = Response(JobSerializer(get_job(job_id)).data, status=status.HTTP_202_ACCEPTED)
+    response['Location'] = request.build_absolute_uri(reverse('job_detail', args=[job_id]))
+    return response
+
+class RepaymentFileJobAPIView(APIView):
+    parser_classes = [MultiPartParser]
+    
+    @swagger_auto_schema(
+        request_body=RepaymentFileJobSerializer,
+        responses={202: JobSerializer}
+    )
+    def post(self, request):
+        serializer = RepaymentFileJobSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        # Workers read the file from JOBS_UPLOAD_DIR and delete it once ingested
+        os.makedirs(settings.JOBS_UPLOAD_DIR, exist_ok=True)
+        path = os.path.join(settings.JOBS_UPLOAD_DIR, f"repayments-{uuid.uuid4().hex}.csv")
+        with open(path, 'wb') as f:
+            for chunk in serializer.validated_data['file'].chunks():
+                f.write(chunk)
+
+        job_id = enqueue('ingest_repayments_file', path=path,
+                         batch_size=serializer.validated_data['batch_size'], delete_after=True)
+        return job_accepted(request, job_id)
+
+class RescoreJobAPIView(APIView):
+    
+    @swagger_auto_schema(
+        request_body=RescoreJobSerializer,
+        responses={202: JobSerializer}
+    )
+    def post(self, request):
+        serializer = RescoreJobSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        job_id = enqueue('rescore_customers', customer_ids=serializer.validated_data.get('customer_ids'))
+        return job_accepted(request, job_id)
+
+class JobDetailAPIView(APIView):
+    
+    @swagger_auto_schema(responses={200: JobSerializer})
+    def get(self, request, job_id):
+        job = get_job(job_id)
+        if job is None:
+            return Response({"detail": "Job not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(JobSerializer(job).data, status=status.HTTP_200_OK)
+
+class LivenessAPIView(APIView):
+    
+    @swagger_auto_schema(auto_schema=None)
+    def get(self, request):
+        # The process is up and serving requests; no dependencies are checked
+        return Response({"status": "alive"}, status=status.HTTP_200_OK)
+
+class ReadinessAPIView(APIView):
+    
+    @swagger_auto_schema(auto_schema=None)
+    def get(self, request):
+        checks = {"warm": is_warm(), "database": True}
+        # Every configured database, shards included
+        for alias in connections:
+            try:
+                with connections[alias].cursor() as cursor:
+                    cursor.execute("SELECT 1")
+            except Exception:
+                checks["database"] = False
+
+        ready = all(checks.values())
+        return Response(
+            {"status": "ready" if ready else "not ready", "checks": checks},
+            status=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE
+        )
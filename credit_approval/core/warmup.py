@@ -0,0 +1,48 @@
+from django.core.cache import caches
+from django.db import connections
+from django.urls import get_resolver
+
+# Set once warm_up() has completed in this process; read by the readiness probe
+_state = {"warm": False}
+
+
+def warm_up_shared():
+    """
+    Work that is safe to do before forking (gunicorn preload_app): compile
+    URL patterns and build the OpenAPI schema so every worker inherits them.
+    """
+    resolver = get_resolver()
+    resolver.url_patterns
+    resolver.reverse_dict  # populates the reverse lookup tables
+
+    from credit_approval.schema import SchemaView, get_rendered_schema
+    from drf_yasg.renderers import OpenAPIRenderer
+    get_rendered_schema(SchemaView(), OpenAPIRenderer())
+
+    # Memory-mapped once here, inherited by every worker
+    from core.scoring import get_scorer
+    scorer = get_scorer()
+    if hasattr(scorer, 'load'):
+        scorer.load()
+
+
+def warm_up_worker():
+    """
+    Per-process work that must happen after fork: open a DB connection on
+    every configured alias and touch every cache backend.
+    """
+    for alias in connections:
+        with connections[alias].cursor() as cursor:
+            cursor.execute("SELECT 1")
+    for alias in caches:
+        caches[alias].get("warmup")
+    _state["warm"] = True
+
+
+def warm_up():
+    warm_up_shared()
+    warm_up_worker()
+
+
+def is_warm():
+    return _state["warm"]
@@ -0,0 +1,87 @@
+"""
+OpenAPI schema served from a precomputed document.
+
+drf_yasg introspects every view to build the schema, which is far too slow to
+repeat on every `/swagger.json` hit. The schema only changes when the code
+does, so it is either generated at build time with
+
+    python manage.py generate_swagger -o -f json static/swagger.json
+
+and read from `SWAGGER_SCHEMA_FILE`, or generated on the first request and
+kept in memory for the lifetime of the worker.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse
+from drf_yasg import openapi
+from drf_yasg.renderers import _SpecRenderer
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+
+
+api_info = openapi.Info(
+    title="Credit Approval System API",
+    default_version='v1',
+    description="API documentation for Credit Approval System",
+    terms_of_service="https://www.yourcompany.com/terms/",
+    contact=openapi.Contact(email="contact@yourcompany.com"),
+    license=openapi.License(name="BSD License"),
+)
+
+BaseSchemaView = get_schema_view(
+    api_info,
+    public=True,
+    permission_classes=(permissions.AllowAny,),
+)
+
+# Rendered schema documents keyed by renderer format ("json", "yaml", "openapi")
+_rendered_schemas = {}
+_lock = threading.Lock()
+
+
+def _read_schema_file():
+    path = getattr(settings, 'SWAGGER_SCHEMA_FILE', None)
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def get_rendered_schema(view, renderer):
+    """
+    Return the schema document for `renderer` as bytes, building it at most
+    once per worker. JSON documents come from the build-time file if present.
+    """
+    key = renderer.format.lstrip('.')
+    body = _rendered_schemas.get(key)
+    if body is not None:
+        return body
+
+    with _lock:
+        body = _rendered_schemas.get(key)
+        if body is None:
+            if key in ('json', 'openapi'):
+                body = _read_schema_file()
+            if body is None:
+                # Same inputs as `generate_swagger`: no request, public schema
+                generator = view.generator_class(api_info)
+                body = renderer.render(generator.get_schema(request=None, public=True))
+            _rendered_schemas[key] = body
+    return body
+
+
+def clear_schema_cache():
+    _rendered_schemas.clear()
+
+
+class SchemaView(BaseSchemaView):
+    def get(self, request, version='', format=None):
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, _SpecRenderer):
+            # UI pages only embed the API info and fetch the spec separately
+            return super().get(request, version, format)
+
+        body = get_rendered_schema(self, renderer)
+        return HttpResponse(body, content_type=f"{renderer.media_type}; charset=utf-8")
@@ -54,6 +54,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.admission.AdmissionControlMiddleware',
+    'core.sharding.ShardMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -94,9 +96,43 @@ WSGI_APPLICATION = 'credit_approval.wsgi.application'
 
 
 DATABASES = {
-    'default': dj_database_url.parse(os.getenv('NEON_DATABASE_URL'))
+    'default': dj_database_url.parse(
+        os.getenv('NEON_DATABASE_URL'),
+        # Keep connections open across requests so warmed-up workers reuse them
+        conn_max_age=int(os.getenv('DB_CONN_MAX_AGE', '600')),
+        conn_health_checks=True,
+    )
 }
 
+# Customer-hash sharding (core/sharding.py)
+# With SHARD_DATABASE_URLS set (comma-separated), customers, loans and repayments
+# are spread over those databases as aliases shard0..shardN-1; 'default' keeps
+# everything else, including the ID allocator and the loan directory.
+
+SHARD_DATABASE_URLS = [url for url in os.getenv('SHARD_DATABASE_URLS', '').split(',') if url.strip()]
+
+for index, url in enumerate(SHARD_DATABASE_URLS):
+    DATABASES[f'shard{index}'] = dj_database_url.parse(
+        url.strip(),
+        conn_max_age=int(os.getenv('DB_CONN_MAX_AGE', '600')),
+        conn_health_checks=True,
+    )
+
+SHARDS = [f'shard{index}' for index in range(len(SHARD_DATABASE_URLS))] or ['default']
+
+if SHARD_DATABASE_URLS:
+    DATABASE_ROUTERS = ['core.sharding.ShardRouter']
+
+# New customer and loan IDs are taken from the central allocator this many at a time
+ID_BLOCK_SIZE = int(os.getenv('ID_BLOCK_SIZE', '100'))
+
+for database in DATABASES.values():
+    if database['ENGINE'] == 'django.db.backends.sqlite3':
+        # Local SQLite with several writers (job workers, gunicorn workers): take the
+        # write lock at BEGIN so concurrent transactions wait instead of failing
+        # with "database is locked"
+        database['OPTIONS'] = {'transaction_mode': 'IMMEDIATE', 'timeout': 20}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -133,6 +169,77 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+
+# OpenAPI schema
+# Generated at build time by `manage.py generate_swagger`; when the file is
+# missing the schema is generated on first request and kept in memory.
+
+SWAGGER_SETTINGS = {
+    'DEFAULT_INFO': 'credit_approval.schema.api_info',
+}
+
+SWAGGER_SCHEMA_FILE = os.getenv('SWAGGER_SCHEMA_FILE', str(BASE_DIR / 'static' / 'swagger.json'))
+
+# Decision audit log (core/audit.py)
+# Records beyond AUDIT_QUEUE_SIZE are dropped and counted rather than blocking requests.
+
+AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', '10000'))
+AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', '500'))
+AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', '1.0'))
+
+# Admission control (core/admission.py)
+# Limits are shared by all gunicorn workers. Per URL name: `concurrency` caps
+# requests in flight, `rate`/`burst` is a token bucket in requests per second,
+# and `priority` endpoints may use the last ADMISSION_PRIORITY_RESERVE slots.
+
+ADMISSION_CONTROL = os.getenv('ADMISSION_CONTROL', 'True') == 'True'
+ADMISSION_MAX_CONCURRENCY = int(os.getenv('ADMISSION_MAX_CONCURRENCY', '32'))
+ADMISSION_PRIORITY_RESERVE = int(os.getenv('ADMISSION_PRIORITY_RESERVE', '4'))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '0.1'))
+
+ADMISSION_POLICIES = {
+    'check_eligibility': {'concurrency': int(os.getenv('ADMISSION_ELIGIBILITY_CONCURRENCY', '8')),
+                          'rate': 200, 'burst': 400},
+    'create_loan': {'concurrency': int(os.getenv('ADMISSION_CREATE_LOAN_CONCURRENCY', '4')),
+                    'rate': 50, 'burst': 100},
+    'offer_grid': {'concurrency': 2, 'rate': 20, 'burst': 40},
+    'repayments': {'concurrency': 4},
+    'portfolio_analytics': {'concurrency': 2},
+    'job_ingest_repayments': {'concurrency': 2},
+    'view_loan': {'priority': True},
+    'view_loans_by_customer': {'priority': True},
+    'health_live': {'priority': True},
+    'health_ready': {'priority': True},
+    'admission_metrics': {'priority': True},
+    'profile_cache_metrics': {'priority': True},
+}
+
+# Credit scoring backend (core/scoring.py): 'heuristic' or 'model'
+# The model artifact is written by `manage.py train_scorer`.
+
+CREDIT_SCORER = os.getenv('CREDIT_SCORER', 'heuristic')
+CREDIT_SCORER_MODEL = os.getenv('CREDIT_SCORER_MODEL', str(BASE_DIR / 'models' / 'credit_scorer.joblib'))
+CREDIT_SCORER_BUDGET_MS = float(os.getenv('CREDIT_SCORER_BUDGET_MS', '10'))
+
+# Customer profile cache (core/profiles.py), per worker
+# Least recently used profiles are evicted beyond either cap; 0 entries disables it.
+
+PROFILE_CACHE_MAX_ENTRIES = int(os.getenv('PROFILE_CACHE_MAX_ENTRIES', '50000'))
+PROFILE_CACHE_MAX_BYTES = int(os.getenv('PROFILE_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+# Background jobs (core/jobs.py, `python manage.py run_jobs`)
+# JOBS_BACKEND is 'database' (the Job table) or 'redis'. Uploaded files are
+# stored in JOBS_UPLOAD_DIR, which must be shared with the job workers.
+
+JOBS_BACKEND = os.getenv('JOBS_BACKEND', 'database')
+JOBS_REDIS_URL = os.getenv('JOBS_REDIS_URL', 'redis://localhost:6379/0')
+JOBS_RESULT_TTL = int(os.getenv('JOBS_RESULT_TTL', str(7 * 24 * 3600)))
+JOBS_MAX_RETRIES = int(os.getenv('JOBS_MAX_RETRIES', '3'))
+JOBS_RETRY_DELAY = float(os.getenv('JOBS_RETRY_DELAY', '10'))
+# A running job whose worker has not renewed it for this long is retried
+JOBS_LEASE_SECONDS = float(os.getenv('JOBS_LEASE_SECONDS', '60'))
+JOBS_UPLOAD_DIR = os.getenv('JOBS_UPLOAD_DIR', str(BASE_DIR / 'uploads'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
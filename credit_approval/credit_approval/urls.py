@@ -16,30 +16,14 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include,re_path
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-from rest_framework import permissions
-
-
-schema_view = get_schema_view(
-   openapi.Info(
-      title="Credit Approval System API",
-      default_version='v1',
-      description="API documentation for Credit Approval System",
-      terms_of_service="https://www.yourcompany.com/terms/",
-      contact=openapi.Contact(email="contact@yourcompany.com"),
-      license=openapi.License(name="BSD License"),
-   ),
-   public=True,
-   permission_classes=(permissions.AllowAny,),
-)
+from .schema import SchemaView
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('core.urls')),  
 
-    re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    re_path(r'^swagger(?P<format>\.json|\.yaml)$', SchemaView.without_ui(), name='schema-json'),
+    path('swagger/', SchemaView.with_ui('swagger'), name='schema-swagger-ui'),
+    path('redoc/', SchemaView.with_ui('redoc'), name='schema-redoc'),
 ]
@@ -0,0 +1,81 @@
+"""
+Gunicorn configuration for production serving.
+
+    gunicorn -c gunicorn.conf.py
+
+SERVE_MODE selects the worker class:
+    sync      one request per process (default); 2 * cores + 1 workers
+    threaded  gthread workers; cores + 1 workers with GUNICORN_THREADS threads each
+    asgi      uvicorn workers running credit_approval.asgi; one per core
+
+WEB_CONCURRENCY and GUNICORN_THREADS override the auto-sized counts.
+The app is preloaded in the master, URL patterns and the OpenAPI schema are
+built before forking, and each worker opens its DB connections before it
+starts accepting requests.
+"""
+import os
+
+
+def detected_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS/Windows
+        return os.cpu_count() or 1
+
+
+SERVE_MODES = {
+    # mode: (worker_class, app, default workers, default threads)
+    'sync': ('sync', 'credit_approval.wsgi:application', lambda c: 2 * c + 1, 1),
+    'threaded': ('gthread', 'credit_approval.wsgi:application', lambda c: c + 1, 4),
+    'asgi': ('uvicorn_worker.UvicornWorker', 'credit_approval.asgi:application', lambda c: c, 1),
+}
+
+mode = os.getenv('SERVE_MODE', 'sync')
+if mode not in SERVE_MODES:
+    raise ValueError(f"SERVE_MODE must be one of {', '.join(SERVE_MODES)}, got {mode!r}")
+
+worker_class, wsgi_app, default_workers, default_threads = SERVE_MODES[mode]
+cores = detected_cores()
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', default_workers(cores)))
+threads = int(os.getenv('GUNICORN_THREADS', default_threads))
+preload_app = True
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+keepalive = 5
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+accesslog = os.getenv('GUNICORN_ACCESS_LOG') or None
+
+
+def when_ready(server):
+    # Runs in the master after the preloaded app is imported, before forking
+    from core.warmup import warm_up_shared
+    warm_up_shared()
+    # Close what the preload and warm-up opened here, once, before the first
+    # fork. A worker closing an inherited connection would shut the socket it
+    # shares with the master and every other worker.
+    from django.db import connections
+    connections.close_all()
+    server.log.info("Serving in %s mode: %d workers x %d threads on %d cores",
+                    mode, workers, threads, cores)
+
+
+def post_worker_init(worker):
+    # Runs before the worker's accept loop, so no request hits a cold worker
+    from core.warmup import warm_up_worker
+    from core.audit import audit_buffer
+    warm_up_worker()
+    audit_buffer.start()
+
+
+def child_exit(server, worker):
+    # Runs in the master: hand back admission slots a killed worker still held
+    from core.admission import controller
+    controller.release_worker(worker.pid)
+
+
+def worker_exit(server, worker):
+    # Write audit records still queued in this worker before it goes away
+    from core.audit import audit_buffer
+    audit_buffer.close()